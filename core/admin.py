@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import (User, Worker, Task, Cow, Doctor, VeterinaryVisit, 
-                     Medicine, ArtificialInsemination, Pregnancy, Vaccination)
+from .models import (User, Worker, Task, TaskTemplate, Cow, Doctor, VeterinaryVisit, 
+                     Medicine, ArtificialInsemination, Pregnancy, Vaccination, HerdCounter)
 
 
 @admin.register(User)
@@ -28,6 +28,14 @@ class TaskAdmin(admin.ModelAdmin):
     date_hierarchy = 'created_at'
 
 
+@admin.register(TaskTemplate)
+class TaskTemplateAdmin(admin.ModelAdmin):
+    list_display = ['title', 'frequency', 'due_time', 'all_workers', 'is_active']
+    list_filter = ['frequency', 'is_active']
+    search_fields = ['title', 'description']
+    filter_horizontal = ['workers']
+
+
 @admin.register(Cow)
 class CowAdmin(admin.ModelAdmin):
     list_display = ['cow_number', 'cow_name', 'breed', 'age', 'health_status', 'is_active', 'created_at']
@@ -80,3 +88,10 @@ class VaccinationAdmin(admin.ModelAdmin):
     list_filter = ['vaccination_date', 'vaccine_name']
     search_fields = ['cow__cow_number', 'vaccine_name']
     date_hierarchy = 'vaccination_date'
+
+
+@admin.register(HerdCounter)
+class HerdCounterAdmin(admin.ModelAdmin):
+    list_display = ['key', 'value']
+    search_fields = ['key']
+    readonly_fields = ['key', 'value']
@@ -0,0 +1,209 @@
+"""
+Breeding performance analytics.
+
+Every AI service gets its outcome in SQL. It conceived when it is marked
+Confirmed or a pregnancy linked to it was confirmed, delivered or aborted. It
+failed when it is marked Failed or its pregnancy failed. Otherwise it is still
+pending and left out of the rates.
+
+- Conception rate: conceived / (conceived + failed) services.
+- Services per conception: (conceived + failed) / conceived.
+- Calving interval: days between successive deliveries of a cow.
+- Days open: days from a delivery to the next conceiving service.
+
+Cow totals come from one ordered pass over each cow's service and delivery
+timeline, bull, technician and doctor totals from one ``GROUP BY`` each, and
+the herd row is the sum of the cow rows. ``BreedingStat`` stores totals rather
+than averages so rows can be refreshed independently and summed. Signals in
+``core.signals`` refresh the cow and groups touched by a changed service or
+pregnancy; ``manage.py rebuild_breeding_stats`` recomputes everything.
+"""
+from bisect import bisect_right
+from itertools import groupby
+from operator import itemgetter
+
+from django.apps import apps as django_apps
+from django.db import transaction
+from django.db.models import BooleanField, Count, Exists, ExpressionWrapper, OuterRef, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+CHUNK_SIZE = 500
+CONCEIVED_PREGNANCY_STATUSES = ('confirmed', 'delivered', 'aborted')
+GROUP_SCOPES = ('bull', 'technician', 'doctor')
+TOTAL_FIELDS = ('services', 'conceptions', 'failures', 'calvings', 'calving_interval_days',
+                'calving_intervals', 'days_open_days', 'days_open_periods')
+
+
+def _chunks(ids, size=CHUNK_SIZE):
+    ids = list(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def _outcome_q(apps):
+    """``(conceived, failed)`` conditions on ``ArtificialInsemination`` rows"""
+    Pregnancy = apps.get_model('core', 'Pregnancy')
+    conceived = Q(success_status__iexact='confirmed') | Exists(Pregnancy.objects.filter(
+        ai_record=OuterRef('pk'), pregnancy_status__in=CONCEIVED_PREGNANCY_STATUSES,
+    ))
+    failed = ~conceived & (Q(success_status__iexact='failed') | Exists(Pregnancy.objects.filter(
+        ai_record=OuterRef('pk'), pregnancy_status='failed',
+    )))
+    return conceived, failed
+
+
+def bull_key(breed, bull_id):
+    return f'{breed}|{bull_id or ""}'
+
+
+def service_groups(services):
+    """``{scope: keys}`` of the bull, technician and doctor rows ``services`` count towards"""
+    groups = {scope: set() for scope in GROUP_SCOPES}
+    for service in services:
+        groups['bull'].add(bull_key(service.bull_breed, service.bull_id))
+        if service.technician_name:
+            groups['technician'].add(service.technician_name)
+        if service.doctor_id:
+            groups['doctor'].add(str(service.doctor_id))
+    return groups
+
+
+def cow_stats(cow_ids, apps=django_apps):
+    """Return unsaved cow-scope ``BreedingStat`` rows for the cows among ``cow_ids`` that have any history"""
+    get_model = lambda name: apps.get_model('core', name)
+    BreedingStat = get_model('BreedingStat')
+    conceived_q, failed_q = _outcome_q(apps)
+
+    labels = dict(get_model('Cow').objects.filter(pk__in=cow_ids).values_list('pk', 'cow_number'))
+    services = (get_model('ArtificialInsemination').objects.filter(cow_id__in=labels)
+                .annotate(conceived=ExpressionWrapper(conceived_q, output_field=BooleanField()),
+                          failed=ExpressionWrapper(failed_q, output_field=BooleanField()))
+                .order_by('cow_id', 'ai_date', 'ai_time', 'pk')
+                .values_list('cow_id', 'ai_date', 'conceived', 'failed'))
+    deliveries = (get_model('Pregnancy').objects
+                  .filter(cow_id__in=labels, pregnancy_status='delivered', actual_delivery_date__isnull=False)
+                  .order_by('cow_id', 'actual_delivery_date')
+                  .values_list('cow_id', 'actual_delivery_date'))
+    services_by_cow = {cow_id: list(rows) for cow_id, rows in groupby(services, key=itemgetter(0))}
+    calvings_by_cow = {cow_id: [row[1] for row in rows] for cow_id, rows in groupby(deliveries, key=itemgetter(0))}
+
+    stats = []
+    for cow_id, label in labels.items():
+        rows = services_by_cow.get(cow_id, [])
+        calvings = calvings_by_cow.get(cow_id, [])
+        if not rows and not calvings:
+            continue
+        conceptions = [ai_date for _, ai_date, conceived, _ in rows if conceived]
+        stat = BreedingStat(scope='cow', key=str(cow_id), label=label, cow_id=cow_id, services=len(rows),
+                            conceptions=len(conceptions), failures=sum(1 for row in rows if row[3]),
+                            calvings=len(calvings))
+
+        for previous, current in zip(calvings, calvings[1:]):
+            if current > previous:
+                stat.calving_interval_days += (current - previous).days
+                stat.calving_intervals += 1
+
+        for index, calving in enumerate(calvings):
+            next_calving = calvings[index + 1] if index + 1 < len(calvings) else None
+            position = bisect_right(conceptions, calving)
+            if position < len(conceptions) and (next_calving is None or conceptions[position] < next_calving):
+                stat.days_open_days += (conceptions[position] - calving).days
+                stat.days_open_periods += 1
+            elif next_calving is None:
+                stat.open_since = calving
+        stats.append(stat)
+    return stats
+
+
+def group_stats(scope, keys=None, apps=django_apps):
+    """Return unsaved ``BreedingStat`` rows for ``scope``, limited to ``keys`` when given"""
+    BreedingStat = apps.get_model('core', 'BreedingStat')
+    conceived_q, failed_q = _outcome_q(apps)
+    queryset = apps.get_model('core', 'ArtificialInsemination').objects.order_by()
+
+    if scope == 'bull':
+        queryset = queryset.annotate(bull=Coalesce('bull_id', Value('')))
+        if keys is not None:
+            condition = Q(pk__in=[])
+            for key in keys:
+                breed, _, bull = key.partition('|')
+                condition |= Q(bull_breed=breed, bull=bull)
+            queryset = queryset.filter(condition)
+        fields = ('bull_breed', 'bull')
+    elif scope == 'technician':
+        queryset = queryset.exclude(technician_name__isnull=True).exclude(technician_name='')
+        if keys is not None:
+            queryset = queryset.filter(technician_name__in=keys)
+        fields = ('technician_name',)
+    else:
+        queryset = queryset.filter(doctor__isnull=False)
+        if keys is not None:
+            queryset = queryset.filter(doctor_id__in=[int(key) for key in keys])
+        fields = ('doctor_id', 'doctor__name')
+
+    rows = queryset.values(*fields).annotate(
+        services=Count('pk'),
+        conceptions=Count('pk', filter=conceived_q),
+        failures=Count('pk', filter=failed_q),
+    )
+    stats = []
+    for row in rows:
+        if scope == 'bull':
+            key = bull_key(row['bull_breed'], row['bull'])
+            label = f"{row['bull']} ({row['bull_breed']})" if row['bull'] else row['bull_breed']
+        elif scope == 'technician':
+            key = label = row['technician_name']
+        else:
+            key, label = str(row['doctor_id']), f"Dr. {row['doctor__name']}"
+        stats.append(BreedingStat(scope=scope, key=key, label=label[:300], services=row['services'],
+                                  conceptions=row['conceptions'], failures=row['failures']))
+    return stats
+
+
+def refresh_herd(apps=django_apps):
+    BreedingStat = apps.get_model('core', 'BreedingStat')
+    totals = BreedingStat.objects.filter(scope='cow').aggregate(**{field: Sum(field) for field in TOTAL_FIELDS})
+    BreedingStat.objects.update_or_create(
+        scope='herd', key='',
+        defaults={'label': 'Herd', **{field: value or 0 for field, value in totals.items()}},
+    )
+
+
+def refresh_breeding_stats(cow_ids=(), groups=None, apps=django_apps):
+    """Recompute the rows of ``cow_ids`` and of ``groups`` (``{scope: keys}``), then the herd row"""
+    BreedingStat = apps.get_model('core', 'BreedingStat')
+    with transaction.atomic():
+        for chunk in _chunks(set(cow_ids)):
+            BreedingStat.objects.filter(scope='cow', key__in=[str(cow_id) for cow_id in chunk]).delete()
+            BreedingStat.objects.bulk_create(cow_stats(chunk, apps))
+        for scope, keys in (groups or {}).items():
+            if keys:
+                BreedingStat.objects.filter(scope=scope, key__in=keys).delete()
+                BreedingStat.objects.bulk_create(group_stats(scope, keys, apps))
+        refresh_herd(apps)
+
+
+def rebuild_breeding_stats(apps=django_apps):
+    """Recompute every row from the source tables; return how many rows were written"""
+    BreedingStat = apps.get_model('core', 'BreedingStat')
+    cow_ids = apps.get_model('core', 'Cow').objects.values_list('pk', flat=True)
+    with transaction.atomic():
+        BreedingStat.objects.all().delete()
+        for chunk in _chunks(cow_ids):
+            BreedingStat.objects.bulk_create(cow_stats(chunk, apps))
+        for scope in GROUP_SCOPES:
+            BreedingStat.objects.bulk_create(group_stats(scope, apps=apps))
+        refresh_herd(apps)
+    return BreedingStat.objects.count()
+
+
+def open_cows(today=None):
+    """``(count, average days open so far)`` of cows that calved and have not conceived since"""
+    today = today or timezone.localdate()
+    BreedingStat = django_apps.get_model('core', 'BreedingStat')
+    since = list(BreedingStat.objects.filter(scope='cow', open_since__isnull=False, cow__is_active=True)
+                 .values_list('open_since', flat=True))
+    if not since:
+        return 0, None
+    return len(since), sum((today - date).days for date in since) / len(since)
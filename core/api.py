@@ -0,0 +1,557 @@
+"""
+JSON API (v1) for field devices.
+
+Every resource in ``RESOURCES`` supports:
+
+- ``GET /api/v1/<name>/``: one keyset page (``cursor``, ``per_page``, and
+  ``cow`` for records of one cow);
+- ``POST /api/v1/<name>/``: create one record;
+- ``GET``/``PUT``/``PATCH /api/v1/<name>/<id>/``: read or update one record;
+- ``POST /api/v1/<name>/batch/``: create (no ``id``) or update (with ``id``) up
+  to ``API_BATCH_LIMIT`` records in one transaction, each in its own savepoint;
+- ``GET /api/v1/sync/``: rows changed or deleted since a ``since`` token, for
+  every resource at once (see ``core.sync``).
+
+Records that carry a ``client_uuid`` are created at most once: uploading the
+same one again returns the existing row with a 200 instead of a 201.
+
+``fields=a,b`` returns only those fields. Input is validated by the same
+ModelForms as the HTML views, with the same permissions. Responses carry a
+strong ``ETag`` built from ``updated_at`` (plus ``Last-Modified`` on single
+records), so revalidating unchanged data costs one indexed lookup and an empty
+304. ``PUT``/``PATCH`` honour ``If-Match``. Bodies are brotli-compressed when
+the ``brotli`` package is installed and the client accepts it, gzip otherwise;
+the coding is part of the ETag because the bytes differ.
+
+Authentication is the normal session cookie. Writes need the ``X-CSRFToken``
+header (``GET /api/v1/`` returns the token) and, over HTTPS, an ``Origin``
+header naming the site.
+"""
+import hashlib
+import json
+import re
+import uuid
+
+from django import forms
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db import models
+from django.forms.models import model_to_dict
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.dateparse import parse_date, parse_datetime, parse_time
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from django.utils.text import compress_string
+
+from .forms import (ArtificialInseminationForm, CowForm, DoctorForm, PregnancyForm, TaskForm, TaskUpdateForm,
+                    VaccinationForm, VeterinaryVisitForm, VisitMedicineForm)
+from .models import ArtificialInsemination, Cow, Doctor, Medicine, Pregnancy, Task, Vaccination, VeterinaryVisit
+from .pagination import paginate
+from .sync import StaleToken, changes, decode_token, encode_token, horizon
+
+try:
+    import brotli
+except ImportError:  # optional, see requirements.txt
+    brotli = None
+
+BROTLI_QUALITY = 5
+ACCEPTS_BROTLI = re.compile(r'\bbr\b')
+ACCEPTS_GZIP = re.compile(r'\bgzip\b')
+
+
+class ApiError(Exception):
+    def __init__(self, status, message, **extra):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.extra = extra
+
+
+def _is_admin(user):
+    return user.user_type == 'admin'
+
+
+class Resource:
+    """A model exposed through the API, with the form and permissions of its HTML views"""
+
+    def __init__(self, model, form, fields, recorded_by=None, create=None, update=_is_admin):
+        self.model = model
+        self.form = form
+        stored = {field.name for field in model._meta.fields}
+        self.fields = ('id',) + tuple(fields) + tuple(
+            name for name in ('client_uuid', 'created_at', 'updated_at') if name in stored
+        )
+        self.recorded_by = recorded_by
+        self._can_create = create or (lambda user: True)
+        self._can_update = update
+
+    def queryset(self, user):
+        return self.model.objects.all()
+
+    def form_class(self, user, instance):
+        return self.form
+
+    def can_create(self, user):
+        return self._can_create(user)
+
+    def can_update(self, user, instance):
+        return self._can_update(user)
+
+    def before_save(self, obj, user, created):
+        if created and self.recorded_by:
+            setattr(obj, self.recorded_by, user)
+
+    def after_save(self, obj, created):
+        pass
+
+
+class TaskResource(Resource):
+    """Admins manage every task; workers see their own and may only change the status"""
+
+    def queryset(self, user):
+        if _is_admin(user):
+            return Task.objects.all()
+        return Task.objects.filter(assigned_to__user=user)
+
+    def form_class(self, user, instance):
+        return TaskForm if _is_admin(user) else TaskUpdateForm
+
+    def can_update(self, user, instance):
+        return _is_admin(user) or instance.assigned_to.user_id == user.pk
+
+    def before_save(self, obj, user, created):
+        if created:
+            obj.assigned_by = user
+        if obj.status == 'completed' and obj.completed_at is None:
+            obj.completed_at = timezone.now()
+
+
+class VisitResource(Resource):
+    def after_save(self, obj, created):
+        if created:
+            # Same as the HTML view: a new visit is the cow's last checkup
+            obj.cow.last_checkup = obj.visit_date
+            obj.cow.save()
+
+
+RESOURCES = {
+    'cows': Resource(Cow, CowForm, (
+        'cow_number', 'cow_name', 'breed', 'age', 'color', 'identification_mark', 'health_status',
+        'last_checkup', 'notes', 'caretaker', 'is_active', 'photo_thumbnail', 'photo_medium',
+    ), recorded_by='added_by', create=_is_admin),
+    'tasks': TaskResource(Task, TaskForm, (
+        'title', 'description', 'assigned_to', 'assigned_by', 'notes', 'deadline', 'status', 'completed_at',
+        'template', 'scheduled_for',
+    ), create=_is_admin),
+    'doctors': Resource(Doctor, DoctorForm, (
+        'name', 'qualification', 'specialization', 'license_number', 'phone_number', 'email', 'clinic_name',
+        'address', 'is_active',
+    ), recorded_by='added_by', create=_is_admin),
+    'visits': VisitResource(VeterinaryVisit, VeterinaryVisitForm, (
+        'cow', 'doctor', 'visit_date', 'visit_time', 'visit_type', 'reason_for_visit', 'symptoms', 'diagnosis',
+        'treatment_given', 'doctor_instructions', 'next_visit_date', 'visit_cost', 'notes', 'recorded_by',
+    ), recorded_by='recorded_by'),
+    'medicines': Resource(Medicine, VisitMedicineForm, (
+        'visit', 'medicine_name', 'dosage', 'frequency', 'duration', 'route', 'start_date', 'end_date',
+        'instructions',
+    )),
+    'vaccinations': Resource(Vaccination, VaccinationForm, (
+        'cow', 'vaccine_name', 'disease_prevention', 'vaccination_date', 'next_due_date', 'batch_number',
+        'administered_by', 'dosage', 'route', 'notes', 'recorded_by',
+    ), recorded_by='recorded_by'),
+    'ai': Resource(ArtificialInsemination, ArtificialInseminationForm, (
+        'cow', 'doctor', 'ai_date', 'ai_time', 'bull_breed', 'bull_id', 'semen_source', 'heat_detection_date',
+        'technician_name', 'success_status', 'expected_calving_date', 'cost', 'notes', 'recorded_by',
+    ), recorded_by='recorded_by'),
+    'pregnancies': Resource(Pregnancy, PregnancyForm, (
+        'cow', 'ai_record', 'confirmation_date', 'confirmed_by', 'pregnancy_status', 'expected_delivery_date',
+        'actual_delivery_date', 'pregnancy_duration', 'calf_gender', 'calf_weight', 'delivery_type',
+        'complications', 'doctor_notes', 'recorded_by',
+    ), recorded_by='recorded_by', update=lambda user: True),
+}
+
+
+# Serialization
+
+def _resource(name):
+    try:
+        return RESOURCES[name]
+    except KeyError:
+        raise ApiError(404, 'Unknown resource.')
+
+
+def _requested_fields(request, resource):
+    raw = request.GET.get('fields')
+    if not raw:
+        return resource.fields
+    names = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = sorted(set(names) - set(resource.fields))
+    if unknown:
+        raise ApiError(400, 'Unknown fields.', fields=unknown)
+    return ('id',) + tuple(name for name in names if name != 'id')
+
+
+def serialize(obj, fields):
+    data = {}
+    for name in fields:
+        field = obj._meta.get_field(name)
+        value = getattr(obj, field.attname)
+        if isinstance(field, models.FileField):
+            value = value.url if value else None
+        data[name] = value
+    return data
+
+
+def _stamp(updated_at):
+    return format(int(updated_at.timestamp() * 1_000_000), 'x')
+
+
+def _fields_digest(resource, fields):
+    if fields == resource.fields:
+        return 'all'
+    return hashlib.sha1(','.join(fields).encode()).hexdigest()[:8]
+
+
+def _item_etag(name, resource, obj_pk, updated_at, fields):
+    return f'{name}.{obj_pk}.{_stamp(updated_at)}.{_fields_digest(resource, fields)}'
+
+
+# Conditional requests and compression
+
+def _encoding(request):
+    accept = request.headers.get('Accept-Encoding', '')
+    if brotli is not None and ACCEPTS_BROTLI.search(accept):
+        return 'br'
+    if ACCEPTS_GZIP.search(accept):
+        return 'gzip'
+    return None
+
+
+def _etag(base, encoding):
+    return f'"{base}-{encoding}"' if encoding else f'"{base}"'
+
+
+def _request_etags(request, header):
+    value = request.headers.get(header)
+    if not value:
+        return None
+    # If-None-Match uses the weak comparison
+    return [tag[2:] if tag.startswith('W/') else tag for tag in parse_etags(value)]
+
+
+def _none_match(request, etag):
+    tags = _request_etags(request, 'If-None-Match')
+    return tags is not None and ('*' in tags or etag in tags)
+
+
+def _check_if_match(request, base):
+    tags = _request_etags(request, 'If-Match')
+    if tags is None or '*' in tags:
+        return
+    if not {_etag(base, encoding) for encoding in (None, 'gzip', 'br')} & set(tags):
+        raise ApiError(412, 'The record was changed by someone else.')
+
+
+def _not_modified(etag, last_modified=None):
+    response = HttpResponse(status=304)
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def _json_response(request, payload, status=200, etag_base=None, last_modified=None):
+    encoding = _encoding(request)
+    body = json.dumps(payload, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    if encoding == 'br':
+        body = brotli.compress(body, quality=BROTLI_QUALITY)
+    elif encoding == 'gzip':
+        body = compress_string(body)
+    response = HttpResponse(body, status=status, content_type='application/json')
+    if encoding:
+        response['Content-Encoding'] = encoding
+    if etag_base:
+        response['ETag'] = _etag(etag_base, encoding)
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def api_view(methods):
+    """JSON authentication, method and error handling for the API views"""
+    def decorator(view):
+        def wrapper(request, *args, **kwargs):
+            try:
+                if request.method not in methods:
+                    raise ApiError(405, 'Method not allowed.')
+                if not request.user.is_authenticated:
+                    raise ApiError(401, 'Authentication required.')
+                return view(request, *args, **kwargs)
+            except ApiError as error:
+                response = _json_response(request, {'error': error.message, **error.extra}, status=error.status)
+                if error.status == 405:
+                    response['Allow'] = ', '.join(methods)
+                return response
+        wrapper.__name__ = view.__name__
+        wrapper.__doc__ = view.__doc__
+        return wrapper
+    return decorator
+
+
+# Writes
+
+def _payload(request):
+    try:
+        payload = json.loads(request.body or b'null')
+    except (ValueError, UnicodeDecodeError):
+        raise ApiError(400, 'Request body is not valid JSON.')
+    if not isinstance(payload, dict):
+        raise ApiError(400, 'Request body must be a JSON object.')
+    return payload
+
+
+def _client_uuid(resource, record):
+    value = record.get('client_uuid')
+    if value in (None, '') or 'client_uuid' not in resource.fields:
+        return None
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        raise ApiError(400, 'client_uuid must be a UUID.')
+
+
+def _save(request, resource, record, instance=None, partial=False, client_uuid=None):
+    """Validate ``record`` with the resource's form and save it"""
+    form_class = resource.form_class(request.user, instance)
+    data = model_to_dict(instance, fields=form_class._meta.fields) if partial else {}
+    data.update(record)
+    form = form_class(data=data, instance=instance)
+    # JSON carries ISO 8601; hand the form parsed values so its HTML input formats don't apply
+    for name, field in form.fields.items():
+        value = data.get(name)
+        if not isinstance(value, str):
+            continue
+        if isinstance(field, forms.DateTimeField):
+            data[name] = parse_datetime(value) or value
+        elif isinstance(field, forms.DateField):
+            data[name] = parse_date(value) or value
+        elif isinstance(field, forms.TimeField):
+            data[name] = parse_time(value) or value
+    if not form.is_valid():
+        raise ApiError(400, 'Invalid record.', errors=form.errors.get_json_data())
+
+    created = instance is None
+    obj = form.save(commit=False)
+    if client_uuid is not None:
+        obj.client_uuid = client_uuid
+    resource.before_save(obj, request.user, created)
+    obj.save()
+    form.save_m2m()
+    resource.after_save(obj, created)
+    return obj
+
+
+def _create(request, resource, record):
+    """
+    Create a record and return ``(obj, created)``. Uploading a record again with
+    the same ``client_uuid`` returns the row the first upload created, so a
+    device can safely retry after losing the connection mid-request.
+    """
+    if not resource.can_create(request.user):
+        raise ApiError(403, 'Access denied.')
+    client_uuid = _client_uuid(resource, record)
+    uploaded = resource.queryset(request.user).filter(client_uuid=client_uuid) if client_uuid else None
+    if uploaded is not None and uploaded.exists():
+        return uploaded.get(), False
+    try:
+        with transaction.atomic():
+            return _save(request, resource, record, client_uuid=client_uuid), True
+    except IntegrityError:
+        # A concurrent retry of the same upload got there first
+        if uploaded is not None and uploaded.exists():
+            return uploaded.get(), False
+        raise ApiError(409, 'The record conflicts with an existing one.')
+
+
+def _update(request, resource, instance, record, partial):
+    if not resource.can_update(request.user, instance):
+        raise ApiError(403, 'Access denied.')
+    try:
+        with transaction.atomic():
+            return _save(request, resource, record, instance, partial=partial)
+    except IntegrityError:
+        raise ApiError(409, 'The record conflicts with an existing one.')
+
+
+def _get(queryset, pk):
+    obj = queryset.filter(pk=pk).first() if isinstance(pk, int) else None
+    if obj is None:
+        raise ApiError(404, 'Not found.')
+    return obj
+
+
+# Views
+
+@api_view(['GET'])
+def api_index(request):
+    """List the resources and hand out the CSRF token for writes"""
+    return _json_response(request, {
+        'version': 1,
+        'csrf_token': get_token(request),
+        'resources': {name: reverse('api_collection', args=[name]) for name in RESOURCES},
+        'sync': reverse('api_sync'),
+    })
+
+
+@api_view(['GET', 'POST'])
+def api_collection(request, name):
+    """One page of records, or create a record"""
+    resource = _resource(name)
+
+    if request.method == 'POST':
+        obj, created = _create(request, resource, _payload(request))
+        response = _json_response(request, serialize(obj, resource.fields), status=201 if created else 200,
+                                  etag_base=_item_etag(name, resource, obj.pk, obj.updated_at, resource.fields),
+                                  last_modified=obj.updated_at)
+        response['Location'] = reverse('api_item', args=[name, obj.pk])
+        return response
+
+    fields = _requested_fields(request, resource)
+    queryset = resource.queryset(request.user)
+    if request.GET.get('cow'):
+        if not any(field.name == 'cow' for field in resource.model._meta.fields):
+            raise ApiError(400, 'This resource cannot be filtered by cow.')
+        try:
+            queryset = queryset.filter(cow_id=int(request.GET['cow']))
+        except ValueError:
+            raise ApiError(400, 'cow must be an id.')
+    if fields != resource.fields:
+        ordering = [name.lstrip('-') for name in resource.model._meta.ordering]
+        queryset = queryset.only(*set(fields) | set(ordering) | {'updated_at'})
+
+    page = paginate(request, queryset)
+    digest = hashlib.sha1()
+    for obj in page:
+        digest.update(f'{obj.pk}.{_stamp(obj.updated_at)};'.encode())
+    digest.update(f'{page.next_cursor}|{page.previous_cursor}|{",".join(fields)}'.encode())
+    base = f'{name}.page.{digest.hexdigest()[:32]}'
+    if _none_match(request, _etag(base, _encoding(request))):
+        return _not_modified(_etag(base, _encoding(request)))
+
+    return _json_response(request, {
+        'results': [serialize(obj, fields) for obj in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    }, etag_base=base)
+
+
+@api_view(['GET', 'PUT', 'PATCH'])
+def api_item(request, name, pk):
+    """Read or update one record"""
+    resource = _resource(name)
+    queryset = resource.queryset(request.user)
+
+    if request.method == 'GET':
+        fields = _requested_fields(request, resource)
+        updated_at = queryset.filter(pk=pk).values_list('updated_at', flat=True).first()
+        if updated_at is None:
+            raise ApiError(404, 'Not found.')
+        etag = _etag(_item_etag(name, resource, pk, updated_at, fields), _encoding(request))
+        if _none_match(request, etag):
+            return _not_modified(etag, updated_at)
+        if 'If-None-Match' not in request.headers:
+            since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+            if since is not None and int(updated_at.timestamp()) <= since:
+                return _not_modified(etag, updated_at)
+        obj = queryset.filter(pk=pk).first()
+        if obj is None:
+            raise ApiError(404, 'Not found.')
+        return _json_response(request, serialize(obj, fields),
+                              etag_base=_item_etag(name, resource, obj.pk, obj.updated_at, fields),
+                              last_modified=obj.updated_at)
+
+    instance = _get(queryset, pk)
+    if not resource.can_update(request.user, instance):
+        raise ApiError(403, 'Access denied.')
+    _check_if_match(request, _item_etag(name, resource, instance.pk, instance.updated_at, resource.fields))
+    obj = _update(request, resource, instance, _payload(request), partial=request.method == 'PATCH')
+    return _json_response(request, serialize(obj, resource.fields),
+                          etag_base=_item_etag(name, resource, obj.pk, obj.updated_at, resource.fields),
+                          last_modified=obj.updated_at)
+
+
+@api_view(['POST'])
+def api_batch(request, name):
+    """Create or update many records in one request; each record succeeds or fails on its own"""
+    resource = _resource(name)
+    records = _payload(request).get('records')
+    if not isinstance(records, list):
+        raise ApiError(400, 'Expected {"records": [...]}.')
+    if len(records) > settings.API_BATCH_LIMIT:
+        raise ApiError(413, f'At most {settings.API_BATCH_LIMIT} records per batch.')
+
+    queryset = resource.queryset(request.user)
+    results = []
+    with transaction.atomic():
+        for index, record in enumerate(records):
+            try:
+                if not isinstance(record, dict):
+                    raise ApiError(400, 'Expected an object.')
+                if record.get('id') is None:
+                    obj, created = _create(request, resource, record)
+                else:
+                    obj, created = _update(request, resource, _get(queryset, record['id']), record, partial=True), False
+            except ApiError as error:
+                results.append({'index': index, 'status': error.status, 'error': error.message, **error.extra})
+                continue
+            results.append({
+                'index': index,
+                'status': 201 if created else 200,
+                'id': obj.pk,
+                'client_uuid': getattr(obj, 'client_uuid', None),
+                'etag': _etag(_item_etag(name, resource, obj.pk, obj.updated_at, resource.fields), None),
+                'updated_at': obj.updated_at,
+            })
+    return _json_response(request, {'results': results})
+
+
+@api_view(['GET'])
+def api_sync(request):
+    """Rows changed and deleted since the client's ``since`` token, across resources"""
+    names = [name.strip() for name in request.GET.get('resources', '').split(',') if name.strip()] or list(RESOURCES)
+    resources = [(name, _resource(name)) for name in names]
+    try:
+        limit = int(request.GET.get('limit', settings.SYNC_PAGE_SIZE))
+    except ValueError:
+        limit = settings.SYNC_PAGE_SIZE
+    limit = max(1, min(limit, settings.SYNC_MAX_PAGE_SIZE))
+    try:
+        marks = decode_token(request.GET['since']) if request.GET.get('since') else {}
+    except ValueError as error:
+        raise ApiError(400, str(error))
+
+    until = horizon()
+    payload = {'changes': {}, 'deleted': {}, 'more': False}
+    for name, resource in resources:
+        if limit <= 0:
+            # Out of budget: this resource keeps its old mark for the next call
+            payload['more'] = True
+            break
+        label = resource.model._meta.label_lower
+        try:
+            rows, deleted, marks[label], more = changes(resource.queryset(request.user), marks.get(label), until,
+                                                        limit, user=request.user)
+        except StaleToken:
+            raise ApiError(410, 'The sync token is too old; start a full resync.', resync=True)
+        payload['changes'][name] = [serialize(obj, resource.fields) for obj in rows]
+        payload['deleted'][name] = deleted
+        payload['more'] = payload['more'] or more
+        limit -= len(rows) + len(deleted)
+    payload['since'] = encode_token(marks)
+    return _json_response(request, payload)
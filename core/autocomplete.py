@@ -0,0 +1,204 @@
+"""
+Search-as-you-type pickers for foreign keys to large tables.
+
+A ``<select>`` lists every row of the related table, so the visit, AI,
+pregnancy and vaccination forms grew with the herd (and called ``__str__``,
+with its extra cow query, once per AI record), and the task and cow forms
+with the staff. ``AutocompleteWidget`` renders
+the chosen id in a hidden input plus a text box showing only that row's
+label; ``static/js/script.js`` fills in suggestions from the ``autocomplete``
+view as the user types, so a form page costs the same for 50 or 50,000 cows.
+
+Suggestions are prefix matches on ``LOWER(column)``, written as a range
+(``>= term`` and ``< term + U+10FFFF``) so the expression indexes declared on
+the models serve them in order; ``LIKE`` would scan the table on SQLite.
+Labels are built from ``values()`` rows, never from model instances.
+Without JavaScript, typing an exact cow number or employee ID still works.
+"""
+from django import forms
+from django.conf import settings
+from django.db.models.functions import Lower
+from django.forms.utils import flatatt
+from django.urls import reverse
+from django.utils.html import format_html
+from django.utils.translation import gettext as _, gettext_lazy
+
+from .models import ArtificialInsemination, Cow, Worker
+
+# Sorts after every character, so ``term + PREFIX_END`` bounds all strings starting with ``term``
+PREFIX_END = chr(0x10FFFF)
+# Submitted for text that matched nothing; no primary key parses from it, so the field reports an invalid choice
+NO_MATCH = 'no-match'
+
+
+def prefix_match(queryset, column, term):
+    """Rows whose ``column`` starts with ``term`` (any case), ordered by it"""
+    term = term.lower()
+    return (queryset.alias(prefix_key=Lower(column))
+            .filter(prefix_key__gte=term, prefix_key__lt=term + PREFIX_END)
+            .order_by('prefix_key', 'pk'))
+
+
+class Lookup:
+    """One searchable table: its rows, how they are labelled and what they can be found by"""
+    model = None
+    columns = ()
+    # Columns matched by prefix, in the order their matches are listed
+    search_columns = ()
+    # Column an exact (case-insensitive) typed value is resolved by without JavaScript
+    key_column = None
+    # Order of the suggestions shown before anything is typed
+    ordering = ()
+    placeholder = ''
+
+    def queryset(self):
+        return self.model.objects.all()
+
+    def choices(self):
+        """The rows offered as suggestions; ``queryset()`` still labels and resolves the others"""
+        return self.queryset()
+
+    def label(self, row):
+        raise NotImplementedError
+
+    def rows(self, queryset, limit):
+        return list(queryset.values('pk', *self.columns)[:limit])
+
+    def suggest(self, term, limit, **params):
+        """Up to ``limit`` ``{'id', 'label'}`` suggestions for ``term``"""
+        queryset = self.choices()
+        if not term:
+            rows = self.rows(queryset.order_by(*self.ordering, 'pk'), limit)
+        else:
+            rows, seen = [], set()
+            # One index range per column; later columns only fill what earlier ones left
+            for column in self.search_columns:
+                for row in self.rows(prefix_match(queryset, column, term).exclude(pk__in=seen), limit - len(rows)):
+                    rows.append(row)
+                    seen.add(row['pk'])
+                if len(rows) >= limit:
+                    break
+        return [{'id': row['pk'], 'label': self.label(row)} for row in rows]
+
+    def label_for(self, pk):
+        rows = self.rows(self.queryset().filter(pk=pk), 1)
+        return self.label(rows[0]) if rows else None
+
+    def resolve(self, text):
+        """The primary key of the row whose key column equals ``text``, or ``None``"""
+        if not self.key_column:
+            return None
+        text = text.strip().lower()
+        return (self.queryset().alias(prefix_key=Lower(self.key_column)).filter(prefix_key=text)
+                .values_list('pk', flat=True).first())
+
+
+class CowLookup(Lookup):
+    model = Cow
+    columns = ('cow_number', 'cow_name')
+    search_columns = ('cow_number', 'cow_name')
+    key_column = 'cow_number'
+    ordering = ('cow_number',)
+    placeholder = gettext_lazy('Cow number or name')
+
+    def label(self, row):
+        # Same text as Cow.__str__
+        return f"{row['cow_number']} - {row['cow_name'] or 'Unnamed'}"
+
+
+class AIRecordLookup(Lookup):
+    model = ArtificialInsemination
+    columns = ('cow__cow_number', 'ai_date', 'bull_id')
+    search_columns = ('bull_id',)
+    ordering = ('-ai_date',)
+    placeholder = gettext_lazy('Bull ID')
+
+    def label(self, row):
+        label = f"{row['cow__cow_number']} - AI on {row['ai_date']}"
+        return f"{label} ({row['bull_id']})" if row['bull_id'] else label
+
+    def suggest(self, term, limit, cow=None):
+        if not cow:
+            return super().suggest(term, limit)
+        # A cow has a handful of services: read them off the cow index, newest first
+        queryset = self.choices().filter(cow_id=cow).order_by('-ai_date', '-pk')
+        if term:
+            queryset = queryset.filter(bull_id__istartswith=term)
+        return [{'id': row['pk'], 'label': self.label(row)} for row in self.rows(queryset, limit)]
+
+
+class WorkerLookup(Lookup):
+    model = Worker
+    columns = ('employee_id', 'user__first_name', 'user__last_name')
+    search_columns = ('employee_id', 'user__first_name', 'user__last_name')
+    key_column = 'employee_id'
+    ordering = ('employee_id',)
+    placeholder = gettext_lazy('Employee ID or name')
+
+    def choices(self):
+        # Tasks and cows go to current staff only
+        return Worker.objects.filter(is_active=True)
+
+    def label(self, row):
+        # Same text as Worker.__str__
+        name = f"{row['user__first_name']} {row['user__last_name']}".strip()
+        return f"{name} - {row['employee_id']}"
+
+
+LOOKUPS = {
+    'cows': CowLookup(),
+    'ai_records': AIRecordLookup(),
+    'workers': WorkerLookup(),
+}
+
+
+def suggest(lookup, term, cow=None):
+    """Suggestions from ``LOOKUPS[lookup]`` for ``term``; ``cow`` narrows AI records to one cow"""
+    params = {'cow': cow} if lookup == 'ai_records' else {}
+    return LOOKUPS[lookup].suggest(term.strip()[:100], settings.AUTOCOMPLETE_LIMIT, **params)
+
+
+class AutocompleteWidget(forms.Widget):
+    """
+    Hidden id input plus a search box for a ``ModelChoiceField``.
+
+    ``forward`` names another autocomplete field of the form whose value is
+    sent along with every search (``ai_record`` forwards ``cow``).
+    """
+
+    def __init__(self, lookup, forward=None, attrs=None):
+        super().__init__(attrs)
+        self.lookup_name = lookup
+        self.forward = forward
+
+    @property
+    def lookup(self):
+        return LOOKUPS[self.lookup_name]
+
+    def value_from_datadict(self, data, files, name):
+        value = data.get(name)
+        if value not in (None, ''):
+            return value
+        text = (data.get(f'{name}_search') or '').strip()
+        if not text:
+            return None
+        # No id picked (no JavaScript, or the text was typed out in full): an exact key still counts
+        pk = self.lookup.resolve(text)
+        return pk if pk is not None else NO_MATCH
+
+    def render(self, name, value, attrs=None, renderer=None):
+        attrs = self.build_attrs(self.attrs, attrs)
+        label = self.lookup.label_for(value) if str(value).isdigit() else None
+        pk = value if label else ''
+        attrs.setdefault('placeholder', self.lookup.placeholder)
+        search_attrs = {'type': 'text', 'name': f'{name}_search', 'value': label or '', 'autocomplete': 'off',
+                        'role': 'combobox', 'aria-autocomplete': 'list', **attrs}
+        return format_html(
+            '<span class="autocomplete" data-autocomplete="{}" data-forward="{}" data-empty="{}">'
+            '<input type="hidden" name="{}" value="{}">'
+            '<input{}>'
+            '<ul class="autocomplete-results" role="listbox" hidden></ul>'
+            '</span>',
+            reverse('autocomplete', args=[self.lookup_name]), self.forward or '', _('No matches'),
+            name, pk, flatatt(search_attrs),
+        )
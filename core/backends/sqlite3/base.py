@@ -0,0 +1,61 @@
+"""
+SQLite backend tuned for several gunicorn workers writing to one file.
+
+Every new connection switches the database to WAL, so readers never block the
+writer and the writer never blocks readers, and relaxes ``synchronous`` to
+``NORMAL`` (a power cut can lose the last commits but never corrupts the
+file). ``mmap_size`` and ``cache_size`` keep the hot pages in memory.
+
+``atomic()`` blocks start with ``BEGIN IMMEDIATE`` instead of ``BEGIN``. A
+deferred transaction that reads first and writes later (every form save in an
+API batch, for instance) cannot wait for the write lock: SQLite fails it with
+"database is locked" straight away, whatever the busy timeout. Taking the lock
+up front lets writers wait for each other instead.
+
+If the lock stays busy past the busy timeout (``SQLITE_BUSY_TIMEOUT``),
+``BEGIN IMMEDIATE`` is retried ``SQLITE_BEGIN_RETRIES`` times with a short
+random backoff; nothing has run yet at that point, so the retry is safe.
+There is no lock of our own on top of SQLite's, so statements outside a
+transaction, reads and writes alike, only ever wait on SQLite itself. Code
+that only reads should stay out of ``atomic()``: the block would take the
+write lock like any writer and queue behind the others.
+
+``manage.py benchmark_writes`` runs the web workers' write mix from several
+processes against a scratch copy of the database. SQLite's busy handler
+sleeps and polls rather than queueing, so under that load the median write
+stays in single-digit milliseconds but the slowest ones wait seconds.
+"""
+import random
+import time
+
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+from django.db.utils import OperationalError
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.setdefault('timeout', settings.SQLITE_BUSY_TIMEOUT)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        conn.execute(f'PRAGMA mmap_size = {int(settings.SQLITE_MMAP_SIZE)}')
+        # Negative values are KiB rather than pages
+        conn.execute(f'PRAGMA cache_size = {-int(settings.SQLITE_CACHE_SIZE_KB)}')
+        conn.execute('PRAGMA temp_store = MEMORY')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        retries = settings.SQLITE_BEGIN_RETRIES
+        for attempt in range(retries + 1):
+            try:
+                self.cursor().execute('BEGIN IMMEDIATE')
+                return
+            except OperationalError as error:
+                if 'locked' not in str(error) or attempt == retries:
+                    raise
+                time.sleep(random.uniform(0.01, 0.05) * 2 ** attempt)
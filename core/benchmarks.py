@@ -0,0 +1,255 @@
+"""
+Page benchmarks over every URL in ``core.urls``.
+
+``run_benchmarks`` requests each GET page through Django's test client as a
+logged-in user, so the whole middleware and view stack runs without a web
+server. For each page it records the first (cold cache) request, then the
+p50, p95 and mean of ``repeat`` more, the SQL queries per request, the
+response size and the peak memory allocated while serving one request
+(measured by ``tracemalloc`` in a separate request, because tracing slows
+everything down).
+
+Routes with ``<int:pk>``-style arguments are filled in with the middle row of
+the matching table, so the same seeded database (``manage.py seed_farm``)
+gives the same URLs on every commit. ``<str:name>`` routes are requested once
+per API resource, ``<str:kind>`` routes once per export. Routes that only
+accept POST or that would end the session are skipped and listed as such.
+
+Pages are rendered with the plain ``StaticFilesStorage``: the manifest storage
+of the settings fails every page that links a static file until
+``collectstatic`` has run, and a benchmark should not depend on that.
+
+Results are plain JSON (see ``manage.py benchmark_urls --output``) and
+``compare`` lines up two result files.
+"""
+import datetime
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from . import api
+from .autocomplete import LOOKUPS
+from .exporters import EXPORTS
+from .models import (ArtificialInsemination, Cow, Doctor, Medicine, Pregnancy, Task, TaskTemplate, User,
+                     Vaccination, VeterinaryVisit, Worker)
+from .urls import urlpatterns
+
+RESULTS_VERSION = 1
+# Resolves {% static %} without the manifest that collectstatic writes
+STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
+SKIPPED = {
+    'logout': 'ends the session',
+    'api_batch': 'POST only',
+}
+# Model whose rows fill the ``pk`` argument of each route
+PK_MODELS = {
+    'worker_delete': Worker,
+    'task_detail': Task,
+    'task_update': Task,
+    'task_delete': Task,
+    'task_template_update': TaskTemplate,
+    'task_template_delete': TaskTemplate,
+    'cow_detail': Cow,
+    'cow_timeline': Cow,
+    'cow_update': Cow,
+    'cow_delete': Cow,
+    'doctor_update': Doctor,
+    'visit_detail': VeterinaryVisit,
+    'ai_detail': ArtificialInsemination,
+    'pregnancy_update': Pregnancy,
+}
+ARGUMENT_MODELS = {
+    'cow_id': Cow,
+    'visit_id': VeterinaryVisit,
+}
+CHOICES = {
+    'kind': sorted(EXPORTS),
+    'lookup': sorted(LOOKUPS),
+    'name': sorted(api.RESOURCES),
+}
+COUNTED_MODELS = (User, Worker, Task, TaskTemplate, Cow, Doctor, VeterinaryVisit, Medicine, ArtificialInsemination,
+                  Pregnancy, Vaccination)
+
+
+class SkipURL(Exception):
+    pass
+
+
+def middle_pk(model):
+    """The primary key in the middle of ``model``'s table, so reseeding picks the same row"""
+    pks = model.objects.order_by('pk').values_list('pk', flat=True)
+    count = pks.count()
+    if not count:
+        raise SkipURL(f'no {model._meta.verbose_name} rows')
+    return pks[count // 2]
+
+
+def url_cases(names=None):
+    """``[(label, url or None, skip reason or None)]`` for every route in ``core.urls``"""
+    cases = []
+    for pattern in urlpatterns:
+        name = pattern.name
+        if names and not any(part in name for part in names):
+            continue
+        if name in SKIPPED:
+            cases.append((name, None, SKIPPED[name]))
+            continue
+        arguments = list(pattern.pattern.converters)
+        variants = [{}]
+        for argument in arguments:
+            if argument in CHOICES:
+                variants = [dict(variant, **{argument: choice}) for variant in variants for choice in CHOICES[argument]]
+        for variant in variants:
+            label = name + ''.join(f'[{value}]' for value in variant.values())
+            try:
+                kwargs = dict(variant)
+                for argument in arguments:
+                    if argument in kwargs:
+                        continue
+                    if argument in ARGUMENT_MODELS:
+                        kwargs[argument] = middle_pk(ARGUMENT_MODELS[argument])
+                    elif argument == 'pk' and name == 'api_item':
+                        kwargs[argument] = middle_pk(api.RESOURCES[kwargs['name']].model)
+                    elif argument == 'pk' and name in PK_MODELS:
+                        kwargs[argument] = middle_pk(PK_MODELS[name])
+                    else:
+                        raise SkipURL(f'no sample value for <{argument}>')
+            except SkipURL as reason:
+                cases.append((label, None, str(reason)))
+                continue
+            cases.append((label, reverse(name, kwargs=kwargs), None))
+    return cases
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _fetch(client, url):
+    """``(response, body size, queries)`` of one GET, with streamed bodies read to the end"""
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        response = client.get(url, secure=True)
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+    return response, size, counter.count
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def measure(client, url, repeat):
+    started = time.perf_counter()
+    response, size, first_queries = _fetch(client, url)
+    first = time.perf_counter() - started
+    queries = first_queries
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        _, _, queries = _fetch(client, url)
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        _fetch(client, url)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    ms = lambda seconds: round(seconds * 1000, 2)
+    return {
+        'url': url,
+        'status': response.status_code,
+        'first_ms': ms(first),
+        'p50_ms': ms(_percentile(timings, 0.5)) if timings else ms(first),
+        'p95_ms': ms(_percentile(timings, 0.95)) if timings else ms(first),
+        'mean_ms': ms(statistics.fmean(timings)) if timings else ms(first),
+        'first_queries': first_queries,
+        'queries': queries,
+        'bytes': size,
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def _git(*args):
+    try:
+        return subprocess.run(['git', *args], cwd=settings.BASE_DIR, capture_output=True, text=True,
+                              timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ''
+
+
+def environment(user, repeat):
+    return {
+        'version': RESULTS_VERSION,
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'commit': _git('rev-parse', 'HEAD'),
+        'dirty': bool(_git('status', '--porcelain', '--untracked-files=no')),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'debug': settings.DEBUG,
+        'user': user.username,
+        'repeat': repeat,
+        'rows': {str(model._meta.verbose_name_plural): model.objects.count() for model in COUNTED_MODELS},
+    }
+
+
+def default_host():
+    hosts = [host for host in settings.ALLOWED_HOSTS if host != '*' and not host.startswith('.')]
+    return hosts[0] if hosts else 'localhost'
+
+
+@override_settings(STATICFILES_STORAGE=STATICFILES_STORAGE)
+def run_benchmarks(user, repeat=20, names=None, host=None, progress=None):
+    """Benchmark every route as ``user``; return the results as a JSON-ready dict"""
+    client = Client(HTTP_HOST=host or default_host())
+    client.force_login(user)
+    results = environment(user, repeat)
+    results['urls'] = urls = {}
+    results['skipped'] = skipped = {}
+    for label, url, reason in url_cases(names):
+        if url is None:
+            skipped[label] = reason
+            continue
+        urls[label] = measure(client, url, repeat)
+        if progress:
+            progress(label, urls[label])
+    return results
+
+
+def compare(old, new, threshold=10.0):
+    """
+    ``[(label, old row, new row, regressed)]`` for the pages in both result
+    sets. A page regressed when its p50 grew by more than ``threshold``
+    percent (and at least a millisecond) or it runs more queries.
+    """
+    rows = []
+    for label, after in new['urls'].items():
+        before = old['urls'].get(label)
+        if before is None:
+            continue
+        slower = after['p50_ms'] - before['p50_ms']
+        regressed = ((slower >= 1 and slower > before['p50_ms'] * threshold / 100)
+                     or after['queries'] > before['queries'])
+        rows.append((label, before, after, regressed))
+    return rows
@@ -0,0 +1,49 @@
+"""
+Concurrent ORM reads for the dashboards and the cow page.
+
+``gather`` runs independent reads on a small thread pool. Every pool thread
+holds its own database connection, so the queries overlap on the server and
+the view waits for one round trip instead of one per query. The pool size
+(``CONCURRENT_QUERY_THREADS``) caps the extra connections each process opens;
+with 0 (the default for the local SQLite database, where there is no network
+round trip to overlap) the reads simply run one after the other. Pooled
+connections are recycled by ``CONN_MAX_AGE`` like request ones. Pool
+threads run outside the request's transaction, so only hand them reads that do
+not depend on writes the request has not committed.
+
+Django 4.2 runs every ORM call of an ``async def`` view through
+``sync_to_async`` on a single thread per request, so async views would need
+this pool all the same and add a thread hop for the user, the session and
+template rendering on top. The views using ``gather`` therefore stay sync and
+work the same under WSGI and ASGI.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from .metrics import current_stats
+
+_executor = (ThreadPoolExecutor(max_workers=settings.CONCURRENT_QUERY_THREADS, thread_name_prefix='orm-read')
+             if settings.CONCURRENT_QUERY_THREADS > 0 else None)
+
+
+def _read(call, stats):
+    close_old_connections()
+    try:
+        if stats is None:
+            return call()
+        # Count the pooled queries towards the request's metrics
+        with connection.execute_wrapper(stats):
+            return call()
+    finally:
+        close_old_connections()
+
+
+def gather(*calls):
+    """Run the argument-less ``calls`` concurrently on the pool; return their results in order"""
+    if _executor is None:
+        return [call() for call in calls]
+    stats = current_stats()
+    futures = [_executor.submit(_read, call, stats) for call in calls]
+    return [future.result() for future in futures]
@@ -0,0 +1,111 @@
+"""
+Herd counters backing the dashboard statistics.
+
+Every counted row contributes ``+1`` to a handful of keys (see
+``counter_keys``). Signals in ``core.signals`` apply the difference between a
+row's keys before and after each save or delete, so dashboard reads are a
+single lookup on ``HerdCounter``. Queryset ``update()``/``bulk_create()``
+bypass signals; ``manage.py rebuild_counters`` recomputes everything from the
+source tables.
+"""
+from collections import Counter
+
+from django.apps import apps as django_apps
+from django.db import transaction
+from django.db.models import Count, F
+
+
+def task_status_key(status, worker_id=None):
+    if worker_id is None:
+        return f'tasks.status.{status}'
+    return f'tasks.worker.{worker_id}.status.{status}'
+
+
+def counter_keys(instance):
+    """Keys ``instance`` currently contributes to, keyed on model name"""
+    model_name = instance._meta.model_name
+    if model_name == 'worker':
+        return ['workers.active'] if instance.is_active else []
+    if model_name == 'task':
+        return ['tasks.total', task_status_key(instance.status),
+                task_status_key(instance.status, instance.assigned_to_id)]
+    if model_name == 'cow':
+        return ['cows.active'] if instance.is_active else []
+    if model_name == 'doctor':
+        return ['doctors.active'] if instance.is_active else []
+    if model_name == 'artificialinsemination':
+        return [f'ai.status.{instance.success_status}']
+    if model_name == 'pregnancy':
+        return [f'pregnancies.status.{instance.pregnancy_status}']
+    return []
+
+
+def apply_deltas(deltas):
+    """Add ``deltas`` (key -> int) to the stored counters atomically"""
+    HerdCounter = django_apps.get_model('core', 'HerdCounter')
+    with transaction.atomic():
+        for key, delta in sorted(deltas.items()):
+            if not delta:
+                continue
+            if not HerdCounter.objects.filter(key=key).update(value=F('value') + delta):
+                counter, created = HerdCounter.objects.get_or_create(key=key, defaults={'value': delta})
+                if not created:
+                    HerdCounter.objects.filter(pk=counter.pk).update(value=F('value') + delta)
+
+
+def get_counters(keys):
+    """Return ``{key: value}`` for ``keys`` in one query, missing keys read as 0"""
+    HerdCounter = django_apps.get_model('core', 'HerdCounter')
+    values = dict(HerdCounter.objects.filter(key__in=keys).values_list('key', 'value'))
+    return {key: values.get(key, 0) for key in keys}
+
+
+def expected_counters(apps=django_apps):
+    """Recompute every counter from the source tables"""
+    get_model = lambda name: apps.get_model('core', name)
+    expected = Counter()
+    expected['workers.active'] = get_model('Worker').objects.filter(is_active=True).count()
+    expected['cows.active'] = get_model('Cow').objects.filter(is_active=True).count()
+    expected['doctors.active'] = get_model('Doctor').objects.filter(is_active=True).count()
+
+    task_rows = (get_model('Task').objects.order_by()
+                 .values('assigned_to_id', 'status').annotate(n=Count('pk')))
+    for row in task_rows:
+        expected['tasks.total'] += row['n']
+        expected[task_status_key(row['status'])] += row['n']
+        expected[task_status_key(row['status'], row['assigned_to_id'])] += row['n']
+
+    ai_rows = (get_model('ArtificialInsemination').objects.order_by()
+               .values('success_status').annotate(n=Count('pk')))
+    for row in ai_rows:
+        expected[f"ai.status.{row['success_status']}"] += row['n']
+
+    pregnancy_rows = (get_model('Pregnancy').objects.order_by()
+                      .values('pregnancy_status').annotate(n=Count('pk')))
+    for row in pregnancy_rows:
+        expected[f"pregnancies.status.{row['pregnancy_status']}"] += row['n']
+    return expected
+
+
+def find_drift(apps=django_apps):
+    """Return ``{key: (stored, expected)}`` for every counter that is off"""
+    HerdCounter = apps.get_model('core', 'HerdCounter')
+    expected = expected_counters(apps)
+    stored = dict(HerdCounter.objects.values_list('key', 'value'))
+    return {
+        key: (stored.get(key, 0), expected.get(key, 0))
+        for key in set(stored) | set(expected)
+        if stored.get(key, 0) != expected.get(key, 0)
+    }
+
+
+def rebuild_counters(apps=django_apps):
+    """Replace the stored counters with freshly computed values"""
+    HerdCounter = apps.get_model('core', 'HerdCounter')
+    expected = expected_counters(apps)
+    with transaction.atomic():
+        HerdCounter.objects.all().delete()
+        HerdCounter.objects.bulk_create(
+            HerdCounter(key=key, value=value) for key, value in expected.items() if value
+        )
+    return expected
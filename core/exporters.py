@@ -0,0 +1,177 @@
+"""
+Streaming exports of veterinary records.
+
+Rows are pulled with ``values_list().iterator()`` (a server-side cursor on
+PostgreSQL) and serialized in chunks, so memory use stays flat however large
+the table is. Visits carry their ``Medicine`` rows, fetched with one query per
+chunk.
+"""
+import csv
+import json
+import zlib
+from dataclasses import dataclass
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import ArtificialInsemination, Medicine, Pregnancy, VeterinaryVisit, Vaccination
+
+CHUNK_SIZE = 2000
+FLUSH_BYTES = 64 * 1024
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+MEDICINE_COLUMNS = ['medicine_name', 'dosage', 'frequency', 'duration', 'route', 'start_date', 'end_date']
+
+
+@dataclass(frozen=True)
+class ExportSpec:
+    model: type
+    date_field: str
+    doctor_field: str
+    # (output column, ORM lookup)
+    columns: tuple
+
+
+EXPORTS = {
+    'visits': ExportSpec(VeterinaryVisit, 'visit_date', 'doctor', (
+        ('id', 'id'), ('cow', 'cow__cow_number'), ('doctor', 'doctor__name'),
+        ('doctor_license', 'doctor__license_number'), ('visit_date', 'visit_date'),
+        ('visit_time', 'visit_time'), ('visit_type', 'visit_type'),
+        ('reason_for_visit', 'reason_for_visit'), ('symptoms', 'symptoms'), ('diagnosis', 'diagnosis'),
+        ('treatment_given', 'treatment_given'), ('doctor_instructions', 'doctor_instructions'),
+        ('next_visit_date', 'next_visit_date'), ('visit_cost', 'visit_cost'), ('notes', 'notes'),
+        ('recorded_by', 'recorded_by__username'),
+    )),
+    'ai': ExportSpec(ArtificialInsemination, 'ai_date', 'doctor', (
+        ('id', 'id'), ('cow', 'cow__cow_number'), ('doctor', 'doctor__name'),
+        ('doctor_license', 'doctor__license_number'), ('ai_date', 'ai_date'), ('ai_time', 'ai_time'),
+        ('bull_breed', 'bull_breed'), ('bull_id', 'bull_id'), ('semen_source', 'semen_source'),
+        ('heat_detection_date', 'heat_detection_date'), ('technician_name', 'technician_name'),
+        ('success_status', 'success_status'), ('expected_calving_date', 'expected_calving_date'),
+        ('cost', 'cost'), ('notes', 'notes'), ('recorded_by', 'recorded_by__username'),
+    )),
+    'pregnancies': ExportSpec(Pregnancy, 'confirmation_date', 'confirmed_by', (
+        ('id', 'id'), ('cow', 'cow__cow_number'), ('ai_record', 'ai_record_id'),
+        ('confirmed_by', 'confirmed_by__name'), ('doctor_license', 'confirmed_by__license_number'),
+        ('confirmation_date', 'confirmation_date'), ('pregnancy_status', 'pregnancy_status'),
+        ('expected_delivery_date', 'expected_delivery_date'), ('actual_delivery_date', 'actual_delivery_date'),
+        ('pregnancy_duration', 'pregnancy_duration'), ('calf_gender', 'calf_gender'),
+        ('calf_weight', 'calf_weight'), ('delivery_type', 'delivery_type'),
+        ('complications', 'complications'), ('doctor_notes', 'doctor_notes'),
+        ('recorded_by', 'recorded_by__username'),
+    )),
+    'vaccinations': ExportSpec(Vaccination, 'vaccination_date', 'administered_by', (
+        ('id', 'id'), ('cow', 'cow__cow_number'), ('vaccine_name', 'vaccine_name'),
+        ('disease_prevention', 'disease_prevention'), ('vaccination_date', 'vaccination_date'),
+        ('next_due_date', 'next_due_date'), ('batch_number', 'batch_number'),
+        ('administered_by', 'administered_by__name'), ('doctor_license', 'administered_by__license_number'),
+        ('dosage', 'dosage'), ('route', 'route'), ('notes', 'notes'), ('recorded_by', 'recorded_by__username'),
+    )),
+}
+
+
+def export_queryset(kind, start_date=None, end_date=None, cow_number=None, doctor_license=None):
+    spec = EXPORTS[kind]
+    queryset = spec.model.objects.order_by(spec.date_field, 'pk')
+    if start_date:
+        queryset = queryset.filter(**{f'{spec.date_field}__gte': start_date})
+    if end_date:
+        queryset = queryset.filter(**{f'{spec.date_field}__lte': end_date})
+    if cow_number:
+        queryset = queryset.filter(cow__cow_number=cow_number)
+    if doctor_license:
+        queryset = queryset.filter(**{f'{spec.doctor_field}__license_number': doctor_license})
+    return queryset.values_list(*(lookup for _, lookup in spec.columns))
+
+
+def _records(kind, queryset):
+    """Yield one dict per exported row"""
+    headers = [name for name, _ in EXPORTS[kind].columns]
+    rows = queryset.iterator(chunk_size=CHUNK_SIZE)
+    while True:
+        chunk = list(islice(rows, CHUNK_SIZE))
+        if not chunk:
+            return
+        records = [dict(zip(headers, row)) for row in chunk]
+        if kind == 'visits':
+            medicines = {}
+            medicine_rows = (Medicine.objects.filter(visit_id__in=[record['id'] for record in records])
+                             .order_by('visit_id', 'start_date', 'pk')
+                             .values_list('visit_id', *MEDICINE_COLUMNS))
+            for visit_id, *values in medicine_rows:
+                medicines.setdefault(visit_id, []).append(dict(zip(MEDICINE_COLUMNS, values)))
+            for record in records:
+                record['medicines'] = medicines.get(record['id'], [])
+        yield from records
+
+
+class _Echo:
+    """File-like object whose ``write`` returns the value, for streaming csv.writer output"""
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(kind, records):
+    writer = csv.writer(_Echo())
+    headers = [name for name, _ in EXPORTS[kind].columns]
+    if kind == 'visits':
+        headers.append('medicines')
+    yield writer.writerow(headers)
+    for record in records:
+        values = [record[name] for name in headers if name != 'medicines']
+        if kind == 'visits':
+            values.append('; '.join(
+                ' '.join(str(medicine[column]) for column in ('medicine_name', 'dosage', 'frequency', 'duration')
+                         if medicine[column])
+                for medicine in record['medicines']
+            ))
+        yield writer.writerow(['' if value is None else value for value in values])
+
+
+def _ndjson_lines(records):
+    for record in records:
+        yield json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def _buffered(lines):
+    """Group small lines into ~64 KB byte chunks"""
+    buffer = []
+    size = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        buffer.append(data)
+        size += len(data)
+        if size >= FLUSH_BYTES:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def _gzipped(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(kind, format='csv', compress=False, **filters):
+    """Return an iterator of byte chunks for the requested export"""
+    records = _records(kind, export_queryset(kind, **filters))
+    lines = _csv_lines(kind, records) if format == 'csv' else _ndjson_lines(records)
+    chunks = _buffered(lines)
+    return _gzipped(chunks) if compress else chunks
+
+
+def export_filename(kind, format, compress):
+    extension = FORMATS[format][1]
+    return f'{kind}.{extension}.gz' if compress else f'{kind}.{extension}'
+
+
+def export_content_type(format, compress):
+    return 'application/gzip' if compress else FORMATS[format][0]
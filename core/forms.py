@@ -1,6 +1,8 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
-from .models import (User, Worker, Task, Cow, Doctor, VeterinaryVisit, 
+from django.utils.dates import WEEKDAYS
+from .autocomplete import AutocompleteWidget
+from .models import (User, Worker, Task, TaskTemplate, Cow, Doctor, VeterinaryVisit, 
                      Medicine, ArtificialInsemination, Pregnancy, Vaccination)
 
 
@@ -48,11 +50,61 @@ class TaskForm(forms.ModelForm):
         model = Task
         fields = ['title', 'description', 'assigned_to', 'notes', 'deadline', 'status']
         widgets = {
+            'assigned_to': AutocompleteWidget('workers'),
             'description': forms.Textarea(attrs={'rows': 4}),
             'notes': forms.Textarea(attrs={'rows': 3}),
         }
 
 
+class TaskTemplateForm(forms.ModelForm):
+    """Form for recurring task templates"""
+    weekdays = forms.TypedMultipleChoiceField(
+        choices=sorted(WEEKDAYS.items()), coerce=int, required=False,
+        widget=forms.CheckboxSelectMultiple
+    )
+    workers = forms.ModelMultipleChoiceField(
+        queryset=Worker.objects.none(), required=False,
+        widget=forms.SelectMultiple(attrs={'size': 8})
+    )
+    
+    class Meta:
+        model = TaskTemplate
+        fields = ['title', 'description', 'notes', 'frequency', 'weekdays', 'month_day', 'due_time',
+                  'start_date', 'end_date', 'all_workers', 'workers', 'is_active']
+        widgets = {
+            'description': forms.Textarea(attrs={'rows': 4}),
+            'notes': forms.Textarea(attrs={'rows': 3}),
+            'due_time': forms.TimeInput(attrs={'type': 'time'}, format='%H:%M'),
+            'start_date': forms.DateInput(attrs={'type': 'date'}, format='%Y-%m-%d'),
+            'end_date': forms.DateInput(attrs={'type': 'date'}, format='%Y-%m-%d'),
+        }
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['workers'].queryset = Worker.objects.filter(is_active=True).select_related('user')
+        self.fields['month_day'].widget.attrs.update({'min': 1, 'max': 31})
+        if self.instance.pk:
+            self.initial['weekdays'] = sorted(self.instance.weekday_numbers())
+    
+    def clean_weekdays(self):
+        return ','.join(str(day) for day in sorted(self.cleaned_data['weekdays']))
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        frequency = cleaned_data.get('frequency')
+        if frequency == 'weekly' and not cleaned_data.get('weekdays'):
+            self.add_error('weekdays', 'Pick at least one weekday.')
+        month_day = cleaned_data.get('month_day')
+        if frequency == 'monthly' and not (month_day and 1 <= month_day <= 31):
+            self.add_error('month_day', 'Enter a day of the month from 1 to 31.')
+        if not cleaned_data.get('all_workers') and not cleaned_data.get('workers'):
+            self.add_error('workers', 'Pick workers or assign the template to all workers.')
+        start_date, end_date = cleaned_data.get('start_date'), cleaned_data.get('end_date')
+        if start_date and end_date and end_date < start_date:
+            self.add_error('end_date', 'The end date is before the start date.')
+        return cleaned_data
+
+
 class CowForm(forms.ModelForm):
     """Form for adding/editing cows"""
     last_checkup = forms.DateField(
@@ -63,11 +115,123 @@ class CowForm(forms.ModelForm):
     class Meta:
         model = Cow
         fields = ['cow_number', 'cow_name', 'breed', 'age', 'color', 
-                  'identification_mark', 'health_status', 'last_checkup', 'notes', 'photo', 'is_active']
+                  'identification_mark', 'health_status', 'last_checkup', 'notes', 'photo', 'caretaker', 'is_active']
         widgets = {
+            'caretaker': AutocompleteWidget('workers'),
             'identification_mark': forms.Textarea(attrs={'rows': 3}),
             'notes': forms.Textarea(attrs={'rows': 3}),
         }
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['caretaker'].queryset = Worker.objects.filter(is_active=True)
+
+
+class HerdImportForm(forms.Form):
+    """Upload form for bulk herd import"""
+    cows = forms.FileField(required=False)
+    vaccinations = forms.FileField(required=False)
+    visits = forms.FileField(required=False)
+    batch_size = forms.IntegerField(min_value=1, max_value=10000, required=False, initial=1000)
+    dry_run = forms.BooleanField(required=False)
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        if not any(cleaned_data.get(name) for name in ('cows', 'vaccinations', 'visits')):
+            raise forms.ValidationError('Upload at least one file.')
+        return cleaned_data
+
+
+class RecordExportForm(forms.Form):
+    """Filters and output options for veterinary record exports"""
+    FORMAT_CHOICES = (
+        ('csv', 'CSV'),
+        ('ndjson', 'NDJSON'),
+    )
+    
+    format = forms.ChoiceField(choices=FORMAT_CHOICES, required=False)
+    gzip = forms.BooleanField(required=False)
+    start_date = forms.DateField(required=False)
+    end_date = forms.DateField(required=False)
+    cow = forms.CharField(max_length=50, required=False, help_text='Cow number')
+    doctor = forms.CharField(max_length=100, required=False, help_text='Doctor license number')
+    
+    def clean_format(self):
+        return self.cleaned_data['format'] or 'csv'
+
+
+class ReminderFilterForm(forms.Form):
+    """Period and worker filters for the due list"""
+    PERIOD_CHOICES = (
+        ('day', 'Day'),
+        ('week', 'Week'),
+        ('overdue', 'Overdue'),
+    )
+    
+    period = forms.ChoiceField(choices=PERIOD_CHOICES, required=False)
+    date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}), required=False)
+    worker = forms.ModelChoiceField(queryset=Worker.objects.filter(is_active=True).select_related('user'),
+                                    required=False)
+    
+    def clean_period(self):
+        return self.cleaned_data['period'] or 'week'
+
+
+class CowFilterForm(forms.Form):
+    """Status filter and sort order for the herd list"""
+    STATUS_CHOICES = (
+        ('', 'All'),
+        ('pregnant', 'Pregnant'),
+        ('medication', 'On medication'),
+        ('vaccination_due', 'Vaccination due'),
+        ('no_recent_visit', 'No recent visit'),
+    )
+    SORT_CHOICES = (
+        ('number', 'Cow number'),
+        ('last_visit', 'Longest since last visit'),
+        ('next_vaccination', 'Next vaccination due'),
+        ('calving', 'Expected calving'),
+    )
+    
+    status = forms.ChoiceField(choices=STATUS_CHOICES, required=False)
+    sort = forms.ChoiceField(choices=SORT_CHOICES, required=False)
+    
+    def clean_sort(self):
+        return self.cleaned_data['sort'] or 'number'
+
+
+class SearchForm(forms.Form):
+    """Query and filters for the global record search"""
+    KIND_CHOICES = (
+        ('', 'Everything'),
+        ('cow', 'Cows'),
+        ('visit', 'Veterinary Visits'),
+    )
+    
+    q = forms.CharField(max_length=200, required=False)
+    kind = forms.ChoiceField(choices=KIND_CHOICES, required=False)
+    start_date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}), required=False)
+    end_date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}), required=False)
+    cow = forms.CharField(max_length=50, required=False, help_text='Cow number')
+    doctor = forms.CharField(max_length=100, required=False, help_text='Doctor license number')
+    
+    def clean_cow(self):
+        number = self.cleaned_data['cow']
+        if not number:
+            return None
+        cow = Cow.objects.filter(cow_number=number).first()
+        if cow is None:
+            raise forms.ValidationError('Unknown cow number.')
+        return cow
+    
+    def clean_doctor(self):
+        license_number = self.cleaned_data['doctor']
+        if not license_number:
+            return None
+        doctor = Doctor.objects.filter(license_number=license_number).first()
+        if doctor is None:
+            raise forms.ValidationError('Unknown doctor license number.')
+        return doctor
 
 
 class DoctorForm(forms.ModelForm):
@@ -93,6 +257,7 @@ class VeterinaryVisitForm(forms.ModelForm):
                   'symptoms', 'diagnosis', 'treatment_given', 'doctor_instructions', 
                   'next_visit_date', 'visit_cost', 'notes']
         widgets = {
+            'cow': AutocompleteWidget('cows'),
             'reason_for_visit': forms.Textarea(attrs={'rows': 2}),
             'symptoms': forms.Textarea(attrs={'rows': 3}),
             'diagnosis': forms.Textarea(attrs={'rows': 3}),
@@ -116,6 +281,12 @@ class MedicineForm(forms.ModelForm):
         }
 
 
+class VisitMedicineForm(MedicineForm):
+    """Medicine form that takes the visit as a field, for the JSON API"""
+    class Meta(MedicineForm.Meta):
+        fields = ['visit'] + MedicineForm.Meta.fields
+
+
 class ArtificialInseminationForm(forms.ModelForm):
     """Form for AI records"""
     ai_date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
@@ -129,6 +300,7 @@ class ArtificialInseminationForm(forms.ModelForm):
                   'semen_source', 'heat_detection_date', 'technician_name', 
                   'success_status', 'expected_calving_date', 'cost', 'notes']
         widgets = {
+            'cow': AutocompleteWidget('cows'),
             'notes': forms.Textarea(attrs={'rows': 2}),
         }
 
@@ -145,9 +317,18 @@ class PregnancyForm(forms.ModelForm):
                   'expected_delivery_date', 'actual_delivery_date', 'pregnancy_duration',
                   'calf_gender', 'calf_weight', 'delivery_type', 'complications', 'doctor_notes']
         widgets = {
+            'cow': AutocompleteWidget('cows'),
+            'ai_record': AutocompleteWidget('ai_records', forward='cow'),
             'complications': forms.Textarea(attrs={'rows': 3}),
             'doctor_notes': forms.Textarea(attrs={'rows': 3}),
         }
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        cow, ai_record = cleaned_data.get('cow'), cleaned_data.get('ai_record')
+        if cow and ai_record and ai_record.cow_id != cow.pk:
+            self.add_error('ai_record', 'This AI record belongs to another cow.')
+        return cleaned_data
 
 
 class VaccinationForm(forms.ModelForm):
@@ -160,6 +341,7 @@ class VaccinationForm(forms.ModelForm):
         fields = ['cow', 'vaccine_name', 'disease_prevention', 'vaccination_date', 
                   'next_due_date', 'batch_number', 'administered_by', 'dosage', 'route', 'notes']
         widgets = {
+            'cow': AutocompleteWidget('cows'),
             'notes': forms.Textarea(attrs={'rows': 2}),
         }
 
@@ -169,3 +351,51 @@ class TaskUpdateForm(forms.ModelForm):
     class Meta:
         model = Task
         fields = ['status']
+
+
+class CowGroupForm(forms.Form):
+    """Picks the active cows a group vaccination or treatment applies to; no filter means every active cow"""
+    breed = forms.ChoiceField(required=False)
+    health_status = forms.ChoiceField(required=False)
+    min_age = forms.IntegerField(min_value=0, required=False)
+    max_age = forms.IntegerField(min_value=0, required=False)
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        active = Cow.objects.filter(is_active=True).order_by()
+        for name in ('breed', 'health_status'):
+            values = active.values_list(name, flat=True).distinct().order_by(name)
+            self.fields[name].choices = [('', '')] + [(value, value) for value in values]
+    
+    def cows(self):
+        """The matching cows, or none while the filters are invalid"""
+        queryset = Cow.objects.filter(is_active=True)
+        if not self.is_bound:
+            return queryset
+        if not self.is_valid():
+            return queryset.none()
+        data = self.cleaned_data
+        if data['breed']:
+            queryset = queryset.filter(breed=data['breed'])
+        if data['health_status']:
+            queryset = queryset.filter(health_status=data['health_status'])
+        if data['min_age'] is not None:
+            queryset = queryset.filter(age__gte=data['min_age'])
+        if data['max_age'] is not None:
+            queryset = queryset.filter(age__lte=data['max_age'])
+        return queryset
+
+
+class GroupVaccinationForm(VaccinationForm):
+    """The fields shared by every cow of a group vaccination"""
+    class Meta(VaccinationForm.Meta):
+        fields = [name for name in VaccinationForm.Meta.fields if name != 'cow']
+
+
+class GroupVisitForm(VeterinaryVisitForm):
+    """The fields shared by every cow of a group treatment"""
+    class Meta(VeterinaryVisitForm.Meta):
+        fields = [name for name in VeterinaryVisitForm.Meta.fields if name != 'cow']
+
+
+GroupMedicineFormSet = forms.formset_factory(MedicineForm, extra=3)
@@ -0,0 +1,90 @@
+"""
+Versioned template fragment cache for the dashboards and navigation.
+
+Fragments are stored under a key built from the fragment name, the user,
+their ``user_type``, the session language and the current version of each
+data group the fragment depends on. Saving or deleting a row bumps the version
+of its groups (see ``core.signals``), so stale fragments are never read again
+and simply expire. Fragments that go stale with time alone (overdue counts,
+past-deadline highlighting, anything relative to today) also list the
+``clock`` pseudo-group, which keys them by the current minute instead of a
+version. Use a shared backend (file or Redis, see ``CACHES``) when
+running several gunicorn workers; local memory only invalidates its own process.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+VERSION_PREFIX = 'fragment-version'
+STATS_PREFIX = 'fragment-stats'
+CLOCK_GROUP = 'clock'
+# Seconds a fragment keyed on the clock can lag behind it
+CLOCK_RESOLUTION = 60
+
+
+def get_cache():
+    return caches[settings.FRAGMENT_CACHE_ALIAS]
+
+
+def worker_task_group(worker_id):
+    return f'tasks.worker.{worker_id}'
+
+
+def fragment_groups(instance):
+    """Data groups whose fragments must be invalidated when ``instance`` changes"""
+    model_name = instance._meta.model_name
+    if model_name == 'task':
+        return ['tasks', worker_task_group(instance.assigned_to_id)]
+    if model_name == 'worker':
+        return ['workers']
+    if model_name == 'cow':
+        return ['cows']
+    if model_name in ('doctor', 'veterinaryvisit', 'vaccination', 'artificialinsemination', 'pregnancy'):
+        return ['veterinary']
+    return []
+
+
+def bump_versions(groups):
+    cache = get_cache()
+    for group in set(groups):
+        key = f'{VERSION_PREFIX}:{group}'
+        if not cache.add(key, 1, timeout=None):
+            try:
+                cache.incr(key)
+            except ValueError:
+                # The key expired or was evicted between add() and incr()
+                cache.set(key, 1, timeout=None)
+
+
+def fragment_key(name, user, language, groups):
+    cache = get_cache()
+    version_keys = [f'{VERSION_PREFIX}:{group}' for group in groups if group != CLOCK_GROUP]
+    versions = cache.get_many(version_keys)
+    versions[f'{VERSION_PREFIX}:{CLOCK_GROUP}'] = int(timezone.now().timestamp()) // CLOCK_RESOLUTION
+    version_part = '.'.join(str(versions.get(f'{VERSION_PREFIX}:{group}', 0)) for group in groups)
+    user_type = getattr(user, 'user_type', 'anonymous')
+    return f'fragment:{name}:{user.pk}:{user_type}:{language}:{version_part}'
+
+
+def record_lookup(hit):
+    cache = get_cache()
+    key = f"{STATS_PREFIX}:{'hits' if hit else 'misses'}"
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+
+def fragment_stats():
+    """Return ``{'hits': int, 'misses': int}`` across every process sharing the cache"""
+    cache = get_cache()
+    stats = cache.get_many([f'{STATS_PREFIX}:hits', f'{STATS_PREFIX}:misses'])
+    return {
+        'hits': stats.get(f'{STATS_PREFIX}:hits', 0),
+        'misses': stats.get(f'{STATS_PREFIX}:misses', 0),
+    }
+
+
+def reset_fragment_stats():
+    get_cache().delete_many([f'{STATS_PREFIX}:hits', f'{STATS_PREFIX}:misses'])
@@ -0,0 +1,82 @@
+"""
+Group vaccinations and treatments.
+
+On FMD or HS days the same vaccine, batch and doctor go to hundreds of cows.
+These functions copy one unsaved template row to every selected cow and write
+them with ``bulk_create`` in a single transaction. ``bulk_create`` skips the
+model signals, so the work they would do per row is done once for the group:
+the cows' reminders and status snapshots are refreshed, treatment visits are indexed for search,
+``last_checkup`` moves forward with one ``UPDATE`` and the veterinary and cow
+fragments are invalidated.
+"""
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .fragment_cache import bump_versions
+from .models import Cow, Medicine, Reminder, Vaccination, VeterinaryVisit
+from .reminders import refresh_reminders
+from .search import index_new_visits
+from .status import refresh_status
+
+BATCH_SIZE = 500
+
+
+def _copy(template, **values):
+    """A new unsaved row with the field values of ``template``, overridden by ``values``"""
+    fields = {field.attname: getattr(template, field.attname)
+              for field in template._meta.concrete_fields if not field.primary_key and field.name not in values}
+    fields.update(values)
+    return type(template)(**fields)
+
+
+def _group_written(cow_ids, groups, kind, due_date):
+    """
+    Refresh the status snapshots and reminders the new rows can change.
+    Without a due date of their own the rows can only supersede an open
+    ``kind`` reminder, so only cows with one get their reminders refreshed.
+    """
+    refresh_status(cow_ids)
+    if due_date is None:
+        cow_ids = Reminder.objects.filter(kind=kind, cow_id__in=cow_ids).values_list('cow_id', flat=True).distinct()
+    refresh_reminders(cow_ids)
+    transaction.on_commit(lambda: bump_versions(groups))
+
+
+def record_group_vaccination(template, cow_ids, user):
+    """Give the unsaved ``Vaccination`` ``template`` to every cow in ``cow_ids``; return the new rows"""
+    cow_ids = list(cow_ids)
+    with transaction.atomic():
+        vaccinations = Vaccination.objects.bulk_create(
+            [_copy(template, cow_id=cow_id, recorded_by_id=user.pk) for cow_id in cow_ids],
+            batch_size=BATCH_SIZE,
+        )
+        _group_written(cow_ids, ['veterinary'], 'vaccination', template.next_due_date)
+    return vaccinations
+
+
+def record_group_treatment(template, medicines, cow_ids, user):
+    """
+    Record the unsaved ``VeterinaryVisit`` ``template`` and a copy of each
+    unsaved ``Medicine`` in ``medicines`` for every cow in ``cow_ids``; return
+    the new visits.
+    """
+    cows = Cow.objects.only('cow_number', 'cow_name').in_bulk(cow_ids)
+    cow_ids = list(cows)
+    doctor = template.doctor
+    with transaction.atomic():
+        visits = VeterinaryVisit.objects.bulk_create(
+            [_copy(template, cow=cows[cow_id], doctor=doctor, recorded_by_id=user.pk) for cow_id in cow_ids],
+            batch_size=BATCH_SIZE,
+        )
+        Medicine.objects.bulk_create(
+            [_copy(medicine, visit_id=visit.pk) for visit in visits for medicine in medicines],
+            batch_size=BATCH_SIZE,
+        )
+        # Like visit_create, but a back-dated treatment never moves the checkup backwards
+        (Cow.objects.filter(pk__in=cow_ids)
+         .filter(Q(last_checkup__isnull=True) | Q(last_checkup__lt=template.visit_date))
+         .update(last_checkup=template.visit_date, updated_at=timezone.now()))
+        index_new_visits(visits, medicines)
+        _group_written(cow_ids, ['veterinary', 'cows'], 'follow_up', template.next_visit_date)
+    return visits
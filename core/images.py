@@ -0,0 +1,66 @@
+"""
+Resized renditions of ``Cow.photo``.
+
+Phones upload multi-megabyte JPEGs; the templates serve these renditions
+instead. Each one is auto-rotated from its EXIF orientation, stripped of all
+metadata and written as both JPEG and WebP. The original upload is kept as is.
+"""
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+# field prefix -> bounding box in pixels
+RENDITIONS = {
+    'photo_thumbnail': (320, 320),
+    'photo_medium': (960, 960),
+}
+RENDITION_FIELDS = [name for prefix in RENDITIONS for name in (prefix, f'{prefix}_webp')]
+
+JPEG_QUALITY = 82
+WEBP_QUALITY = 78
+
+
+def _encode(image, format, **options):
+    buffer = BytesIO()
+    # Saving without ``exif=`` drops every metadata block, GPS included
+    image.save(buffer, format=format, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def _delete_files(cow):
+    for name in RENDITION_FIELDS:
+        field_file = getattr(cow, name)
+        if field_file:
+            field_file.delete(save=False)
+
+
+def generate_renditions(cow):
+    """(Re)build every rendition for ``cow.photo``; the caller saves ``cow`` with the returned fields"""
+    _delete_files(cow)
+    if not cow.photo:
+        # Still saved, or the row keeps the names of the files just deleted
+        return RENDITION_FIELDS
+
+    with cow.photo.open('rb') as photo:
+        image = Image.open(photo)
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGB')
+
+    stem = os.path.splitext(os.path.basename(cow.photo.name))[0]
+    for prefix, size in RENDITIONS.items():
+        rendition = image.copy()
+        rendition.thumbnail(size, Image.LANCZOS)
+        suffix = prefix.replace('photo_', '')
+        getattr(cow, prefix).save(
+            f'{stem}_{suffix}.jpg',
+            _encode(rendition, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True),
+            save=False,
+        )
+        getattr(cow, f'{prefix}_webp').save(
+            f'{stem}_{suffix}.webp',
+            _encode(rendition, 'WEBP', quality=WEBP_QUALITY, method=6),
+            save=False,
+        )
+    return RENDITION_FIELDS
@@ -0,0 +1,267 @@
+"""
+Streaming herd import from CSV or XLSX files.
+
+Rows are read lazily, validated with the same rules as ``CowForm``,
+``VaccinationForm`` and ``VeterinaryVisitForm``, and inserted with
+``bulk_create`` one batch (and one transaction) at a time, so memory use does
+not grow with the file. Column headers are the form field names. Cows are
+referenced by ``cow_number`` and doctors by ``license_number``.
+"""
+import csv
+import datetime
+import io
+import os
+import zipfile
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django import forms
+from django.db import transaction
+from django.db.models import Max, OuterRef, Subquery
+from django.utils import timezone
+
+from .counters import rebuild_counters
+from .forms import CowForm, VaccinationForm, VeterinaryVisitForm
+from .fragment_cache import bump_versions
+from .models import Cow, Doctor, VeterinaryVisit, Vaccination
+from .reminders import refresh_reminders
+from .search import index_cows, index_visits
+from .status import refresh_status
+
+DEFAULT_BATCH_SIZE = 1000
+FALSE_VALUES = ('0', 'false', 'no', 'n', 'off')
+
+
+class HerdImportError(Exception):
+    """Raised when an import file cannot be read at all"""
+
+
+def iter_rows(file, filename=None):
+    """Yield ``(line_number, {header: value})`` from a binary CSV or XLSX file object"""
+    name = filename or getattr(file, 'name', '') or ''
+    if os.path.splitext(name)[1].lower() == '.xlsx':
+        yield from _iter_xlsx_rows(file)
+    else:
+        yield from _iter_csv_rows(file)
+
+
+def _iter_csv_rows(file):
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''))
+    for row in reader:
+        yield reader.line_num, {key.strip(): (value or '').strip() for key, value in row.items() if key}
+
+
+def _cell_text(value):
+    """A spreadsheet cell as the text a form field expects"""
+    if value is None:
+        return ''
+    # Date cells come back as datetimes; ``str()`` would add a " 00:00:00" that DateField rejects
+    if isinstance(value, datetime.datetime):
+        return value.date().isoformat() if value.time() == datetime.time() else value.isoformat(sep=' ')
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value).strip()
+
+
+def _iter_xlsx_rows(file):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise HerdImportError('Reading .xlsx files requires the openpyxl package.')
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except (OSError, ValueError, zipfile.BadZipFile) as e:
+        raise HerdImportError(f'Could not read the .xlsx file: {e}')
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        headers = [str(cell).strip() if cell is not None else '' for cell in next(rows, ())]
+        for line_number, values in enumerate(rows, start=2):
+            yield line_number, {header: _cell_text(value) for header, value in zip(headers, values) if header}
+    finally:
+        workbook.close()
+
+
+def _batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+class _LookupField(forms.CharField):
+    """Resolves a natural key against a preloaded ``{key: instance}`` map"""
+
+    def __init__(self, lookup, label, **kwargs):
+        self.lookup = lookup
+        self.lookup_label = label
+        super().__init__(**kwargs)
+
+    def clean(self, value):
+        value = super().clean(value)
+        if not value:
+            return None
+        try:
+            return self.lookup[value]
+        except KeyError:
+            raise forms.ValidationError(f'Unknown {self.lookup_label} "{value}".')
+
+
+class CowImportForm(CowForm):
+    """``CowForm`` without the per-row uniqueness query; batches check it in bulk"""
+
+    class Meta(CowForm.Meta):
+        fields = [name for name in CowForm.Meta.fields if name != 'photo']
+
+    def validate_unique(self):
+        pass
+
+
+class VaccinationImportForm(VaccinationForm):
+    def __init__(self, *args, cows, doctors, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['cow'] = _LookupField(cows, 'cow_number')
+        self.fields['administered_by'] = _LookupField(doctors, 'doctor license_number', required=False)
+
+
+class VisitImportForm(VeterinaryVisitForm):
+    def __init__(self, *args, cows, doctors, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['cow'] = _LookupField(cows, 'cow_number')
+        self.fields['doctor'] = _LookupField(doctors, 'doctor license_number', required=False)
+
+
+def _rebind(form, data):
+    """
+    Point an existing bound ``ModelForm`` at a new row.
+
+    Building a form deep-copies every field and widget, which dominates the
+    cost of validating large files; reusing one form per import avoids that.
+    """
+    form.data = data
+    form.instance = form._meta.model()
+    form._errors = None
+    return form
+
+
+@dataclass
+class ImportResult:
+    kind: str
+    created: int = 0
+    failed: int = 0
+    errors: list = field(default_factory=list)
+
+
+class HerdImporter:
+    """
+    Import cows, then vaccinations and visits that reference them.
+
+    ``on_error(kind, line_number, messages)`` is called for every rejected row;
+    only the first ``max_errors`` are also kept on the returned results.
+    """
+
+    def __init__(self, user=None, batch_size=DEFAULT_BATCH_SIZE, dry_run=False, on_error=None, max_errors=200):
+        self.user = user
+        self.batch_size = max(1, batch_size)
+        self.dry_run = dry_run
+        self.on_error = on_error
+        self.max_errors = max_errors
+
+    def _reject(self, result, line_number, form_errors):
+        messages = [f'{name}: {error}' if name != '__all__' else str(error)
+                    for name, errors in form_errors.items() for error in errors]
+        result.failed += 1
+        if len(result.errors) < self.max_errors:
+            result.errors.append((line_number, messages))
+        if self.on_error:
+            self.on_error(result.kind, line_number, messages)
+
+    def _save(self, model, objects):
+        if objects and not self.dry_run:
+            with transaction.atomic():
+                model.objects.bulk_create(objects, batch_size=self.batch_size)
+
+    def import_cows(self, rows):
+        result = ImportResult('cows')
+        form = CowImportForm({})
+        for batch in _batches(rows, self.batch_size):
+            numbers = [row.get('cow_number', '') for _, row in batch]
+            taken = set(Cow.objects.filter(cow_number__in=numbers).values_list('cow_number', flat=True))
+            cows = []
+            for line_number, row in batch:
+                data = dict(row)
+                if data.get('is_active', '').lower() in FALSE_VALUES:
+                    data['is_active'] = ''
+                elif 'is_active' not in data or not data['is_active']:
+                    data['is_active'] = 'on'
+                if not _rebind(form, data).is_valid():
+                    self._reject(result, line_number, form.errors)
+                    continue
+                if form.cleaned_data['cow_number'] in taken:
+                    self._reject(result, line_number, {'cow_number': ['Cow with this Cow number already exists.']})
+                    continue
+                taken.add(form.cleaned_data['cow_number'])
+                cow = form.save(commit=False)
+                cow.added_by = self.user
+                cows.append(cow)
+            self._save(Cow, cows)
+            if cows and not self.dry_run:
+                index_cows([cow.pk for cow in cows if cow.pk])
+                refresh_status([cow.pk for cow in cows if cow.pk])
+            result.created += len(cows)
+        return result
+
+    def _import_related(self, kind, rows, form_class, model):
+        result = ImportResult(kind)
+        doctors = {doctor.license_number: doctor for doctor in Doctor.objects.all()}
+        cows = {}
+        form = form_class({}, cows=cows, doctors=doctors)
+        for batch in _batches(rows, self.batch_size):
+            numbers = {row.get('cow', '') for _, row in batch}
+            cows.clear()
+            cows.update((cow.cow_number, cow) for cow in Cow.objects.filter(cow_number__in=numbers))
+            objects = []
+            for line_number, row in batch:
+                if not _rebind(form, row).is_valid():
+                    self._reject(result, line_number, form.errors)
+                    continue
+                obj = form.save(commit=False)
+                obj.recorded_by = self.user
+                objects.append(obj)
+            self._save(model, objects)
+            result.created += len(objects)
+            if objects and not self.dry_run:
+                refresh_status({obj.cow_id for obj in objects})
+                refresh_reminders({obj.cow_id for obj in objects})
+            if model is VeterinaryVisit and objects and not self.dry_run:
+                self._update_last_checkup({obj.cow_id for obj in objects})
+                index_visits([obj.pk for obj in objects if obj.pk])
+        return result
+
+    def _update_last_checkup(self, cow_ids):
+        latest_visit = (VeterinaryVisit.objects.filter(cow=OuterRef('pk')).order_by()
+                        .values('cow').annotate(latest=Max('visit_date')).values('latest'))
+        Cow.objects.filter(pk__in=cow_ids).update(last_checkup=Subquery(latest_visit), updated_at=timezone.now())
+
+    def import_vaccinations(self, rows):
+        return self._import_related('vaccinations', rows, VaccinationImportForm, Vaccination)
+
+    def import_visits(self, rows):
+        return self._import_related('visits', rows, VisitImportForm, VeterinaryVisit)
+
+    def run(self, cows=None, vaccinations=None, visits=None):
+        """Import whichever row iterables are given; returns a list of ``ImportResult``"""
+        results = []
+        if cows is not None:
+            results.append(self.import_cows(cows))
+        if vaccinations is not None:
+            results.append(self.import_vaccinations(vaccinations))
+        if visits is not None:
+            results.append(self.import_visits(visits))
+
+        if not self.dry_run and any(result.created for result in results):
+            # bulk_create skips the model signals that keep these current
+            rebuild_counters()
+            transaction.on_commit(lambda: bump_versions(['cows', 'veterinary']))
+        return results
@@ -0,0 +1,83 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks import compare, run_benchmarks
+from core.models import User
+
+
+class Command(BaseCommand):
+    help = 'Times every page in core/urls.py (p50/p95, queries, memory peak) and writes the results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username to log in as (default: the first admin)')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed requests per page after the first (default: 20)')
+        parser.add_argument('--only', action='append', help='Only URL names containing this text; may be repeated')
+        parser.add_argument('--host', help='Host header to send (default: the first ALLOWED_HOSTS entry)')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--compare', help='Earlier results file to compare against')
+        parser.add_argument('--threshold', type=float, default=10.0,
+                            help='Percent p50 slowdown that counts as a regression (default: 10)')
+        parser.add_argument('--fail-on-regression', action='store_true',
+                            help='Exit with status 1 if any page regressed against --compare')
+
+    def handle(self, *args, **options):
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+        else:
+            user = User.objects.filter(user_type='admin', is_active=True).order_by('pk').first()
+        if user is None:
+            raise CommandError('No such user; create one or run manage.py seed_farm first.')
+        if options['repeat'] < 0:
+            raise CommandError('--repeat cannot be negative.')
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare'], encoding='utf-8') as file:
+                    baseline = json.load(file)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Could not read {options["compare"]}: {e}')
+        if settings.DEBUG:
+            self.stdout.write(self.style.WARNING('DEBUG is on; timings include its query logging.'))
+
+        self.stdout.write(f'{"page":<40} {"status":>6} {"first":>9} {"p50":>9} {"p95":>9} {"queries":>7} {"KiB":>9} {"peak KiB":>9}')
+
+        def progress(label, row):
+            self.stdout.write(
+                f'{label:<40} {row["status"]:>6} {row["first_ms"]:>7.1f}ms {row["p50_ms"]:>7.1f}ms '
+                f'{row["p95_ms"]:>7.1f}ms {row["queries"]:>7} {row["bytes"] / 1024:>9.1f} {row["peak_kib"]:>9.1f}'
+            )
+
+        results = run_benchmarks(user, repeat=options['repeat'], names=options['only'], host=options['host'],
+                                 progress=progress)
+        for label, reason in results['skipped'].items():
+            self.stdout.write(self.style.WARNING(f'{label:<40} skipped: {reason}'))
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, indent=2)
+                file.write('\n')
+            self.stdout.write(self.style.SUCCESS(f'Wrote {len(results["urls"])} page result(s) to {options["output"]}.'))
+
+        if baseline is None:
+            return
+        if baseline.get('rows') != results['rows']:
+            self.stdout.write(self.style.WARNING('The row counts differ from the baseline; the databases are not the same.'))
+        regressions = 0
+        self.stdout.write(f'\nAgainst {baseline.get("commit", "")[:12] or options["compare"]}:')
+        for label, before, after, regressed in compare(baseline, results, options['threshold']):
+            change = (after['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0
+            line = (f'{label:<40} p50 {before["p50_ms"]:>7.1f} -> {after["p50_ms"]:>7.1f}ms ({change:+5.0f}%)  '
+                    f'queries {before["queries"]:>3} -> {after["queries"]:>3}')
+            if regressed:
+                regressions += 1
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+        if regressions:
+            self.stdout.write(self.style.ERROR(f'{regressions} page(s) regressed.'))
+            if options['fail_on_regression']:
+                raise SystemExit(1)
+        else:
+            self.stdout.write(self.style.SUCCESS('No regressions.'))
@@ -0,0 +1,118 @@
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.utils import OperationalError
+from django.utils import timezone
+
+from core.forms import TaskUpdateForm
+from core.models import Cow, Doctor, Medicine, Task, VeterinaryVisit
+
+
+def _init_worker():
+    import django
+    django.setup()
+    # Never share the parent's database connection across a fork
+    connections.close_all()
+
+
+def _task_form(rng, task_ids, cow_ids, doctor_ids):
+    with transaction.atomic():
+        task = Task.objects.get(pk=rng.choice(task_ids))
+        form = TaskUpdateForm({'status': rng.choice(['pending', 'in_progress'])}, instance=task)
+        if form.is_valid():
+            form.save()
+
+
+def _visit(rng, task_ids, cow_ids, doctor_ids):
+    today = timezone.localdate()
+    with transaction.atomic():
+        visit = VeterinaryVisit.objects.create(cow_id=rng.choice(cow_ids), doctor_id=rng.choice(doctor_ids),
+                                               visit_date=today, visit_time=timezone.localtime().time(),
+                                               visit_type='routine', reason_for_visit='Write benchmark')
+        Medicine.objects.create(visit=visit, medicine_name='Oxytetracycline', dosage='10 ml',
+                                frequency='Once a day', duration='3 days', start_date=today)
+
+
+def _task_save(rng, task_ids, cow_ids, doctor_ids):
+    task = Task.objects.get(pk=rng.choice(task_ids))
+    task.status = rng.choice(['pending', 'in_progress'])
+    task.save()
+
+
+# (label, share, write) for each kind of write the web workers send
+MIX = (
+    ('task status form in atomic()', 50, _task_form),
+    ('visit with a medicine', 30, _visit),
+    ('plain task.save()', 20, _task_save),
+)
+
+
+def _run(seed, start, seconds, task_ids, cow_ids, doctor_ids):
+    """Write until ``start + seconds``; return ``[(label, milliseconds, failed)]``"""
+    rng = random.Random(seed)
+    weights = [weight for _, weight, _ in MIX]
+    samples = []
+    time.sleep(max(0.0, start - time.time()))
+    while time.time() < start + seconds:
+        label, _, write = rng.choices(MIX, weights)[0]
+        began = time.perf_counter()
+        try:
+            write(rng, task_ids, cow_ids, doctor_ids)
+            failed = False
+        except OperationalError:
+            failed = True
+        samples.append((label, (time.perf_counter() - began) * 1000, failed))
+    connections.close_all()
+    return samples
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+class Command(BaseCommand):
+    help = ('Runs the web workers\' write mix from several processes at once and reports throughput, '
+            '"database is locked" errors and latency. It writes to the configured database: use a scratch copy.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=8, help='Concurrent writer processes (default: 8)')
+        parser.add_argument('--seconds', type=float, default=15, help='How long to write for (default: 15)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed of the first process')
+
+    def handle(self, *args, **options):
+        if options['processes'] < 1 or options['seconds'] <= 0:
+            raise CommandError('--processes must be at least 1 and --seconds positive.')
+        task_ids = list(Task.objects.values_list('pk', flat=True)[:1000])
+        cow_ids = list(Cow.objects.values_list('pk', flat=True)[:1000])
+        doctor_ids = list(Doctor.objects.values_list('pk', flat=True)[:100])
+        if not (task_ids and cow_ids and doctor_ids):
+            raise CommandError('The database needs tasks, cows and doctors; run manage.py seed_farm first.')
+
+        processes, seconds = options['processes'], options['seconds']
+        connections.close_all()
+        # Every process starts writing at the same moment, after the pool has forked
+        start = time.time() + 2
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker) as pool:
+            futures = [pool.submit(_run, options['seed'] + number, start, seconds, task_ids, cow_ids, doctor_ids)
+                       for number in range(processes)]
+            samples = [sample for future in futures for sample in future.result()]
+
+        self.stdout.write(f'{processes} process(es) for {seconds:g}s on {os.cpu_count()} CPU(s), '
+                          f'{connections["default"].vendor}')
+        self.stdout.write(f'{"":<30} {"writes":>7} {"errors":>7} {"p50":>9} {"p99":>9}')
+        for label in [label for label, _, _ in MIX] + ['all']:
+            rows = [sample for sample in samples if label in ('all', sample[0])]
+            timings = [ms for _, ms, failed in rows if not failed]
+            errors = sum(failed for _, _, failed in rows)
+            self.stdout.write(
+                f'{label:<30} {len(timings):>7} {errors:>7} '
+                f'{statistics.median(timings) if timings else 0:>7.1f}ms {_percentile(timings, 0.99):>7.1f}ms'
+            )
+        writes = sum(not failed for _, _, failed in samples)
+        self.stdout.write(self.style.SUCCESS(f'{writes / seconds:.1f} writes/s'))
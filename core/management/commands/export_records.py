@@ -0,0 +1,52 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.exporters import EXPORTS, FORMATS, stream_export
+from core.forms import RecordExportForm
+
+
+class Command(BaseCommand):
+    help = 'Streams veterinary visits, AI, pregnancy or vaccination records as CSV or NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(EXPORTS))
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--gzip', action='store_true', help='Gzip the output')
+        parser.add_argument('--start-date', help='Only records on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--end-date', help='Only records on or before this date (YYYY-MM-DD)')
+        parser.add_argument('--cow', help='Only records for this cow number')
+        parser.add_argument('--doctor', help='Only records for this doctor license number')
+        parser.add_argument('-o', '--output', help='Write to this file instead of standard output')
+
+    def handle(self, *args, **options):
+        form = RecordExportForm({
+            'format': options['format'],
+            'gzip': options['gzip'],
+            'start_date': options['start_date'],
+            'end_date': options['end_date'],
+            'cow': options['cow'],
+            'doctor': options['doctor'],
+        })
+        if not form.is_valid():
+            raise CommandError(form.errors.as_text())
+        filters = form.cleaned_data
+
+        chunks = stream_export(
+            options['kind'],
+            format=filters['format'],
+            compress=filters['gzip'],
+            start_date=filters['start_date'],
+            end_date=filters['end_date'],
+            cow_number=filters['cow'],
+            doctor_license=filters['doctor'],
+        )
+        output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+        finally:
+            if options['output']:
+                output.close()
+            else:
+                output.flush()
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from core.fragment_cache import fragment_stats, reset_fragment_stats
+
+
+class Command(BaseCommand):
+    help = 'Shows dashboard fragment cache hit/miss counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after printing them')
+
+    def handle(self, *args, **options):
+        stats = fragment_stats()
+        lookups = stats['hits'] + stats['misses']
+        ratio = stats['hits'] / lookups * 100 if lookups else 0
+        self.stdout.write(f"Hits: {stats['hits']}  Misses: {stats['misses']}  Hit ratio: {ratio:.1f}%")
+
+        if options['reset']:
+            reset_fragment_stats()
+            self.stdout.write(self.style.SUCCESS('Counters reset.'))
@@ -0,0 +1,58 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+
+from core.images import RENDITION_FIELDS, generate_renditions
+from core.models import Cow
+
+
+def _init_worker():
+    import django
+    django.setup()
+    # Never share the parent's database connection across a fork
+    connections.close_all()
+
+
+def _process(cow_pk):
+    cow = Cow.objects.get(pk=cow_pk)
+    generate_renditions(cow)
+    Cow.objects.filter(pk=cow_pk).update(updated_at=timezone.now(),
+                                         **{name: getattr(cow, name).name for name in RENDITION_FIELDS})
+    return cow.cow_number
+
+
+class Command(BaseCommand):
+    help = 'Generates thumbnail and medium JPEG/WebP renditions for existing cow photos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Number of worker processes (default: number of CPU cores)')
+        parser.add_argument('--force', action='store_true',
+                            help='Regenerate renditions for photos that already have them')
+
+    def handle(self, *args, **options):
+        cows = Cow.objects.exclude(photo='').exclude(photo__isnull=True)
+        if not options['force']:
+            cows = cows.filter(Q(photo_thumbnail__isnull=True) | Q(photo_thumbnail=''))
+        pks = list(cows.values_list('pk', flat=True))
+        if not pks:
+            self.stdout.write(self.style.SUCCESS('No photos need renditions.'))
+            return
+
+        connections.close_all()
+        done = failed = 0
+        with ProcessPoolExecutor(max_workers=max(1, options['workers']), initializer=_init_worker) as pool:
+            futures = {pool.submit(_process, pk): pk for pk in pks}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                    done += 1
+                except Exception as e:
+                    failed += 1
+                    self.stdout.write(self.style.ERROR(f'Cow #{futures[future]}: {e}'))
+
+        self.stdout.write(self.style.SUCCESS(f'Generated renditions for {done} photo(s), {failed} failed.'))
@@ -0,0 +1,24 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.recurring import generate_tasks
+
+
+class Command(BaseCommand):
+    help = 'Creates the tasks of active recurring task templates due in the next few days; safe to rerun'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.RECURRING_TASK_DAYS,
+                            help='Number of days to generate (default: RECURRING_TASK_DAYS)')
+        parser.add_argument('--date', help='First day to generate, YYYY-MM-DD (default: today)')
+
+    def handle(self, *args, **options):
+        start = None
+        if options['date']:
+            try:
+                start = datetime.date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError('--date must be YYYY-MM-DD.')
+        created = generate_tasks(options['days'], start)
+        self.stdout.write(self.style.SUCCESS(f'Created {created} recurring task(s).'))
@@ -0,0 +1,56 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importers import DEFAULT_BATCH_SIZE, HerdImporter, HerdImportError, iter_rows
+
+
+class Command(BaseCommand):
+    help = 'Imports cows, vaccinations and veterinary visits from CSV or XLSX files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cows', help='CSV/XLSX file of cows (columns named after CowForm fields)')
+        parser.add_argument('--vaccinations', help='CSV/XLSX file of vaccinations (cow = cow_number)')
+        parser.add_argument('--visits', help='CSV/XLSX file of veterinary visits (cow = cow_number)')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help=f'Rows per bulk insert and transaction (default: {DEFAULT_BATCH_SIZE})')
+        parser.add_argument('--dry-run', action='store_true', help='Validate every row without saving anything')
+        parser.add_argument('--report', help='Write rejected rows to this CSV file instead of the console')
+
+    def handle(self, *args, **options):
+        paths = {kind: options[kind] for kind in ('cows', 'vaccinations', 'visits') if options[kind]}
+        if not paths:
+            raise CommandError('Pass at least one of --cows, --vaccinations or --visits.')
+
+        report_file = open(options['report'], 'w', newline='', encoding='utf-8') if options['report'] else None
+        report = csv.writer(report_file) if report_file else None
+        if report:
+            report.writerow(['file', 'line', 'errors'])
+
+        def on_error(kind, line_number, messages):
+            if report:
+                report.writerow([paths[kind], line_number, '; '.join(messages)])
+            else:
+                self.stdout.write(self.style.ERROR(f"{paths[kind]}:{line_number}: {'; '.join(messages)}"))
+
+        importer = HerdImporter(batch_size=options['batch_size'], dry_run=options['dry_run'], on_error=on_error)
+        files = {kind: open(path, 'rb') for kind, path in paths.items()}
+        started = time.monotonic()
+        try:
+            results = importer.run(**{kind: iter_rows(file, paths[kind]) for kind, file in files.items()})
+        except (HerdImportError, UnicodeDecodeError, csv.Error) as e:
+            raise CommandError(str(e))
+        finally:
+            for file in files.values():
+                file.close()
+            if report_file:
+                report_file.close()
+
+        elapsed = time.monotonic() - started
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        for result in results:
+            self.stdout.write(self.style.SUCCESS(
+                f'{verb} {result.created} {result.kind}, rejected {result.failed} row(s).'
+            ))
+        self.stdout.write(f'Finished in {elapsed:.1f}s.')
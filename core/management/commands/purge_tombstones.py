@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.sync import purge_tombstones
+
+
+class Command(BaseCommand):
+    help = 'Deletes sync tombstones older than SYNC_TOMBSTONE_DAYS; devices that last synced before then must resync'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.SYNC_TOMBSTONE_DAYS,
+                            help='Keep tombstones from the last N days (default: SYNC_TOMBSTONE_DAYS)')
+
+    def handle(self, *args, **options):
+        deleted = purge_tombstones(options['days'])
+        self.stdout.write(self.style.SUCCESS(f'Purged {deleted} tombstone(s).'))
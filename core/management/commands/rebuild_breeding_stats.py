@@ -0,0 +1,15 @@
+import time
+
+from django.core.management.base import BaseCommand
+from core.analytics import rebuild_breeding_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the breeding performance summary (conception rate, calving interval, days open)'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        rows = rebuild_breeding_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {rows} summary row(s) in {time.monotonic() - started:.1f}s.'
+        ))
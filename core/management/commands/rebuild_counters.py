@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from core.counters import find_drift, rebuild_counters
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the dashboard herd counters from the source tables and reports any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only verify the stored counters; exit with status 1 if any have drifted',
+        )
+
+    def handle(self, *args, **options):
+        drift = find_drift()
+        for key, (stored, expected) in sorted(drift.items()):
+            self.stdout.write(self.style.WARNING(f'{key}: stored {stored}, expected {expected}'))
+
+        if options['check']:
+            if drift:
+                self.stdout.write(self.style.ERROR(f'{len(drift)} counter(s) have drifted.'))
+                raise SystemExit(1)
+            self.stdout.write(self.style.SUCCESS('All counters are up to date.'))
+            return
+
+        counters = rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {len(counters)} counter(s), fixed {len(drift)} drifted value(s).'
+        ))
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+from core.status import find_drift, rebuild_status
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the per-cow status snapshot used to filter and sort the herd list'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only verify the stored snapshots; exit with status 1 if any have drifted',
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            drift = find_drift()
+            for cow_id, fields in sorted(drift.items()):
+                changes = ', '.join(f'{field}: stored {stored}, expected {expected}'
+                                    for field, (stored, expected) in fields.items())
+                self.stdout.write(self.style.WARNING(f'cow {cow_id}: {changes}'))
+            if drift:
+                self.stdout.write(self.style.ERROR(f'{len(drift)} cow status row(s) have drifted.'))
+                raise SystemExit(1)
+            self.stdout.write(self.style.SUCCESS('All cow status rows are up to date.'))
+            return
+
+        started = time.monotonic()
+        rows = rebuild_status()
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {rows} cow status row(s) in {time.monotonic() - started:.1f}s.'
+        ))
@@ -0,0 +1,15 @@
+import time
+
+from django.core.management.base import BaseCommand
+from core.reminders import rebuild_reminders
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the due list (vaccination, follow-up and calving reminders) from the source records'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        total = rebuild_reminders()
+        self.stdout.write(self.style.SUCCESS(
+            f'Built {total} reminder(s) in {time.monotonic() - started:.1f}s.'
+        ))
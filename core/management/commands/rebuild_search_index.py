@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+from core.search import optimize_search_index, rebuild_search_index, search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search documents for cows and veterinary visits'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        cows, visits = rebuild_search_index()
+        optimize_search_index()
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {cows} cow(s) and {visits} visit(s) with the {search_backend()} backend '
+            f'in {time.monotonic() - started:.1f}s.'
+        ))
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Cow, Worker
+from core.seeding import seed_farm
+
+
+class Command(BaseCommand):
+    help = 'Fills an empty database with a synthetic farm (workers, tasks, doctors, cows and their records)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cows', type=int, default=1000, help='Number of cows (default: 1000)')
+        parser.add_argument('--years', type=int, default=3, help='Years of history per cow (default: 3)')
+        parser.add_argument('--workers', type=int, help='Number of workers (default: one per 50 cows)')
+        parser.add_argument('--doctors', type=int, help='Number of doctors (default: one per 1000 cows)')
+        parser.add_argument('--tasks-per-week', type=int, default=2,
+                            help='Tasks per active worker per week over the whole period (default: 2)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same farm')
+        parser.add_argument('--password', default='cowconnect',
+                            help='Password of the generated users (default: cowconnect)')
+
+    def handle(self, *args, **options):
+        if options['cows'] < 1 or options['years'] < 1:
+            raise CommandError('--cows and --years must be at least 1.')
+        if Cow.objects.exists() or Worker.objects.exists():
+            raise CommandError('seed_farm only fills an empty database; run it after a fresh migrate.')
+
+        started = time.monotonic()
+        result = seed_farm(
+            options['cows'], options['years'], workers=options['workers'], doctors=options['doctors'],
+            tasks_per_week=options['tasks_per_week'], seed=options['seed'], password=options['password'],
+            progress=lambda message: self.stdout.write(f'[{time.monotonic() - started:6.1f}s] {message}'),
+        )
+        for name, count in result.counts.items():
+            self.stdout.write(f'{count:>10} {name}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {sum(result.counts.values())} row(s) in {time.monotonic() - started:.1f}s. '
+            f'Workers log in as worker0001... with the password "{options["password"]}".'
+        ))
@@ -0,0 +1,52 @@
+import datetime
+
+from django.conf import settings
+from django.core.mail import get_connection, EmailMessage
+from django.core.management.base import BaseCommand
+from django.template.loader import get_template
+from django.utils import timezone, translation
+from core.models import User
+from core.reminders import digest_lists
+
+
+class Command(BaseCommand):
+    help = ('Emails every caretaker their overdue and upcoming reminders. Reminders of cows without a '
+            'caretaker go to the admins. Run once a day from cron.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=datetime.date.fromisoformat, help='Digest day (YYYY-MM-DD), default today')
+        parser.add_argument('--days', type=int, default=settings.REMINDER_DIGEST_DAYS,
+                            help='How many days ahead count as upcoming')
+        parser.add_argument('--dry-run', action='store_true', help='Print the digests instead of sending them')
+
+    def handle(self, *args, **options):
+        day = options['date'] or timezone.localdate()
+        template = get_template('emails/reminder_digest.txt')
+        admin_emails = list(User.objects.filter(user_type='admin', is_active=True)
+                            .exclude(email='').values_list('email', flat=True))
+        messages = []
+        skipped = 0
+
+        with translation.override(settings.LANGUAGE_CODE):
+            subject = translation.gettext('Due list for %(date)s') % {'date': day.strftime('%d %b %Y')}
+            for worker, reminders in digest_lists(day, options['days']):
+                body = template.render({
+                    'worker': worker,
+                    'overdue': [reminder for reminder in reminders if reminder.due_date < day],
+                    'upcoming': [reminder for reminder in reminders if reminder.due_date >= day],
+                })
+                recipients = admin_emails if worker is None else [worker.user.email] if worker.user.email else []
+                if options['dry_run']:
+                    self.stdout.write(f"--- {', '.join(recipients) or '(no email address)'}\n{body}")
+                if not recipients:
+                    skipped += 1
+                    continue
+                messages.append(EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, recipients))
+
+        if not options['dry_run'] and messages:
+            # One SMTP connection for the whole run
+            get_connection().send_messages(messages)
+        verb = 'Prepared' if options['dry_run'] else 'Sent'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {len(messages)} digest(s), skipped {skipped} without an email address.'
+        ))
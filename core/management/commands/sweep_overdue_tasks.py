@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from core.overdue import sweep_overdue_tasks
+
+
+class Command(BaseCommand):
+    help = 'Marks open tasks past their deadline as overdue and reopens overdue tasks whose deadline moved'
+
+    def handle(self, *args, **options):
+        overdue, reopened = sweep_overdue_tasks()
+        self.stdout.write(self.style.SUCCESS(
+            f'Marked {overdue} task(s) overdue, reopened {reopened} task(s).'
+        ))
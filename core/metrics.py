@@ -0,0 +1,131 @@
+"""
+Per-view request metrics in Prometheus format.
+
+``RequestMetricsMiddleware`` (``core.middleware``) times every request that
+reaches Django, counts its SQL queries and their time through
+``QueryStats``, and records them per resolved URL name. Queries slower than
+``SLOW_QUERY_MS`` are logged with their plan.
+
+Each gunicorn worker keeps its own samples. With ``PROMETHEUS_MULTIPROC_DIR``
+set, ``prometheus_client`` stores them in memory-mapped files in that
+directory and ``render_metrics`` adds them up across workers; the directory
+must be emptied when the server starts (``gunicorn.conf.py`` does this).
+Without it, as under ``runserver``, each process reports only itself.
+"""
+import contextvars
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess)
+
+logger = logging.getLogger(__name__)
+
+REQUEST_DURATION = Histogram(
+    'cowconnect_request_duration_seconds', 'Wall time spent in Django per request.', ['view', 'method'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+SQL_QUERIES = Histogram(
+    'cowconnect_request_sql_queries', 'SQL queries run per request.', ['view'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+SQL_DURATION = Histogram(
+    'cowconnect_request_sql_duration_seconds', 'Time spent in SQL per request.', ['view'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+RESPONSE_SIZE = Histogram(
+    'cowconnect_response_size_bytes', 'Response body size.', ['view'],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+RESPONSES = Counter('cowconnect_responses', 'Responses by view and status code.', ['view', 'method', 'status'])
+SLOW_QUERIES = Counter('cowconnect_slow_queries', 'Queries slower than SLOW_QUERY_MS.', ['view'])
+
+_current = contextvars.ContextVar('query_stats', default=None)
+
+
+class QueryStats:
+    """``execute_wrapper`` that counts and times queries and keeps the slow ones"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.slow = []
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.count += 1
+                self.duration += elapsed
+                if elapsed * 1000 >= settings.SLOW_QUERY_MS and not many:
+                    self.slow.append((context['connection'].alias, sql, params, elapsed))
+
+
+def current_stats():
+    """The ``QueryStats`` of the request being measured in this context, if any"""
+    return _current.get()
+
+
+def start_request():
+    stats = QueryStats()
+    return stats, _current.set(stats)
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+def view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name or match._func_path
+
+
+def record(request, response, duration, stats):
+    view = view_label(request)
+    REQUEST_DURATION.labels(view, request.method).observe(duration)
+    SQL_QUERIES.labels(view).observe(stats.count)
+    SQL_DURATION.labels(view).observe(stats.duration)
+    RESPONSES.labels(view, request.method, str(response.status_code)).inc()
+    size = len(response.content) if not response.streaming else response.get('Content-Length')
+    if size is not None:
+        RESPONSE_SIZE.labels(view).observe(int(size))
+    if stats.slow:
+        SLOW_QUERIES.labels(view).inc(len(stats.slow))
+        for alias, sql, params, elapsed in stats.slow:
+            logger.warning('Slow query in %s (%.1f ms): %s\nParams: %r\nPlan:\n%s',
+                           view, elapsed * 1000, sql, params, explain(alias, sql, params))
+
+
+def explain(alias, sql, params):
+    """The database's plan for ``sql``, without running it"""
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+            return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+    except Exception as error:
+        return f'(no plan: {error})'
+
+
+def server_timing(duration, stats):
+    return f'app;dur={duration * 1000:.1f}, db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries"'
+
+
+def render_metrics():
+    """``(body, content_type)`` of every worker's metrics in Prometheus text format"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,75 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils import translation
+from django.utils.cache import patch_vary_headers
+
+from . import metrics
+
+SESSION_LANGUAGE_KEY = 'language'
+
+
+def supported_language(code):
+    """Return ``code`` if it is one of ``settings.LANGUAGES``, else the default language"""
+    if code in dict(settings.LANGUAGES):
+        return code
+    return translation.get_supported_language_variant(settings.LANGUAGE_CODE)
+
+
+def set_language(request, code):
+    """Store the language choice in the session and activate it for the rest of the request"""
+    language = supported_language(code)
+    request.session[SESSION_LANGUAGE_KEY] = language
+    translation.activate(language)
+    request.LANGUAGE_CODE = language
+    return language
+
+
+class SessionLanguageMiddleware:
+    """
+    Activate the language saved in the session for each request.
+
+    Templates and messages then go through the compiled catalogs in
+    ``locale/`` instead of branching on the language themselves.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        language = supported_language(request.session.get(SESSION_LANGUAGE_KEY))
+        translation.activate(language)
+        request.LANGUAGE_CODE = language
+        response = self.get_response(request)
+        patch_vary_headers(response, ('Cookie',))
+        response.headers.setdefault('Content-Language', translation.get_language())
+        return response
+
+
+class RequestMetricsMiddleware:
+    """
+    Time each request and its SQL queries for ``/metrics`` (see core.metrics).
+
+    The totals are also sent back in a ``Server-Timing`` header, which the
+    browser's network panel shows next to each request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats, token = metrics.start_request()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+                response = self.get_response(request)
+        finally:
+            metrics.finish_request(token)
+        duration = time.perf_counter() - start
+        response['Server-Timing'] = metrics.server_timing(duration, stats)
+        metrics.record(request, response, duration, stats)
+        return response
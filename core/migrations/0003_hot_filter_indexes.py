@@ -0,0 +1,61 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_artificialinsemination_doctor_medicine_pregnancy_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='artificialinsemination',
+            index=models.Index(fields=['-ai_date'], name='ai_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='artificialinsemination',
+            index=models.Index(fields=['success_status', '-ai_date'], name='ai_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cow',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['cow_number'], name='cow_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pregnancy',
+            index=models.Index(fields=['-confirmation_date'], name='pregnancy_confirmed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pregnancy',
+            index=models.Index(fields=['pregnancy_status', '-confirmation_date'], name='pregnancy_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', '-created_at'], name='task_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assigned_to', 'status', '-created_at'], name='task_worker_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['-created_at'], name='task_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vaccination',
+            index=models.Index(fields=['-vaccination_date'], name='vaccination_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vaccination',
+            index=models.Index(condition=models.Q(('next_due_date__isnull', False)), fields=['next_due_date'], name='vaccination_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='veterinaryvisit',
+            index=models.Index(fields=['-visit_date', '-visit_time'], name='visit_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='veterinaryvisit',
+            index=models.Index(fields=['cow', '-visit_date', '-visit_time'], name='visit_cow_date_idx'),
+        ),
+    ]
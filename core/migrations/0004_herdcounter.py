@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:18
+
+from django.db import migrations, models
+
+
+def populate_counters(apps, schema_editor):
+    from core.counters import rebuild_counters
+    rebuild_counters(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HerdCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, unique=True)),
+                ('value', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_herdcounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cow',
+            name='photo_medium',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='cows/renditions/'),
+        ),
+        migrations.AddField(
+            model_name='cow',
+            name='photo_medium_webp',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='cows/renditions/'),
+        ),
+        migrations.AddField(
+            model_name='cow',
+            name='photo_thumbnail',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='cows/renditions/'),
+        ),
+        migrations.AddField(
+            model_name='cow',
+            name='photo_thumbnail_webp',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='cows/renditions/'),
+        ),
+    ]
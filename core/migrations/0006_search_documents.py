@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_search_index(apps, schema_editor):
+    from core.search import create_search_index
+    create_search_index(schema_editor)
+
+
+def drop_search_index(apps, schema_editor):
+    from core.search import drop_search_index
+    drop_search_index(schema_editor)
+
+
+def populate_search_index(apps, schema_editor):
+    from core.search import rebuild_search_index
+    rebuild_search_index(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_cow_photo_renditions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('cow', 'Cow'), ('visit', 'Veterinary Visit')], max_length=10)),
+                ('object_id', models.PositiveIntegerField()),
+                ('date', models.DateField(blank=True, null=True)),
+                ('title', models.CharField(max_length=300)),
+                ('body', models.TextField(blank=True)),
+                ('cow', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.cow')),
+                ('doctor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.doctor')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['cow', '-date'], name='search_cow_date_idx'), models.Index(fields=['doctor', '-date'], name='search_doctor_date_idx'), models.Index(fields=['-date'], name='search_date_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchdocument',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='search_document_unique'),
+        ),
+        # SQLite rebuilds a table on most ALTERs, which drops its triggers: later
+        # migrations that alter core_searchdocument must recreate the index.
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(populate_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_search_documents'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'deadline'], name='task_status_deadline_idx'),
+        ),
+    ]
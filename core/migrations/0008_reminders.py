@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_reminders(apps, schema_editor):
+    from core.reminders import rebuild_reminders
+    rebuild_reminders(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_task_status_deadline_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cow',
+            name='caretaker',
+            field=models.ForeignKey(blank=True, help_text='Worker who receives the reminders for this cow', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='cows', to='core.worker'),
+        ),
+        migrations.CreateModel(
+            name='Reminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('vaccination', 'Vaccination'), ('follow_up', 'Follow-up Visit'), ('calving', 'Expected Calving')], max_length=20)),
+                ('object_id', models.PositiveIntegerField(help_text='Primary key of the vaccination, visit or pregnancy')),
+                ('due_date', models.DateField()),
+                ('title', models.CharField(max_length=200)),
+                ('cow', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminders', to='core.cow')),
+                ('doctor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.doctor')),
+                ('worker', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reminders', to='core.worker')),
+            ],
+            options={
+                'ordering': ['due_date', 'pk'],
+                'indexes': [models.Index(fields=['due_date'], name='reminder_due_idx'), models.Index(fields=['worker', 'due_date'], name='reminder_worker_due_idx'), models.Index(fields=['cow', 'due_date'], name='reminder_cow_due_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='reminder',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='reminder_source_unique'),
+        ),
+        migrations.RunPython(populate_reminders, migrations.RunPython.noop),
+    ]
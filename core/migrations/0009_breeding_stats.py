@@ -0,0 +1,67 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_breeding_stats(apps, schema_editor):
+    from core.analytics import rebuild_breeding_stats
+    rebuild_breeding_stats(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_reminders'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BreedingStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('herd', 'Herd'), ('cow', 'Cow'), ('bull', 'Bull'), ('technician', 'Technician'), ('doctor', 'Doctor')], max_length=20)),
+                ('key', models.CharField(blank=True, help_text='Cow or doctor id, bull breed/id, technician name', max_length=300)),
+                ('label', models.CharField(max_length=300)),
+                ('services', models.PositiveIntegerField(default=0)),
+                ('conceptions', models.PositiveIntegerField(default=0)),
+                ('failures', models.PositiveIntegerField(default=0)),
+                ('calvings', models.PositiveIntegerField(default=0)),
+                ('calving_interval_days', models.PositiveIntegerField(default=0, help_text='Sum over calving_intervals')),
+                ('calving_intervals', models.PositiveIntegerField(default=0)),
+                ('days_open_days', models.PositiveIntegerField(default=0, help_text='Sum over days_open_periods')),
+                ('days_open_periods', models.PositiveIntegerField(default=0)),
+                ('open_since', models.DateField(blank=True, help_text='Last calving, if not conceived since', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['scope', 'label'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='artificialinsemination',
+            index=models.Index(fields=['cow', 'ai_date'], name='ai_cow_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='artificialinsemination',
+            index=models.Index(fields=['bull_breed', 'bull_id'], name='ai_bull_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='artificialinsemination',
+            index=models.Index(fields=['technician_name'], name='ai_technician_idx'),
+        ),
+        migrations.AddField(
+            model_name='breedingstat',
+            name='cow',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.cow'),
+        ),
+        migrations.AddIndex(
+            model_name='breedingstat',
+            index=models.Index(fields=['scope', 'label'], name='breeding_stat_label_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='breedingstat',
+            constraint=models.UniqueConstraint(fields=('scope', 'key'), name='breeding_stat_unique'),
+        ),
+        migrations.RunPython(populate_breeding_stats, migrations.RunPython.noop),
+    ]
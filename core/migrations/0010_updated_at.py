@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:20
+
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+
+def copy_created_at(apps, schema_editor):
+    for name in ('ArtificialInsemination', 'Vaccination'):
+        apps.get_model('core', name).objects.update(updated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_breeding_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='artificialinsemination',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='vaccination',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_created_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,107 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:15
+
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+
+def copy_created_at(apps, schema_editor):
+    apps.get_model('core', 'Doctor').objects.update(updated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(help_text='Model label, e.g. core.vaccination', max_length=100)),
+                ('object_id', models.BigIntegerField()),
+                ('client_uuid', models.UUIDField(blank=True, null=True)),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='artificialinsemination',
+            name='client_uuid',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_created_at, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='medicine',
+            name='client_uuid',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='medicine',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='pregnancy',
+            name='client_uuid',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='vaccination',
+            name='client_uuid',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='veterinaryvisit',
+            name='client_uuid',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='artificialinsemination',
+            index=models.Index(fields=['updated_at', 'id'], name='ai_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cow',
+            index=models.Index(fields=['updated_at', 'id'], name='cow_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='doctor',
+            index=models.Index(fields=['updated_at', 'id'], name='doctor_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(fields=['updated_at', 'id'], name='medicine_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pregnancy',
+            index=models.Index(fields=['updated_at', 'id'], name='pregnancy_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['updated_at', 'id'], name='task_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vaccination',
+            index=models.Index(fields=['updated_at', 'id'], name='vaccination_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='veterinaryvisit',
+            index=models.Index(fields=['updated_at', 'id'], name='visit_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['model', 'deleted_at', 'id'], name='tombstone_model_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['deleted_at'], name='tombstone_time_idx'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:22
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_delta_sync'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField()),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('frequency', models.CharField(choices=[('daily', 'Daily'), ('weekly', 'Weekly'), ('monthly', 'Monthly')], default='daily', max_length=10)),
+                ('weekdays', models.CharField(blank=True, help_text='Weekly templates: weekday numbers, Monday = 0', max_length=20)),
+                ('month_day', models.PositiveSmallIntegerField(blank=True, help_text='Monthly templates: day of the month (31 = last day)', null=True)),
+                ('due_time', models.TimeField(help_text='Deadline on each day the task is due')),
+                ('start_date', models.DateField(default=django.utils.timezone.now)),
+                ('end_date', models.DateField(blank=True, null=True)),
+                ('all_workers', models.BooleanField(default=False, help_text='Assign to every active worker')),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['title'],
+            },
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='scheduled_for',
+            field=models.DateField(blank=True, help_text='Day of the template occurrence', null=True),
+        ),
+        migrations.AddField(
+            model_name='tasktemplate',
+            name='created_by',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='tasktemplate',
+            name='workers',
+            field=models.ManyToManyField(blank=True, related_name='task_templates', to='core.worker'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='template',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tasks', to='core.tasktemplate'),
+        ),
+        migrations.AddConstraint(
+            model_name='task',
+            constraint=models.UniqueConstraint(fields=('template', 'assigned_to', 'scheduled_for'), name='task_template_occurrence_unique'),
+        ),
+    ]
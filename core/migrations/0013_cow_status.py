@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-18 07:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_cow_status(apps, schema_editor):
+    from core.status import rebuild_status
+    rebuild_status(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_task_templates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CowStatus',
+            fields=[
+                ('cow', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='status', serialize=False, to='core.cow')),
+                ('is_active', models.BooleanField(default=True, help_text="Copy of the cow's flag, so herd queries stay on this table")),
+                ('last_visit_date', models.DateField(blank=True, null=True)),
+                ('last_vaccination_date', models.DateField(blank=True, null=True)),
+                ('next_vaccination_due', models.DateField(blank=True, help_text='Earliest booster due of the latest dose of each vaccine', null=True)),
+                ('last_ai_date', models.DateField(blank=True, null=True)),
+                ('expected_calving_date', models.DateField(blank=True, help_text='Set while a pregnancy is open', null=True)),
+                ('medication_until', models.DateField(blank=True, help_text='Last day of the latest medicine course', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Cow statuses',
+                'indexes': [models.Index(condition=models.Q(('is_active', True)), fields=['last_visit_date'], name='cow_status_visit_idx'), models.Index(condition=models.Q(('is_active', True)), fields=['last_vaccination_date'], name='cow_status_vaccination_idx'), models.Index(condition=models.Q(('is_active', True)), fields=['next_vaccination_due'], name='cow_status_due_idx'), models.Index(condition=models.Q(('is_active', True)), fields=['last_ai_date'], name='cow_status_ai_idx'), models.Index(condition=models.Q(('is_active', True)), fields=['expected_calving_date'], name='cow_status_calving_idx'), models.Index(condition=models.Q(('is_active', True)), fields=['medication_until'], name='cow_status_medication_idx')],
+            },
+        ),
+        migrations.RunPython(populate_cow_status, migrations.RunPython.noop),
+    ]
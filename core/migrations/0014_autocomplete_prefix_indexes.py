@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-18 07:24
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_cow_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='artificialinsemination',
+            index=models.Index(django.db.models.functions.text.Lower('bull_id'), name='ai_bull_prefix_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cow',
+            index=models.Index(django.db.models.functions.text.Lower('cow_number'), name='cow_number_prefix_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cow',
+            index=models.Index(django.db.models.functions.text.Lower('cow_name'), name='cow_name_prefix_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='worker',
+            index=models.Index(django.db.models.functions.text.Lower('employee_id'), name='worker_employee_prefix_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_autocomplete_prefix_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tombstone',
+            name='recipient',
+            field=models.ForeignKey(blank=True, help_text="Only this user's devices drop the row; empty for everyone", null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -1,5 +1,8 @@
+import calendar
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.db.models.functions import Lower
 from django.utils import timezone
 
 
@@ -25,10 +28,80 @@ class Worker(models.Model):
     date_of_joining = models.DateField(default=timezone.now)
     is_active = models.BooleanField(default=True)
     
+    class Meta:
+        indexes = [
+            # Prefix search of the task form's worker picker (core/autocomplete.py)
+            models.Index(Lower('employee_id'), name='worker_employee_prefix_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.employee_id}"
 
 
+class TaskTemplate(models.Model):
+    """Recurring chore that core.recurring turns into Task rows"""
+    FREQUENCY_CHOICES = (
+        ('daily', 'Daily'),
+        ('weekly', 'Weekly'),
+        ('monthly', 'Monthly'),
+    )
+    
+    title = models.CharField(max_length=200)
+    description = models.TextField()
+    notes = models.TextField(blank=True, null=True)
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES, default='daily')
+    weekdays = models.CharField(max_length=20, blank=True, help_text='Weekly templates: weekday numbers, Monday = 0')
+    month_day = models.PositiveSmallIntegerField(null=True, blank=True,
+                                                 help_text='Monthly templates: day of the month (31 = last day)')
+    due_time = models.TimeField(help_text='Deadline on each day the task is due')
+    start_date = models.DateField(default=timezone.now)
+    end_date = models.DateField(null=True, blank=True)
+    all_workers = models.BooleanField(default=False, help_text='Assign to every active worker')
+    workers = models.ManyToManyField(Worker, blank=True, related_name='task_templates')
+    is_active = models.BooleanField(default=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['title']
+    
+    def __str__(self):
+        return f"{self.title} ({self.get_frequency_display()})"
+    
+    def weekday_numbers(self):
+        return {int(day) for day in self.weekdays.split(',') if day}
+    
+    def is_due(self, day):
+        if day < self.start_date or (self.end_date and day > self.end_date):
+            return False
+        if self.frequency == 'weekly':
+            return day.weekday() in self.weekday_numbers()
+        if self.frequency == 'monthly':
+            return day.day == min(self.month_day or 1, calendar.monthrange(day.year, day.month)[1])
+        return True
+
+
+class TaskQuerySet(models.QuerySet):
+    """Task querysets that work out the overdue state in SQL"""
+
+    def past_deadline_q(self, now=None):
+        return models.Q(status__in=Task.OPEN_STATUSES, deadline__lt=now or timezone.now())
+
+    def with_overdue(self, now=None):
+        """Annotate ``past_deadline`` so templates don't call ``is_overdue()`` per row"""
+        return self.annotate(past_deadline=models.ExpressionWrapper(
+            self.past_deadline_q(now), output_field=models.BooleanField(),
+        ))
+
+    def overdue(self, now=None):
+        """Open tasks whose deadline has passed, whether or not the sweep has flipped them yet"""
+        return self.filter(self.past_deadline_q(now))
+
+    def overdue_count(self, now=None):
+        return self.aggregate(n=models.Count('pk', filter=self.past_deadline_q(now)))['n']
+
+
 class Task(models.Model):
     """Task Assignment Model"""
     STATUS_CHOICES = (
@@ -37,6 +110,7 @@ class Task(models.Model):
         ('completed', 'Completed'),
         ('overdue', 'Overdue'),
     )
+    OPEN_STATUSES = ('pending', 'in_progress', 'overdue')
     
     title = models.CharField(max_length=200)
     description = models.TextField()
@@ -48,15 +122,31 @@ class Task(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     completed_at = models.DateTimeField(null=True, blank=True)
+    template = models.ForeignKey(TaskTemplate, on_delete=models.SET_NULL, null=True, blank=True, related_name='tasks')
+    scheduled_for = models.DateField(null=True, blank=True, help_text='Day of the template occurrence')
+    
+    objects = TaskQuerySet.as_manager()
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', '-created_at'], name='task_status_created_idx'),
+            models.Index(fields=['assigned_to', 'status', '-created_at'], name='task_worker_status_idx'),
+            models.Index(fields=['-created_at'], name='task_created_idx'),
+            models.Index(fields=['assigned_to', '-created_at'], name='task_worker_created_idx'),
+            models.Index(fields=['status', 'deadline'], name='task_status_deadline_idx'),
+            models.Index(fields=['updated_at', 'id'], name='task_updated_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['template', 'assigned_to', 'scheduled_for'],
+                                    name='task_template_occurrence_unique'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.assigned_to.user.username}"
     
     def is_overdue(self):
-        if self.status != 'completed' and self.deadline < timezone.now():
+        if self.status in self.OPEN_STATUSES and self.deadline < timezone.now():
             return True
         return False
 
@@ -73,6 +163,12 @@ class Cow(models.Model):
     last_checkup = models.DateField(null=True, blank=True)
     notes = models.TextField(blank=True, null=True)
     photo = models.ImageField(upload_to='cows/', blank=True, null=True)
+    photo_thumbnail = models.ImageField(upload_to='cows/renditions/', blank=True, null=True, editable=False)
+    photo_thumbnail_webp = models.ImageField(upload_to='cows/renditions/', blank=True, null=True, editable=False)
+    photo_medium = models.ImageField(upload_to='cows/renditions/', blank=True, null=True, editable=False)
+    photo_medium_webp = models.ImageField(upload_to='cows/renditions/', blank=True, null=True, editable=False)
+    caretaker = models.ForeignKey(Worker, on_delete=models.SET_NULL, null=True, blank=True, related_name='cows',
+                                  help_text='Worker who receives the reminders for this cow')
     added_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -80,6 +176,13 @@ class Cow(models.Model):
     
     class Meta:
         ordering = ['cow_number']
+        indexes = [
+            models.Index(fields=['cow_number'], name='cow_active_idx', condition=models.Q(is_active=True)),
+            models.Index(fields=['updated_at', 'id'], name='cow_updated_idx'),
+            # Prefix search of the cow pickers (core/autocomplete.py)
+            models.Index(Lower('cow_number'), name='cow_number_prefix_idx'),
+            models.Index(Lower('cow_name'), name='cow_name_prefix_idx'),
+        ]
     
     def __str__(self):
         return f"{self.cow_number} - {self.cow_name or 'Unnamed'}"
@@ -98,9 +201,13 @@ class Doctor(models.Model):
     is_active = models.BooleanField(default=True)
     added_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='doctor_updated_idx'),
+        ]
     
     def __str__(self):
         return f"Dr. {self.name} - {self.license_number}"
@@ -132,11 +239,17 @@ class VeterinaryVisit(models.Model):
     visit_cost = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     notes = models.TextField(blank=True, null=True)
     recorded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='recorded_visits')
+    client_uuid = models.UUIDField(unique=True, null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-visit_date', '-visit_time']
+        indexes = [
+            models.Index(fields=['-visit_date', '-visit_time'], name='visit_date_idx'),
+            models.Index(fields=['cow', '-visit_date', '-visit_time'], name='visit_cow_date_idx'),
+            models.Index(fields=['updated_at', 'id'], name='visit_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.cow.cow_number} - {self.visit_type} - {self.visit_date}"
@@ -153,9 +266,14 @@ class Medicine(models.Model):
     start_date = models.DateField(default=timezone.now)
     end_date = models.DateField(null=True, blank=True)
     instructions = models.TextField(blank=True, null=True)
+    client_uuid = models.UUIDField(unique=True, null=True, blank=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['start_date']
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='medicine_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.medicine_name} - {self.dosage}"
@@ -177,10 +295,21 @@ class ArtificialInsemination(models.Model):
     notes = models.TextField(blank=True, null=True)
     cost = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     recorded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    client_uuid = models.UUIDField(unique=True, null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-ai_date']
+        indexes = [
+            models.Index(fields=['-ai_date'], name='ai_date_idx'),
+            models.Index(fields=['success_status', '-ai_date'], name='ai_status_date_idx'),
+            models.Index(fields=['cow', 'ai_date'], name='ai_cow_date_idx'),
+            models.Index(fields=['bull_breed', 'bull_id'], name='ai_bull_idx'),
+            models.Index(fields=['technician_name'], name='ai_technician_idx'),
+            models.Index(Lower('bull_id'), name='ai_bull_prefix_idx'),
+            models.Index(fields=['updated_at', 'id'], name='ai_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.cow.cow_number} - AI on {self.ai_date}"
@@ -210,12 +339,18 @@ class Pregnancy(models.Model):
     complications = models.TextField(blank=True, null=True)
     doctor_notes = models.TextField(blank=True, null=True)
     recorded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='recorded_pregnancies')
+    client_uuid = models.UUIDField(unique=True, null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-confirmation_date']
         verbose_name_plural = 'Pregnancies'
+        indexes = [
+            models.Index(fields=['-confirmation_date'], name='pregnancy_confirmed_idx'),
+            models.Index(fields=['pregnancy_status', '-confirmation_date'], name='pregnancy_status_idx'),
+            models.Index(fields=['updated_at', 'id'], name='pregnancy_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.cow.cow_number} - {self.pregnancy_status} - {self.expected_delivery_date}"
@@ -234,10 +369,218 @@ class Vaccination(models.Model):
     route = models.CharField(max_length=50, help_text='e.g., Subcutaneous, Intramuscular')
     notes = models.TextField(blank=True, null=True)
     recorded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    client_uuid = models.UUIDField(unique=True, null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-vaccination_date']
+        indexes = [
+            models.Index(fields=['-vaccination_date'], name='vaccination_date_idx'),
+            models.Index(fields=['next_due_date'], name='vaccination_due_idx', condition=models.Q(next_due_date__isnull=False)),
+            models.Index(fields=['updated_at', 'id'], name='vaccination_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.cow.cow_number} - {self.vaccine_name} - {self.vaccination_date}"
+
+
+class Tombstone(models.Model):
+    """A deleted row, or one a user can no longer see, kept so delta sync (core.sync) can tell clients to drop it"""
+    model = models.CharField(max_length=100, help_text='Model label, e.g. core.vaccination')
+    object_id = models.BigIntegerField()
+    client_uuid = models.UUIDField(null=True, blank=True)
+    deleted_at = models.DateTimeField(default=timezone.now)
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='+',
+                                  help_text="Only this user's devices drop the row; empty for everyone")
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['model', 'deleted_at', 'id'], name='tombstone_model_time_idx'),
+            models.Index(fields=['deleted_at'], name='tombstone_time_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.model} #{self.object_id} deleted {self.deleted_at}"
+
+
+class HerdCounter(models.Model):
+    """Denormalized dashboard statistics, kept current by core.signals"""
+    key = models.CharField(max_length=100, unique=True)
+    value = models.IntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.key} = {self.value}"
+
+
+class SearchDocument(models.Model):
+    """Denormalized text of a cow or visit (with its medicines), indexed by core.search"""
+    KIND_CHOICES = (
+        ('cow', 'Cow'),
+        ('visit', 'Veterinary Visit'),
+    )
+    
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField()
+    cow = models.ForeignKey(Cow, on_delete=models.CASCADE, related_name='+')
+    doctor = models.ForeignKey(Doctor, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    date = models.DateField(null=True, blank=True)
+    title = models.CharField(max_length=300)
+    body = models.TextField(blank=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='search_document_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['cow', '-date'], name='search_cow_date_idx'),
+            models.Index(fields=['doctor', '-date'], name='search_doctor_date_idx'),
+            models.Index(fields=['-date'], name='search_date_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} #{self.object_id}: {self.title}"
+
+
+class Reminder(models.Model):
+    """Materialized due-list entry for a cow, kept current by core.reminders"""
+    KIND_CHOICES = (
+        ('vaccination', 'Vaccination'),
+        ('follow_up', 'Follow-up Visit'),
+        ('calving', 'Expected Calving'),
+    )
+    
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField(help_text='Primary key of the vaccination, visit or pregnancy')
+    cow = models.ForeignKey(Cow, on_delete=models.CASCADE, related_name='reminders')
+    worker = models.ForeignKey(Worker, on_delete=models.SET_NULL, null=True, blank=True, related_name='reminders')
+    doctor = models.ForeignKey(Doctor, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    due_date = models.DateField()
+    title = models.CharField(max_length=200)
+    
+    class Meta:
+        ordering = ['due_date', 'pk']
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='reminder_source_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['due_date'], name='reminder_due_idx'),
+            models.Index(fields=['worker', 'due_date'], name='reminder_worker_due_idx'),
+            models.Index(fields=['cow', 'due_date'], name='reminder_cow_due_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.cow.cow_number} - {self.get_kind_display()} - {self.due_date}"
+
+
+class BreedingStat(models.Model):
+    """Breeding performance totals for the herd, a cow, a bull, a technician or a doctor, kept by core.analytics"""
+    SCOPE_CHOICES = (
+        ('herd', 'Herd'),
+        ('cow', 'Cow'),
+        ('bull', 'Bull'),
+        ('technician', 'Technician'),
+        ('doctor', 'Doctor'),
+    )
+    
+    scope = models.CharField(max_length=20, choices=SCOPE_CHOICES)
+    key = models.CharField(max_length=300, blank=True, help_text='Cow or doctor id, bull breed/id, technician name')
+    label = models.CharField(max_length=300)
+    cow = models.ForeignKey(Cow, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    services = models.PositiveIntegerField(default=0)
+    conceptions = models.PositiveIntegerField(default=0)
+    failures = models.PositiveIntegerField(default=0)
+    calvings = models.PositiveIntegerField(default=0)
+    calving_interval_days = models.PositiveIntegerField(default=0, help_text='Sum over calving_intervals')
+    calving_intervals = models.PositiveIntegerField(default=0)
+    days_open_days = models.PositiveIntegerField(default=0, help_text='Sum over days_open_periods')
+    days_open_periods = models.PositiveIntegerField(default=0)
+    open_since = models.DateField(null=True, blank=True, help_text='Last calving, if not conceived since')
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['scope', 'label']
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='breeding_stat_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['scope', 'label'], name='breeding_stat_label_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.scope}: {self.label}"
+    
+    @property
+    def resolved_services(self):
+        return self.conceptions + self.failures
+    
+    @property
+    def conception_rate(self):
+        """Percentage of services with a known outcome that conceived"""
+        if not self.resolved_services:
+            return None
+        return 100 * self.conceptions / self.resolved_services
+    
+    @property
+    def services_per_conception(self):
+        if not self.conceptions:
+            return None
+        return self.resolved_services / self.conceptions
+    
+    @property
+    def calving_interval(self):
+        """Average days between calvings"""
+        if not self.calving_intervals:
+            return None
+        return self.calving_interval_days / self.calving_intervals
+    
+    @property
+    def days_open(self):
+        """Average days from calving to the conceiving service"""
+        if not self.days_open_periods:
+            return None
+        return self.days_open_days / self.days_open_periods
+
+
+class CowStatus(models.Model):
+    """Latest medical state of a cow, denormalized for filtering and sorting the herd, kept by core.status"""
+    cow = models.OneToOneField(Cow, on_delete=models.CASCADE, primary_key=True, related_name='status')
+    is_active = models.BooleanField(default=True, help_text="Copy of the cow's flag, so herd queries stay on this table")
+    last_visit_date = models.DateField(null=True, blank=True)
+    last_vaccination_date = models.DateField(null=True, blank=True)
+    next_vaccination_due = models.DateField(null=True, blank=True,
+                                            help_text='Earliest booster due of the latest dose of each vaccine')
+    last_ai_date = models.DateField(null=True, blank=True)
+    expected_calving_date = models.DateField(null=True, blank=True, help_text='Set while a pregnancy is open')
+    medication_until = models.DateField(null=True, blank=True, help_text='Last day of the latest medicine course')
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = 'Cow statuses'
+        indexes = [
+            models.Index(fields=['last_visit_date'], name='cow_status_visit_idx', condition=models.Q(is_active=True)),
+            models.Index(fields=['last_vaccination_date'], name='cow_status_vaccination_idx',
+                         condition=models.Q(is_active=True)),
+            models.Index(fields=['next_vaccination_due'], name='cow_status_due_idx', condition=models.Q(is_active=True)),
+            models.Index(fields=['last_ai_date'], name='cow_status_ai_idx', condition=models.Q(is_active=True)),
+            models.Index(fields=['expected_calving_date'], name='cow_status_calving_idx',
+                         condition=models.Q(is_active=True)),
+            models.Index(fields=['medication_until'], name='cow_status_medication_idx',
+                         condition=models.Q(is_active=True)),
+        ]
+    
+    def __str__(self):
+        return f"{self.cow_id} status"
+    
+    @property
+    def is_pregnant(self):
+        return self.expected_calving_date is not None
+    
+    @property
+    def days_since_visit(self):
+        if self.last_visit_date is None:
+            return None
+        return (timezone.localdate() - self.last_visit_date).days
+    
+    def on_medication(self, day=None):
+        return self.medication_until is not None and self.medication_until >= (day or timezone.localdate())
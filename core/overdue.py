@@ -0,0 +1,69 @@
+"""
+Overdue task sweeping.
+
+Open tasks whose deadline has passed are flipped to ``overdue`` with
+set-based ``UPDATE``s, so the status can be filtered, counted and indexed like
+any other. Overdue tasks whose deadline was moved back into the future are
+reopened as ``pending``. Queryset ``update()`` bypasses signals, so the sweep
+applies the counter deltas and fragment cache bumps itself.
+
+The deltas must match the rows the ``UPDATE`` changes, not a count taken
+before it: sweeps run in every web process and a worker can complete a task
+at any moment. The candidate rows are read with ``select_for_update()`` (on
+SQLite the sweep's ``BEGIN IMMEDIATE`` already keeps other writers out), then
+updated per assignee and old status, each ``UPDATE`` also matching that
+status; the counters move by the number of rows each one reports.
+
+Run ``manage.py sweep_overdue_tasks`` from cron, or set
+``OVERDUE_SWEEP_INTERVAL`` to sweep from a background thread in every web
+process (see ``core.scheduler``).
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from .counters import apply_deltas, task_status_key
+from .fragment_cache import bump_versions, worker_task_group
+from .models import Task
+
+SWEPT_STATUSES = ('pending', 'in_progress')
+# Primary keys per UPDATE, well under SQLite's bound parameter limit
+CHUNK_SIZE = 500
+
+
+def _move(queryset, status, now):
+    """Set ``status`` on every row of ``queryset`` and keep counters and fragments in step"""
+    # Locked, so nothing else can move these rows before the UPDATEs below
+    rows = queryset.select_for_update().order_by().values_list('pk', 'assigned_to_id', 'status')
+    candidates = defaultdict(list)
+    for pk, worker_id, old_status in rows:
+        candidates[worker_id, old_status].append(pk)
+    if not candidates:
+        return 0
+
+    moved = 0
+    deltas = Counter()
+    for (worker_id, old_status), pks in candidates.items():
+        for start in range(0, len(pks), CHUNK_SIZE):
+            # A row that changed since it was read no longer matches, and is not counted
+            n = (queryset.filter(pk__in=pks[start:start + CHUNK_SIZE], assigned_to_id=worker_id, status=old_status)
+                 .update(status=status, updated_at=now))
+            moved += n
+            for key_status, sign in ((old_status, -1), (status, 1)):
+                deltas[task_status_key(key_status)] += sign * n
+                deltas[task_status_key(key_status, worker_id)] += sign * n
+    apply_deltas(deltas)
+
+    groups = ['tasks', *{worker_task_group(worker_id) for worker_id, _ in candidates}]
+    transaction.on_commit(lambda: bump_versions(groups))
+    return moved
+
+
+def sweep_overdue_tasks(now=None):
+    """Return ``(overdue, reopened)``: how many tasks were flipped each way"""
+    now = now or timezone.now()
+    with transaction.atomic():
+        overdue = _move(Task.objects.filter(status__in=SWEPT_STATUSES, deadline__lt=now), 'overdue', now)
+        reopened = _move(Task.objects.filter(status='overdue', deadline__gte=now), 'pending', now)
+    return overdue, reopened
@@ -0,0 +1,193 @@
+import base64
+import binascii
+import datetime
+import json
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, Q
+from django.db.models.constants import LOOKUP_SEP
+
+
+def _encode_value(value):
+    """Serialize a keyset value without losing precision"""
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class KeysetPage:
+    """One page of results plus the cursors needed to move around it"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Cursor based pagination keyed on the queryset ordering.
+
+    Every page is fetched with a ``WHERE (ordering) > (last row)`` style filter
+    and a ``LIMIT``, so there is no ``COUNT(*)`` and no ``OFFSET`` scan and the
+    last page costs the same as the first one. The primary key is appended to
+    the ordering as a tie-breaker so cursors stay stable when several rows share
+    the same date. Ordering fields may follow relations (``status__due``);
+    rows where a field is empty come after all the others, whichever way it sorts.
+    """
+
+    def __init__(self, queryset, per_page=None, ordering=None):
+        self.queryset = queryset
+        self.per_page = per_page or settings.LIST_PAGE_SIZE
+        ordering = list(ordering or queryset.query.order_by or queryset.model._meta.ordering)
+        if not any(name.lstrip('-') in ('pk', queryset.model._meta.pk.name) for name in ordering):
+            descending = bool(ordering) and ordering[-1].startswith('-')
+            ordering.append('-pk' if descending else 'pk')
+        self.ordering = ordering
+
+    def _fields(self):
+        fields = []
+        for name in self.ordering:
+            descending = name.startswith('-')
+            name = name.lstrip('-')
+            *path, attribute = name.split(LOOKUP_SEP)
+            model = self.queryset.model
+            for part in path:
+                model = model._meta.get_field(part).related_model
+            field = model._meta.pk if attribute == 'pk' else model._meta.get_field(attribute)
+            fields.append((name, field, descending, path))
+        return fields
+
+    def _value(self, obj, field, path):
+        for part in path:
+            # A missing reverse one-to-one row raises an AttributeError subclass
+            obj = getattr(obj, part, None)
+            if obj is None:
+                return None
+        return getattr(obj, field.attname)
+
+    def _encode_cursor(self, obj, direction):
+        values = [_encode_value(self._value(obj, field, path)) for _, field, _, path in self._fields()]
+        payload = json.dumps({'d': direction, 'v': values}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def _decode_cursor(self, cursor):
+        """Return ``(direction, values)`` or ``None`` for a missing or tampered cursor"""
+        if not cursor:
+            return None
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            direction, raw_values = payload['d'], payload['v']
+            fields = self._fields()
+            if direction not in ('n', 'p') or len(raw_values) != len(fields):
+                return None
+            values = [field.to_python(value) for (_, field, _, _), value in zip(fields, raw_values)]
+        except (binascii.Error, ValueError, KeyError, TypeError, ValidationError, FieldDoesNotExist):
+            return None
+        return direction, values
+
+    def _seek_filters(self, values, backwards):
+        """
+        Build ``(a, b, c) > (x, y, z)`` for mixed asc/desc orderings as a list
+        of conditions in page order. Runs of rows with an empty field get a
+        condition of their own: an ``OR ... IS NULL`` in the same query would
+        stop the database from reading the ordering index as a range.
+        """
+        groups = []
+        equal_so_far = Q()
+        for (name, field, descending, _), value in zip(self._fields(), values):
+            if value is None:
+                # Only other empty rows follow an empty one; going back, every filled row does
+                groups.append([(equal_so_far & Q(**{f'{name}__isnull': False}), True)] if backwards else [])
+                equal_so_far &= Q(**{f'{name}__isnull': True})
+                continue
+            lookup = 'lt' if descending != backwards else 'gt'
+            group = [(equal_so_far & Q(**{f'{name}__{lookup}': value}), False)]
+            if field.null and not backwards:
+                group.append((equal_so_far & Q(**{f'{name}__isnull': True}), True))
+            groups.append(group)
+            equal_so_far &= Q(**{name: value})
+
+        # Rows that share more leading values with the cursor come first
+        conditions = []
+        merge = False
+        for condition, separate in (term for group in reversed(groups) for term in group):
+            if merge and not separate:
+                conditions[-1] |= condition
+            else:
+                conditions.append(condition)
+            merge = not separate
+        return conditions
+
+    def _order_by(self, backwards):
+        ordering = []
+        for name, field, descending, _ in self._fields():
+            descending = descending != backwards
+            if field.null:
+                nulls = {'nulls_first': True} if backwards else {'nulls_last': True}
+                ordering.append(F(name).desc(**nulls) if descending else F(name).asc(**nulls))
+            else:
+                ordering.append(f'-{name}' if descending else name)
+        return ordering
+
+    def page(self, cursor=None):
+        decoded = self._decode_cursor(cursor)
+        backwards = decoded is not None and decoded[0] == 'p'
+
+        queryset = self.queryset.order_by(*self._order_by(backwards))
+        if decoded is None:
+            rows = list(queryset[:self.per_page + 1])
+        else:
+            rows = []
+            for condition in self._seek_filters(decoded[1], backwards):
+                rows += queryset.filter(condition)[:self.per_page + 1 - len(rows)]
+                if len(rows) > self.per_page:
+                    break
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if backwards:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, decoded is not None
+
+        next_cursor = self._encode_cursor(rows[-1], 'n') if rows and has_next else None
+        previous_cursor = self._encode_cursor(rows[0], 'p') if rows and has_previous else None
+        return KeysetPage(rows, next_cursor, previous_cursor)
+
+
+def paginate(request, queryset, ordering=None):
+    """Paginate ``queryset`` from the ``cursor`` and ``per_page`` query parameters"""
+    try:
+        per_page = int(request.GET.get('per_page', settings.LIST_PAGE_SIZE))
+    except ValueError:
+        per_page = settings.LIST_PAGE_SIZE
+    per_page = max(1, min(per_page, settings.LIST_MAX_PAGE_SIZE))
+    return KeysetPaginator(queryset, per_page=per_page, ordering=ordering).page(request.GET.get('cursor'))
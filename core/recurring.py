@@ -0,0 +1,137 @@
+"""
+Recurring tasks.
+
+A ``TaskTemplate`` describes a chore that comes back every day, on some
+weekdays or on one day of the month, for every active worker or a chosen set
+of workers. ``generate_tasks`` materializes the next few days of templates
+into ordinary ``Task`` rows so they show up in the task lists, counters and
+overdue sweep like hand-made tasks.
+
+Each generated row carries its template and the day it was scheduled for, and
+``(template, assigned_to, scheduled_for)`` is unique, so generating the same
+window again only fills gaps: rows are written with
+``bulk_create(ignore_conflicts=True)`` after skipping the occurrences that
+already exist. ``bulk_create`` bypasses signals, so the counter deltas and
+fragment cache bumps are applied once per run. Generated tasks are not kept in
+step with later template edits by themselves; ``reschedule`` replaces the
+pending ones.
+
+Run ``manage.py generate_recurring_tasks`` from cron, or set
+``RECURRING_TASK_INTERVAL`` to generate from a background thread in every web
+process (see ``core.scheduler``).
+"""
+import datetime
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Prefetch
+from django.utils import timezone
+
+from .counters import apply_deltas, task_status_key
+from .fragment_cache import bump_versions, worker_task_group
+from .models import Task, TaskTemplate, Worker
+
+BATCH_SIZE = 1000
+
+
+def occurrences(template, start, end):
+    """Days from ``start`` to ``end`` (inclusive) the template is due on"""
+    day = start
+    while day <= end:
+        if template.is_due(day):
+            yield day
+        day += datetime.timedelta(days=1)
+
+
+def _targets(templates):
+    """``{template_id: [worker_id, ...]}`` of the active workers each template is assigned to"""
+    everyone = None
+    targets = {}
+    for template in templates:
+        if template.all_workers:
+            if everyone is None:
+                everyone = list(Worker.objects.filter(is_active=True).values_list('pk', flat=True))
+            targets[template.pk] = everyone
+        else:
+            targets[template.pk] = [worker.pk for worker in template.workers.all()]
+    return targets
+
+
+def _per_worker(queryset):
+    return Counter(dict(queryset.order_by().values_list('assigned_to_id').annotate(n=Count('pk'))))
+
+
+def generate_tasks(days=None, start=None, templates=None):
+    """
+    Create the missing tasks of the active ``templates`` (all by default) due
+    in the ``days`` days (``RECURRING_TASK_DAYS``) from ``start`` (today);
+    return how many were created. Occurrences whose deadline has already
+    passed are skipped.
+    """
+    days = settings.RECURRING_TASK_DAYS if days is None else days
+    start = start or timezone.localdate()
+    end = start + datetime.timedelta(days=days - 1)
+    now = timezone.now()
+    if templates is None:
+        templates = TaskTemplate.objects.all()
+    templates = (TaskTemplate.objects.filter(pk__in=[template.pk for template in templates], is_active=True)
+                 .prefetch_related(Prefetch('workers', queryset=Worker.objects.filter(is_active=True).only('pk'))))
+
+    with transaction.atomic():
+        # Serializes concurrent runs where the database supports row locks
+        templates = list(templates.select_for_update())
+        if not templates or days < 1:
+            return 0
+        targets = _targets(templates)
+        window = Task.objects.filter(template__in=templates, scheduled_for__range=(start, end))
+        existing = set(window.values_list('template_id', 'assigned_to_id', 'scheduled_for'))
+        before = _per_worker(window)
+
+        tasks = []
+        for template in templates:
+            for day in occurrences(template, start, end):
+                deadline = timezone.make_aware(datetime.datetime.combine(day, template.due_time))
+                if deadline <= now:
+                    continue
+                for worker_id in targets[template.pk]:
+                    if (template.pk, worker_id, day) in existing:
+                        continue
+                    tasks.append(Task(
+                        title=template.title, description=template.description, notes=template.notes,
+                        assigned_to_id=worker_id, assigned_by_id=template.created_by_id, deadline=deadline,
+                        template=template, scheduled_for=day,
+                    ))
+        if not tasks:
+            return 0
+        Task.objects.bulk_create(tasks, batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+        created = _per_worker(window) - before
+        deltas = Counter()
+        for worker_id, n in created.items():
+            deltas['tasks.total'] += n
+            deltas[task_status_key('pending')] += n
+            deltas[task_status_key('pending', worker_id)] += n
+        apply_deltas(deltas)
+
+        groups = ['tasks'] + [worker_task_group(worker_id) for worker_id in created]
+        transaction.on_commit(lambda: bump_versions(groups))
+    return sum(created.values())
+
+
+def cancel_pending(template, start=None):
+    """Delete the template's pending tasks scheduled from ``start`` (today) on; return how many"""
+    start = start or timezone.localdate()
+    deleted, _ = Task.objects.filter(template=template, status='pending', scheduled_for__gte=start).delete()
+    return deleted
+
+
+def reschedule(template, days=None):
+    """
+    Replace the template's pending upcoming tasks after an edit; tasks already
+    started or done are kept. Return ``(cancelled, created)``.
+    """
+    with transaction.atomic():
+        cancelled = cancel_pending(template)
+        created = generate_tasks(days, templates=[template])
+    return cancelled, created
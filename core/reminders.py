@@ -0,0 +1,138 @@
+"""
+Herd-wide due list.
+
+Vaccination boosters (``Vaccination.next_due_date``), follow-up visits
+(``VeterinaryVisit.next_visit_date``) and expected calvings
+(``Pregnancy.expected_delivery_date``) are materialized into ``Reminder`` rows,
+so the list for a day, a week or a worker is one indexed range scan. A
+reminder stays open until it is superseded: by a later dose of the same
+vaccine, by any later visit, or by the pregnancy being closed. Reminders go to
+the cow's caretaker.
+
+Signals in ``core.signals`` refresh the reminders of a cow whenever one of its
+source rows changes. Queryset ``update()``/``bulk_create()`` bypass signals;
+``manage.py rebuild_reminders`` recomputes everything.
+"""
+import datetime
+from itertools import groupby
+
+from django.apps import apps as django_apps
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+CHUNK_SIZE = 500
+OPEN_PREGNANCY_STATUSES = ('suspected', 'confirmed')
+
+
+def _chunks(ids, size=CHUNK_SIZE):
+    ids = list(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def build_reminders(cow_ids, apps=django_apps):
+    """Return unsaved ``Reminder`` rows for the active cows among ``cow_ids``"""
+    get_model = lambda name: apps.get_model('core', name)
+    Reminder = get_model('Reminder')
+    Vaccination = get_model('Vaccination')
+    VeterinaryVisit = get_model('VeterinaryVisit')
+
+    caretakers = dict(get_model('Cow').objects.filter(pk__in=cow_ids, is_active=True)
+                      .values_list('pk', 'caretaker_id'))
+    if not caretakers:
+        return []
+    reminders = []
+
+    later_dose = Vaccination.objects.filter(
+        Q(vaccination_date__gt=OuterRef('vaccination_date'))
+        | Q(vaccination_date=OuterRef('vaccination_date'), pk__gt=OuterRef('pk')),
+        cow=OuterRef('cow'), vaccine_name=OuterRef('vaccine_name'),
+    )
+    vaccinations = (Vaccination.objects.filter(cow_id__in=caretakers, next_due_date__isnull=False)
+                    .exclude(Exists(later_dose))
+                    .values_list('pk', 'cow_id', 'administered_by_id', 'next_due_date', 'vaccine_name'))
+    for pk, cow_id, doctor_id, due_date, vaccine_name in vaccinations:
+        reminders.append(Reminder(kind='vaccination', object_id=pk, cow_id=cow_id, worker_id=caretakers[cow_id],
+                                  doctor_id=doctor_id, due_date=due_date, title=vaccine_name[:200]))
+
+    later_visit = VeterinaryVisit.objects.filter(
+        Q(visit_date__gt=OuterRef('visit_date'))
+        | Q(visit_date=OuterRef('visit_date'), visit_time__gt=OuterRef('visit_time'))
+        | Q(visit_date=OuterRef('visit_date'), visit_time=OuterRef('visit_time'), pk__gt=OuterRef('pk')),
+        cow=OuterRef('cow'),
+    )
+    visits = (VeterinaryVisit.objects.filter(cow_id__in=caretakers, next_visit_date__isnull=False)
+              .exclude(Exists(later_visit))
+              .values_list('pk', 'cow_id', 'doctor_id', 'next_visit_date', 'reason_for_visit'))
+    for pk, cow_id, doctor_id, due_date, reason in visits:
+        reminders.append(Reminder(kind='follow_up', object_id=pk, cow_id=cow_id, worker_id=caretakers[cow_id],
+                                  doctor_id=doctor_id, due_date=due_date, title=reason[:200]))
+
+    pregnancies = (get_model('Pregnancy').objects
+                   .filter(cow_id__in=caretakers, pregnancy_status__in=OPEN_PREGNANCY_STATUSES,
+                           actual_delivery_date__isnull=True)
+                   .values_list('pk', 'cow_id', 'confirmed_by_id', 'expected_delivery_date', 'pregnancy_status'))
+    for pk, cow_id, doctor_id, due_date, status in pregnancies:
+        reminders.append(Reminder(kind='calving', object_id=pk, cow_id=cow_id, worker_id=caretakers[cow_id],
+                                  doctor_id=doctor_id, due_date=due_date, title=status.capitalize()))
+    return reminders
+
+
+def refresh_reminders(cow_ids, apps=django_apps):
+    """Replace the reminders of ``cow_ids`` with freshly built ones; return how many exist now"""
+    Reminder = apps.get_model('core', 'Reminder')
+    total = 0
+    for chunk in _chunks(set(cow_ids)):
+        with transaction.atomic():
+            Reminder.objects.filter(cow_id__in=chunk).delete()
+            total += len(Reminder.objects.bulk_create(build_reminders(chunk, apps)))
+    return total
+
+
+def rebuild_reminders(apps=django_apps):
+    """Recompute every reminder from the source tables"""
+    apps.get_model('core', 'Reminder').objects.all().delete()
+    cow_ids = apps.get_model('core', 'Cow').objects.filter(is_active=True).values_list('pk', flat=True)
+    return refresh_reminders(cow_ids, apps)
+
+
+def week_bounds(day):
+    """Monday and Sunday of the week containing ``day``"""
+    start = day - datetime.timedelta(days=day.weekday())
+    return start, start + datetime.timedelta(days=6)
+
+
+def due_reminders(start=None, end=None, worker=None):
+    """Reminders due between ``start`` and ``end`` (inclusive), optionally for one worker"""
+    Reminder = django_apps.get_model('core', 'Reminder')
+    queryset = Reminder.objects.select_related('cow', 'doctor', 'worker__user')
+    if start:
+        queryset = queryset.filter(due_date__gte=start)
+    if end:
+        queryset = queryset.filter(due_date__lte=end)
+    if worker is not None:
+        queryset = queryset.filter(worker=worker)
+    return queryset
+
+
+def digest_lists(day=None, days=7):
+    """
+    Yield ``(worker, reminders)`` for every worker with something overdue or due
+    within ``days`` of ``day``, from a single query. Reminders of cows without a
+    caretaker come last with ``worker=None``.
+    """
+    day = day or timezone.localdate()
+    Reminder = django_apps.get_model('core', 'Reminder')
+    rows = (Reminder.objects.filter(due_date__lte=day + datetime.timedelta(days=days))
+            .select_related('cow', 'doctor', 'worker__user')
+            .order_by('worker_id', 'due_date', 'pk'))
+    unassigned = []
+    for worker_id, reminders in groupby(rows.iterator(chunk_size=CHUNK_SIZE), key=lambda reminder: reminder.worker_id):
+        reminders = list(reminders)
+        if worker_id is None:
+            unassigned = reminders
+        else:
+            yield reminders[0].worker, reminders
+    if unassigned:
+        yield None, unassigned
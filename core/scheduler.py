@@ -0,0 +1,54 @@
+"""
+Optional in-process scheduler for periodic maintenance jobs.
+
+``start_scheduler()`` is called from the WSGI/ASGI entry points, so management
+commands never start it. Each web process runs its own daemon thread, so the
+jobs must be safe to run concurrently: the overdue sweep locks the rows it
+moves and takes its counter deltas from them, so an overlapping sweep waits
+for the first and then finds nothing left to move. Prefer cron and the
+matching management command where available.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+_started = set()
+_lock = threading.Lock()
+
+
+def run_periodically(name, interval, job):
+    """Run ``job()`` every ``interval`` seconds in a daemon thread, once per process"""
+    with _lock:
+        if name in _started:
+            return None
+        _started.add(name)
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                job()
+            except Exception:
+                logger.exception('Scheduled job %s failed', name)
+            finally:
+                close_old_connections()
+
+    thread = threading.Thread(target=loop, name=f'scheduler-{name}', daemon=True)
+    thread.start()
+    return thread
+
+
+def start_scheduler():
+    interval = settings.OVERDUE_SWEEP_INTERVAL
+    if interval > 0:
+        from .overdue import sweep_overdue_tasks
+        run_periodically('sweep_overdue_tasks', interval, sweep_overdue_tasks)
+    interval = settings.RECURRING_TASK_INTERVAL
+    if interval > 0:
+        from .recurring import generate_tasks
+        run_periodically('generate_recurring_tasks', interval, generate_tasks)
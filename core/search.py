@@ -0,0 +1,381 @@
+"""
+Full-text search over cows and veterinary visits.
+
+Every cow and every visit (with its medicines folded in) has one
+``SearchDocument`` row, kept current by ``core.signals``. Its text is indexed
+by an FTS5 external-content table on SQLite, kept in sync with triggers, or
+by a generated ``tsvector`` column with a GIN index on PostgreSQL. Other
+databases fall back to ``icontains``.
+
+The FTS5 tokenizer keeps combining marks (Unicode category M) inside tokens,
+so Marathi words are indexed whole instead of being split at every vowel sign.
+Query terms are matched as prefixes, so गाई also finds गाईला and mastit finds
+mastitis. On SQLite the kind, cow, doctor and month of each document are also
+indexed as tokens (``cow12``, ``month202407``) in a zero-weight ``filters``
+column, so filtered searches intersect posting lists instead of joining and
+scanning every match. Results are ranked with BM25 over the newest
+``RANK_WINDOW`` matches (see ``rank_documents``).
+
+``bulk_create`` and ``update()`` bypass the signals; importers call
+``index_cows``/``index_visits`` themselves, and ``manage.py
+rebuild_search_index`` recomputes everything.
+"""
+import math
+import re
+import unicodedata
+from dataclasses import dataclass
+from itertools import islice
+
+from django.apps import apps as django_apps
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+FTS_TABLE = 'core_searchdocument_fts'
+FTS_SOURCE_VIEW = 'core_searchdocument_fts_source'
+FTS5_TOKENIZER = "unicode61 remove_diacritics 2 categories 'L* N* Co M*'"
+PG_CONFIG = 'simple'
+RESULT_LIMIT = 50
+MAX_TERMS = 10
+# Only the newest RANK_WINDOW matches are ranked, so very common terms cost no
+# more than rare ones
+RANK_WINDOW = 1000
+TITLE_WEIGHT = 5
+BM25_K1, BM25_B = 1.2, 0.75
+SNIPPET_WORDS = 16
+# \w does not cover the vowel signs of Indic scripts
+WORD_CHARS = r'\w\u0900-\u0d7f'
+MAX_MONTH_TOKENS = 36
+INDEX_CHUNK_SIZE = 2000
+HIGHLIGHT_START, HIGHLIGHT_END = '\x02', '\x03'
+
+_fts5_ready = {}
+
+
+def _filter_tokens_sql(alias):
+    """SQL building the ``filters`` column of a row, e.g. ``kindvisit cow12 doctor3 month202407``"""
+    return (f"'kind' || {alias}.kind || ' cow' || {alias}.cow_id || ' doctor' || COALESCE({alias}.doctor_id, 0) "
+            f"|| COALESCE(' month' || strftime('%Y%m', {alias}.date), '')")
+
+
+def create_search_index(schema_editor):
+    """Create the full-text index for ``core_searchdocument`` (called from migrations)"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            if not cursor.fetchone()[0]:
+                return
+        schema_editor.execute(
+            f"CREATE VIEW {FTS_SOURCE_VIEW} AS SELECT id, title, body, {_filter_tokens_sql('core_searchdocument')} "
+            f"AS filters FROM core_searchdocument", None
+        )
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            f"title, body, filters, content='{FTS_SOURCE_VIEW}', content_rowid='id', "
+            f"tokenize=\"{FTS5_TOKENIZER}\", prefix='2 3')"
+        )
+        insert = (f"INSERT INTO {FTS_TABLE}(rowid, title, body, filters) "
+                  f"VALUES (new.id, new.title, new.body, {_filter_tokens_sql('new')});")
+        delete = (f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body, filters) "
+                  f"VALUES ('delete', old.id, old.title, old.body, {_filter_tokens_sql('old')});")
+        for name, event, statements in (('ai', 'INSERT', insert), ('ad', 'DELETE', delete),
+                                        ('au', 'UPDATE', delete + ' ' + insert)):
+            schema_editor.execute(
+                f"CREATE TRIGGER core_searchdocument_{name} AFTER {event} ON core_searchdocument "
+                f"BEGIN {statements} END", None
+            )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            f"ALTER TABLE core_searchdocument ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+            f"setweight(to_tsvector('{PG_CONFIG}', title), 'A') || "
+            f"setweight(to_tsvector('{PG_CONFIG}', body), 'B')) STORED"
+        )
+        schema_editor.execute(
+            "CREATE INDEX core_searchdocument_vector_idx ON core_searchdocument USING GIN (search_vector)"
+        )
+
+
+def drop_search_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for trigger in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS core_searchdocument_{trigger}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+        schema_editor.execute(f'DROP VIEW IF EXISTS {FTS_SOURCE_VIEW}')
+    elif vendor == 'postgresql':
+        schema_editor.execute('ALTER TABLE core_searchdocument DROP COLUMN IF EXISTS search_vector')
+
+
+def search_backend():
+    """Return ``'fts5'``, ``'postgresql'`` or ``'basic'`` for the default database"""
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    if connection.vendor == 'sqlite':
+        if connection.alias not in _fts5_ready:
+            _fts5_ready[connection.alias] = FTS_TABLE in connection.introspection.table_names()
+        if _fts5_ready[connection.alias]:
+            return 'fts5'
+    return 'basic'
+
+
+def _join(*parts):
+    return ' '.join(str(part) for part in parts if part)
+
+
+def cow_document(SearchDocument, cow):
+    return SearchDocument(
+        kind='cow', object_id=cow.pk, cow_id=cow.pk,
+        title=_join(cow.cow_number, cow.cow_name),
+        body=_join(cow.breed, cow.color, cow.identification_mark, cow.health_status, cow.notes),
+    )
+
+
+def visit_document(SearchDocument, visit, medicines=None):
+    """``medicines`` defaults to ``visit.medicines.all()``"""
+    if medicines is None:
+        medicines = visit.medicines.all()
+    medicines = [_join(medicine.medicine_name, medicine.route, medicine.instructions) for medicine in medicines]
+    return SearchDocument(
+        kind='visit', object_id=visit.pk, cow_id=visit.cow_id, doctor_id=visit.doctor_id,
+        date=visit.visit_date,
+        title=_join(visit.cow.cow_number, visit.cow.cow_name, visit.get_visit_type_display()),
+        body=_join(visit.reason_for_visit, visit.symptoms, visit.diagnosis, visit.treatment_given,
+                   visit.doctor_instructions, visit.notes, visit.doctor.name if visit.doctor else '',
+                   *medicines),
+    )
+
+
+def _replace(SearchDocument, kind, object_ids, documents):
+    with transaction.atomic():
+        SearchDocument.objects.filter(kind=kind, object_id__in=object_ids).delete()
+        SearchDocument.objects.bulk_create(documents)
+
+
+def _chunks(values, size=INDEX_CHUNK_SIZE):
+    values = iter(values)
+    while True:
+        chunk = list(islice(values, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def index_cows(cow_ids, apps=django_apps):
+    """(Re)build the documents of the given cows"""
+    Cow = apps.get_model('core', 'Cow')
+    SearchDocument = apps.get_model('core', 'SearchDocument')
+    for ids in _chunks(cow_ids):
+        documents = [cow_document(SearchDocument, cow) for cow in Cow.objects.filter(pk__in=ids)]
+        _replace(SearchDocument, 'cow', ids, documents)
+
+
+def index_visits(visit_ids, apps=django_apps):
+    """(Re)build the documents of the given visits, dropping those that no longer exist"""
+    VeterinaryVisit = apps.get_model('core', 'VeterinaryVisit')
+    SearchDocument = apps.get_model('core', 'SearchDocument')
+    for ids in _chunks(visit_ids):
+        visits = (VeterinaryVisit.objects.filter(pk__in=ids).order_by()
+                  .select_related('cow', 'doctor').prefetch_related('medicines'))
+        _replace(SearchDocument, 'visit', ids, [visit_document(SearchDocument, visit) for visit in visits])
+
+
+def index_new_visits(visits, medicines=(), apps=django_apps):
+    """
+    Index visits that were just created in bulk, from the objects in memory.
+    Each visit must have its ``cow`` and ``doctor`` loaded; ``medicines`` are
+    the medicines of every visit.
+    """
+    SearchDocument = apps.get_model('core', 'SearchDocument')
+    SearchDocument.objects.bulk_create([visit_document(SearchDocument, visit, medicines) for visit in visits],
+                                       batch_size=INDEX_CHUNK_SIZE)
+
+
+def remove_documents(kind, object_ids):
+    SearchDocument = django_apps.get_model('core', 'SearchDocument')
+    SearchDocument.objects.filter(kind=kind, object_id__in=object_ids).delete()
+
+
+def rebuild_search_index(apps=django_apps):
+    """Recreate every document from the source tables; returns ``(cows, visits)`` indexed"""
+    Cow = apps.get_model('core', 'Cow')
+    VeterinaryVisit = apps.get_model('core', 'VeterinaryVisit')
+    SearchDocument = apps.get_model('core', 'SearchDocument')
+    SearchDocument.objects.all().delete()
+    cow_ids = list(Cow.objects.order_by('pk').values_list('pk', flat=True))
+    visit_ids = list(VeterinaryVisit.objects.order_by('pk').values_list('pk', flat=True))
+    index_cows(cow_ids, apps)
+    index_visits(visit_ids, apps)
+    return len(cow_ids), len(visit_ids)
+
+
+def optimize_search_index():
+    """Merge the FTS5 index segments after large rebuilds (no-op on other backends)"""
+    if search_backend() == 'fts5':
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+
+
+def query_terms(text):
+    """Split ``text`` the way the FTS5 tokenizer does: runs of letters, numbers and marks"""
+    terms, current = [], []
+    for char in text:
+        if unicodedata.category(char)[0] in 'LNM':
+            current.append(char)
+        elif current:
+            terms.append(''.join(current))
+            current = []
+    if current:
+        terms.append(''.join(current))
+    return terms[:MAX_TERMS]
+
+
+def highlight(snippet):
+    """Escape a database-made snippet and turn the highlight markers into ``<mark>`` tags"""
+    html = escape(snippet).replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>')
+    return mark_safe(html)
+
+
+def make_snippet(text, terms, words=SNIPPET_WORDS):
+    """Escaped excerpt of ``text`` around the first matching word, with matches in ``<mark>``"""
+    tokens = list(re.finditer(f'[{WORD_CHARS}]+', text))
+    prefixes = tuple(term.casefold() for term in terms)
+    hits = {index for index, token in enumerate(tokens) if token.group().casefold().startswith(prefixes)}
+    start = max(0, min(hits, default=0) - 3)
+    window = tokens[start:start + words]
+    if not window:
+        return ''
+    parts, position = [], window[0].start()
+    for index, token in enumerate(window, start):
+        parts.append(escape(text[position:token.start()]))
+        parts.append(f'<mark>{escape(token.group())}</mark>' if index in hits else escape(token.group()))
+        position = token.end()
+    html = ''.join(parts)
+    if start > 0:
+        html = '… ' + html
+    if start + words < len(tokens):
+        html += ' …'
+    return mark_safe(html)
+
+
+def rank_documents(rows, terms):
+    """
+    Order ``(id, title, body)`` rows by BM25, best first, newest first on ties.
+
+    Statistics come from the rows themselves. FTS5's own ``bm25()`` reads every
+    posting of each term to compute its IDF, which takes hundreds of
+    milliseconds for words that appear in a large share of a million visits.
+    """
+    patterns = [re.compile(f'(?<![{WORD_CHARS}]){re.escape(term)}', re.IGNORECASE) for term in terms]
+    entries = []
+    for pk, title, body in rows:
+        frequencies = [TITLE_WEIGHT * len(pattern.findall(title)) + len(pattern.findall(body))
+                       for pattern in patterns]
+        entries.append((pk, frequencies, TITLE_WEIGHT * len(title.split()) + len(body.split())))
+    if not entries:
+        return []
+    average_length = sum(length for _, _, length in entries) / len(entries) or 1
+    weights = []
+    for index in range(len(patterns)):
+        matching = sum(1 for _, frequencies, _ in entries if frequencies[index])
+        weights.append(math.log(1 + (len(entries) - matching + 0.5) / (matching + 0.5)))
+
+    def score(frequencies, length):
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+        return sum(weight * tf * (BM25_K1 + 1) / (tf + norm) for weight, tf in zip(weights, frequencies))
+
+    scored = [(pk, score(frequencies, length)) for pk, frequencies, length in entries]
+    return sorted(scored, key=lambda item: (-item[1], -item[0]))
+
+
+@dataclass
+class SearchHit:
+    document: object
+    rank: float
+    snippet: str
+
+
+def _months(start_date, end_date):
+    """``month`` filter tokens covering the date range, or None when it is open or too long"""
+    if not (start_date and end_date) or start_date > end_date:
+        return None
+    months = []
+    year, month = start_date.year, start_date.month
+    while (year, month) <= (end_date.year, end_date.month):
+        months.append(f'month{year}{month:02d}')
+        if len(months) > MAX_MONTH_TOKENS:
+            return None
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def _date_clauses(start_date, end_date):
+    clauses, params = [], []
+    if start_date:
+        clauses.append('d.date >= %s')
+        params.append(start_date)
+    if end_date:
+        clauses.append('d.date <= %s')
+        params.append(end_date)
+    return ''.join(f' AND {clause}' for clause in clauses), params
+
+
+def _search_fts5(terms, kind, start_date, end_date, cow, doctor, limit):
+    match = '{title body} : (%s)' % ' '.join(f'"{term}"*' for term in terms)
+    tokens = [f'kind{kind}' if kind else None,
+              f'cow{getattr(cow, "pk", cow)}' if cow else None,
+              f'doctor{getattr(doctor, "pk", doctor)}' if doctor else None]
+    match += ''.join(f' AND filters : {token}' for token in tokens if token)
+    months = _months(start_date, end_date)
+    if months:
+        match += ' AND filters : (%s)' % ' OR '.join(months)
+    where, params = _date_clauses(start_date, end_date)
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT d.id, d.title, d.body FROM {FTS_TABLE} f "
+                       f"JOIN core_searchdocument d ON d.id = f.rowid "
+                       f"WHERE {FTS_TABLE} MATCH %s{where} ORDER BY f.rowid DESC LIMIT %s",
+                       [match, *params, RANK_WINDOW])
+        rows = cursor.fetchall()
+    bodies = {pk: body for pk, _, body in rows}
+    return [(pk, score, make_snippet(bodies[pk], terms)) for pk, score in rank_documents(rows, terms)[:limit]]
+
+
+def _search_postgresql(terms, kind, start_date, end_date, cow, doctor, limit):
+    where, params = _date_clauses(start_date, end_date)
+    for clause, value in (('d.kind = %s', kind), ('d.cow_id = %s', getattr(cow, 'pk', cow)),
+                          ('d.doctor_id = %s', getattr(doctor, 'pk', doctor))):
+        if value:
+            where += f' AND {clause}'
+            params.append(value)
+    options = f'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxFragments=1, MaxWords=16, MinWords=8'
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT d.id, ts_rank_cd(d.search_vector, q) AS rank, "
+                       f"ts_headline('{PG_CONFIG}', d.body, q, %s) "
+                       f"FROM core_searchdocument d, to_tsquery('{PG_CONFIG}', %s) q "
+                       f"WHERE d.search_vector @@ q{where} ORDER BY rank DESC LIMIT %s",
+                       [options, ' & '.join(f'{term}:*' for term in terms), *params, limit])
+        return [(pk, rank, highlight(headline or '')) for pk, rank, headline in cursor.fetchall()]
+
+
+def search(text, kind=None, start_date=None, end_date=None, cow=None, doctor=None, limit=RESULT_LIMIT):
+    """Return up to ``limit`` ranked ``SearchHit`` objects for ``text``, best first"""
+    SearchDocument = django_apps.get_model('core', 'SearchDocument')
+    terms = query_terms(text)
+    if not terms:
+        return []
+    backend = search_backend()
+
+    if backend == 'basic':
+        queryset = SearchDocument.objects.all()
+        for term in terms:
+            queryset = queryset.filter(Q(title__icontains=term) | Q(body__icontains=term))
+        filters = {'kind': kind, 'date__gte': start_date, 'date__lte': end_date, 'cow': cow, 'doctor': doctor}
+        queryset = queryset.filter(**{key: value for key, value in filters.items() if value})
+        return [SearchHit(document, 0.0, make_snippet(document.body, terms))
+                for document in queryset.select_related('cow', 'doctor').order_by('-date', '-pk')[:limit]]
+
+    run = _search_fts5 if backend == 'fts5' else _search_postgresql
+    rows = run(terms, kind, start_date, end_date, cow, doctor, limit)
+    documents = SearchDocument.objects.select_related('cow', 'doctor').in_bulk([row[0] for row in rows])
+    return [SearchHit(documents[pk], rank, snippet) for pk, rank, snippet in rows if pk in documents]
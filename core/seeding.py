@@ -0,0 +1,371 @@
+"""
+Synthetic herd data for local benchmarking.
+
+``seed_farm`` fills an empty database with a farm of any size: workers and
+their task history, doctors, and for every cow a timeline covering up to
+``years`` years: routine checkups, treatments with medicines, vaccination
+schedules, and breeding cycles of AI services, pregnancies and calvings. The
+records agree with each other the way real ones do. Services are spaced by
+heat cycles, a conceiving service is followed by a confirmed pregnancy and
+a calving about 283 days later, the cow's ``last_checkup`` is its last
+visit, and tasks past their deadline are completed or overdue.
+
+Everything comes from one ``random.Random(seed)``, so the same arguments on
+the same day give the same rows. Rows are written with ``bulk_create`` one
+chunk of cows (and one transaction) at a time. ``bulk_create`` skips the
+signals, so the counters, reminders, breeding stats, search index and cow
+status snapshots are rebuilt once at the end.
+"""
+import datetime
+import random
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from .analytics import rebuild_breeding_stats
+from .counters import rebuild_counters
+from .fragment_cache import bump_versions, worker_task_group
+from .models import (ArtificialInsemination, Cow, Doctor, Medicine, Pregnancy, Task, TaskTemplate, User,
+                     Vaccination, VeterinaryVisit, Worker)
+from .recurring import generate_tasks
+from .reminders import rebuild_reminders
+from .search import optimize_search_index, rebuild_search_index
+from .status import rebuild_status
+
+CHUNK_SIZE = 1000
+BATCH_SIZE = 2000
+COWS_PER_WORKER = 50
+COWS_PER_DOCTOR = 1000
+GESTATION_DAYS = 283
+CONCEPTION_RATE = 0.45
+
+BREEDS = ('Holstein Friesian', 'Jersey', 'Gir', 'Sahiwal', 'Red Sindhi', 'Tharparkar', 'Murrah', 'Crossbred')
+COLORS = ('Black and white', 'Brown', 'Red', 'White', 'Fawn', 'Grey', 'Black')
+MARKS = ('White star on forehead', 'Notched left ear', 'Short tail', 'Spot on right flank', 'Curved horns',
+         'White socks', 'Scar on left shoulder', 'Tag in right ear')
+NAMES = ('Ganga', 'Kamdhenu', 'Lakshmi', 'Nandini', 'Gauri', 'Radha', 'Kapila', 'Surabhi', 'Shyama', 'Tulsi',
+         'Chandni', 'Bhuri', 'Sundari', 'Heera', 'Moti', 'Rani')
+FIRST_NAMES = ('Ramesh', 'Suresh', 'Ganesh', 'Mahesh', 'Anil', 'Sunil', 'Vijay', 'Santosh', 'Prakash', 'Sachin',
+               'Sunita', 'Anita', 'Kavita', 'Savita', 'Rekha', 'Meena')
+LAST_NAMES = ('Patil', 'Jadhav', 'Pawar', 'Shinde', 'Deshmukh', 'Kulkarni', 'More', 'Gaikwad', 'Chavan', 'Kale')
+QUALIFICATIONS = ('BVSc & AH', 'MVSc (Medicine)', 'MVSc (Gynaecology)', 'MVSc (Surgery)')
+SPECIALIZATIONS = ('Large animal medicine', 'Animal reproduction', 'Surgery', None)
+TECHNICIANS = ('Balu Shinde', 'Dattatray More', 'Vitthal Kale', 'Nitin Chavan')
+BULLS = [(breed, f'{breed[:2].upper()}-{number:03d}') for breed in BREEDS[:6] for number in range(1, 5)]
+CALF_GENDERS = ('male', 'female')
+
+# (vaccine, disease, days between doses or None for a single dose, dosage, route)
+VACCINES = (
+    ('Raksha FMD', 'Foot and mouth disease', 182, '2 ml', 'Intramuscular'),
+    ('Raksha HS+BQ', 'Haemorrhagic septicaemia and black quarter', 365, '2 ml', 'Subcutaneous'),
+    ('Bruvax', 'Brucellosis', None, '2 ml', 'Subcutaneous'),
+)
+# (reason, symptoms, diagnosis, treatment, medicines)
+TREATMENTS = (
+    ('Mastitis', 'Swollen udder, clots in milk', 'Clinical mastitis', 'Intramammary antibiotic',
+     [('Ceftriaxone intramammary', '1 tube', 'Twice daily', '3 days', 'Intramammary'),
+      ('Meloxicam', '20 ml', 'Once a day', '3 days', 'Injection')]),
+    ('Lameness', 'Limping on hind leg', 'Foot rot', 'Hoof trimming and dressing',
+     [('Oxytetracycline', '25 ml', 'Once a day', '5 days', 'Injection')]),
+    ('Fever', 'High temperature, off feed', 'Bacterial infection', 'Antibiotic and antipyretic',
+     [('Enrofloxacin', '15 ml', 'Once a day', '5 days', 'Injection'),
+      ('Paracetamol bolus', '2 boluses', 'Twice daily', '3 days', 'Oral')]),
+    ('Bloat', 'Distended left flank', 'Frothy bloat', 'Anti-bloat drench',
+     [('Timpanol', '100 ml', 'Once', '1 day', 'Oral')]),
+    ('Worm load', 'Dull coat, weight loss', 'Gastrointestinal parasites', 'Deworming',
+     [('Albendazole', '30 ml', 'Once', '1 day', 'Oral')]),
+    ('Retained placenta', 'Placenta not expelled after calving', 'Retained foetal membranes', 'Uterine care',
+     [('Uterine bolus', '2 boluses', 'Once a day', '3 days', 'Intrauterine')]),
+)
+TASKS = (
+    ('Milking', 'Morning and evening milking of the assigned shed'),
+    ('Feeding', 'Green fodder and concentrate for the assigned cows'),
+    ('Shed cleaning', 'Clean the shed floor and drains'),
+    ('Heat detection', 'Watch the open cows for signs of heat and report them'),
+    ('Water troughs', 'Scrub and refill the water troughs'),
+    ('Fodder cutting', 'Cut and chaff green fodder'),
+)
+
+
+@dataclass
+class SeedResult:
+    counts: dict = field(default_factory=dict)
+
+    def add(self, model, n):
+        name = str(model._meta.verbose_name_plural)
+        self.counts[name] = self.counts.get(name, 0) + n
+
+
+class FarmSeeder:
+    """Builds one farm; see ``seed_farm``"""
+
+    def __init__(self, cows, years, workers=None, doctors=None, tasks_per_week=2, seed=0, password='cowconnect',
+                 today=None, progress=None):
+        self.cows = cows
+        self.years = years
+        self.workers = workers or max(1, cows // COWS_PER_WORKER)
+        self.doctors = doctors or max(1, cows // COWS_PER_DOCTOR)
+        self.tasks_per_week = tasks_per_week
+        self.random = random.Random(seed)
+        self.password = make_password(password)
+        self.today = today or timezone.localdate()
+        self.start = self.today - datetime.timedelta(days=round(365.25 * years))
+        self.progress = progress or (lambda message: None)
+        self.result = SeedResult()
+
+    def _days(self, low, high):
+        return datetime.timedelta(days=self.random.randint(low, high))
+
+    def _time(self, first_hour=7, last_hour=18):
+        return datetime.time(self.random.randint(first_hour, last_hour), self.random.choice((0, 15, 30, 45)))
+
+    def _aware(self, day, time):
+        return timezone.make_aware(datetime.datetime.combine(day, time))
+
+    def _person(self):
+        return self.random.choice(FIRST_NAMES), self.random.choice(LAST_NAMES)
+
+    def _save(self, model, objects):
+        model.objects.bulk_create(objects, batch_size=BATCH_SIZE)
+        self.result.add(model, len(objects))
+        return objects
+
+    # People
+
+    @transaction.atomic
+    def seed_staff(self):
+        if not User.objects.filter(user_type='admin').exists():
+            self._save(User, [User(username='admin', password=self.password, user_type='admin', is_staff=True,
+                                   is_superuser=True, first_name='Farm', last_name='Admin')])
+        self.admin = User.objects.filter(user_type='admin').order_by('pk').first()
+
+        users = []
+        for number in range(1, self.workers + 1):
+            first, last = self._person()
+            users.append(User(username=f'worker{number:04d}', password=self.password, user_type='worker',
+                              first_name=first, last_name=last, phone_number=f'98{self.random.randrange(10 ** 8):08d}'))
+        self._save(User, users)
+        workers = [Worker(user=user, employee_id=f'EMP{number:04d}', is_active=self.random.random() > 0.05,
+                          date_of_joining=self.start + self._days(0, max(0, (self.today - self.start).days - 30)))
+                   for number, user in enumerate(users, start=1)]
+        self.worker_rows = self._save(Worker, workers)
+
+        doctors = []
+        for number in range(1, self.doctors + 1):
+            first, last = self._person()
+            doctors.append(Doctor(
+                name=f'Dr. {first} {last}', qualification=self.random.choice(QUALIFICATIONS),
+                specialization=self.random.choice(SPECIALIZATIONS), license_number=f'MSVC-{number:05d}',
+                phone_number=f'94{self.random.randrange(10 ** 8):08d}', clinic_name=f'{last} Veterinary Clinic',
+                added_by=self.admin,
+            ))
+        self.doctor_rows = self._save(Doctor, doctors)
+
+    def seed_tasks(self):
+        """``tasks_per_week`` tasks per active worker over the whole period, plus the recurring templates"""
+        now = timezone.now()
+        weeks = (self.today - self.start).days // 7 + 2
+        with transaction.atomic():
+            self._seed_worker_tasks(now, weeks)
+
+        templates = self._save(TaskTemplate, [
+            TaskTemplate(title='Morning milking', description='Milk the assigned cows before 7 am',
+                         frequency='daily', due_time=datetime.time(7), all_workers=True, created_by=self.admin,
+                         start_date=self.today),
+            TaskTemplate(title='Deep cleaning', description='Wash the shed walls and disinfect the floor',
+                         frequency='weekly', weekdays='0,3', due_time=datetime.time(17), all_workers=True,
+                         created_by=self.admin, start_date=self.today),
+        ])
+        self.result.add(Task, generate_tasks(templates=templates))
+
+    def _seed_worker_tasks(self, now, weeks):
+        for worker in self.worker_rows:
+            if not worker.is_active:
+                continue
+            tasks = []
+            for _ in range(weeks * self.tasks_per_week):
+                title, description = self.random.choice(TASKS)
+                deadline = self._aware(self.start + self._days(0, weeks * 7), self._time(6, 20))
+                if deadline > now:
+                    status, completed_at = self.random.choice(('pending', 'pending', 'in_progress')), None
+                elif now - deadline < datetime.timedelta(days=30) and self.random.random() < 0.15:
+                    status, completed_at = 'overdue', None
+                else:
+                    status = 'completed'
+                    completed_at = deadline - datetime.timedelta(minutes=self.random.randint(-360, 600))
+                tasks.append(Task(title=title, description=description, assigned_to=worker, assigned_by=self.admin,
+                                  deadline=deadline, status=status, completed_at=completed_at))
+            self._save(Task, tasks)
+
+    # Herd
+
+    def _cow(self, number):
+        age = self.random.randint(2, 12)
+        active = self.random.random() > 0.05
+        workers = [worker for worker in self.worker_rows if worker.is_active] or self.worker_rows
+        return Cow(
+            cow_number=f'C{number:06d}', cow_name=self.random.choice(NAMES) if self.random.random() < 0.7 else None,
+            breed=self.random.choice(BREEDS), age=age, color=self.random.choice(COLORS),
+            identification_mark=self.random.choice(MARKS), is_active=active,
+            caretaker=workers[number % len(workers)] if active else None, added_by=self.admin,
+        )
+
+    def _history(self, cow, records):
+        """Append the cow's visits, vaccinations and breeding records to ``records``"""
+        born = self.today - datetime.timedelta(days=cow.age * 365) - self._days(0, 364)
+        start = max(self.start, born + datetime.timedelta(days=90))
+        visits, vaccinations, services, pregnancies = (records['visits'], records['vaccinations'],
+                                                       records['services'], records['pregnancies'])
+        cow_visits = []
+
+        def visit(day, visit_type, reason, doctor=None, next_visit=None, **fields):
+            row = VeterinaryVisit(cow=cow, doctor=doctor or self.random.choice(self.doctor_rows), visit_date=day,
+                                  visit_time=self._time(), visit_type=visit_type, reason_for_visit=reason,
+                                  next_visit_date=next_visit, recorded_by=self.admin,
+                                  visit_cost=Decimal(self.random.randrange(200, 1500, 50)), **fields)
+            cow_visits.append(row)
+            return row
+
+        # Routine checkups every four to eight months
+        day = start + self._days(0, 120)
+        while day <= self.today:
+            following = day + self._days(120, 240)
+            visit(day, 'routine', 'Routine health checkup', diagnosis='Healthy', next_visit=following)
+            day = following
+
+        # Treatments, about one every two and a half years
+        day = start + self._days(0, 900)
+        while day <= self.today:
+            reason, symptoms, diagnosis, treatment, medicines = self.random.choice(TREATMENTS)
+            emergency = self.random.random() < 0.2
+            row = visit(day, 'emergency' if emergency else 'treatment', reason, symptoms=symptoms,
+                        diagnosis=diagnosis, treatment_given=treatment,
+                        doctor_instructions='Isolate and keep under observation' if emergency else None,
+                        next_visit=day + self._days(5, 14))
+            records['medicines'].extend(
+                Medicine(visit=row, medicine_name=name, dosage=dosage, frequency=frequency, duration=duration,
+                         route=route, start_date=day, end_date=day + self._days(0, 5))
+                for name, dosage, frequency, duration, route in medicines
+            )
+            day += self._days(300, 1500)
+
+        # Vaccination schedules
+        for vaccine, disease, interval, dosage, route in VACCINES:
+            if interval is None:
+                day = born + self._days(120, 240)
+                if start <= day <= self.today:
+                    vaccinations.append(self._vaccination(cow, vaccine, disease, day, None, dosage, route))
+                continue
+            day = start + self._days(0, interval)
+            while day <= self.today:
+                following = day + datetime.timedelta(days=interval)
+                vaccinations.append(self._vaccination(cow, vaccine, disease, day, following, dosage, route))
+                day = following + self._days(-7, 21)
+
+        # Breeding: services every heat cycle until one conceives, then gestation and days open
+        day = max(start, born + self._days(420, 540))
+        while day <= self.today:
+            doctor = self.random.choice(self.doctor_rows) if self.random.random() < 0.7 else None
+            breed, bull_id = self.random.choice(BULLS)
+            service = ArtificialInsemination(
+                cow=cow, doctor=doctor, ai_date=day, ai_time=self._time(), bull_breed=breed, bull_id=bull_id,
+                semen_source='State semen station', heat_detection_date=day - self._days(0, 1),
+                technician_name=None if doctor else self.random.choice(TECHNICIANS),
+                expected_calving_date=day + datetime.timedelta(days=GESTATION_DAYS),
+                cost=Decimal(self.random.randrange(300, 1200, 50)), recorded_by=self.admin,
+            )
+            services.append(service)
+            if (self.today - day).days < 35:
+                service.success_status = 'Pending'
+                break
+            if self.random.random() >= CONCEPTION_RATE:
+                service.success_status = 'Failed'
+                day += self._days(18, 24)
+                continue
+
+            service.success_status = 'Confirmed'
+            confirmed = min(self.today, day + self._days(35, 60))
+            doctor = doctor or self.random.choice(self.doctor_rows)
+            pregnancy = Pregnancy(cow=cow, ai_record=service, confirmation_date=confirmed, confirmed_by=doctor,
+                                  pregnancy_status='confirmed', expected_delivery_date=service.expected_calving_date,
+                                  recorded_by=self.admin)
+            pregnancies.append(pregnancy)
+            visit(confirmed, 'pregnancy_check', 'Pregnancy diagnosis', doctor=doctor, diagnosis='Pregnant')
+
+            if self.random.random() < 0.04:
+                aborted = day + self._days(90, 220)
+                if aborted > self.today:
+                    break
+                pregnancy.pregnancy_status = 'aborted'
+                pregnancy.complications = 'Abortion'
+                day = aborted + self._days(30, 75)
+                continue
+            delivered = day + self._days(GESTATION_DAYS - 8, GESTATION_DAYS + 7)
+            if delivered > self.today:
+                break
+            pregnancy.pregnancy_status = 'delivered'
+            pregnancy.actual_delivery_date = delivered
+            pregnancy.pregnancy_duration = (delivered - day).days
+            pregnancy.calf_gender = self.random.choice(CALF_GENDERS)
+            pregnancy.calf_weight = Decimal(self.random.randint(220, 400)) / 10
+            pregnancy.delivery_type = 'Normal' if self.random.random() < 0.9 else 'Assisted'
+            day = delivered + self._days(50, 110)
+
+        visits.extend(cow_visits)
+        if cow_visits:
+            cow.last_checkup = max(row.visit_date for row in cow_visits)
+            recent = [row for row in cow_visits if row.visit_type in ('treatment', 'emergency')
+                      and (self.today - row.visit_date).days < 14]
+            if recent:
+                cow.health_status = 'Under Treatment'
+
+    def _vaccination(self, cow, vaccine, disease, day, next_due, dosage, route):
+        return Vaccination(cow=cow, vaccine_name=vaccine, disease_prevention=disease, vaccination_date=day,
+                           next_due_date=next_due, batch_number=f'B{day:%y%m}-{self.random.randint(1, 40):02d}',
+                           administered_by=self.random.choice(self.doctor_rows), dosage=dosage, route=route,
+                           recorded_by=self.admin)
+
+    def seed_herd(self):
+        for first in range(1, self.cows + 1, CHUNK_SIZE):
+            cows = [self._cow(number) for number in range(first, min(first + CHUNK_SIZE, self.cows + 1))]
+            records = {'visits': [], 'medicines': [], 'vaccinations': [], 'services': [], 'pregnancies': []}
+            for cow in cows:
+                self._history(cow, records)
+            # bulk_create copies the new primary keys of the saved parents into the children
+            with transaction.atomic():
+                for model, key in ((Cow, None), (ArtificialInsemination, 'services'), (Pregnancy, 'pregnancies'),
+                                   (VeterinaryVisit, 'visits'), (Medicine, 'medicines'),
+                                   (Vaccination, 'vaccinations')):
+                    self._save(model, records[key] if key else cows)
+            self.progress(f'{cows[-1].cow_number}: {first + len(cows) - 1} of {self.cows} cows')
+
+    def rebuild_derived(self):
+        for name, rebuild in (('counters', rebuild_counters), ('reminders', rebuild_reminders),
+                              ('breeding stats', rebuild_breeding_stats), ('search index', rebuild_search_index),
+                              ('cow status', rebuild_status)):
+            self.progress(f'Rebuilding {name}')
+            rebuild()
+        optimize_search_index()
+        bump_versions(['tasks', 'workers', 'cows', 'veterinary']
+                      + [worker_task_group(worker.pk) for worker in self.worker_rows])
+
+    def run(self):
+        self.seed_staff()
+        self.progress(f'{self.workers} workers, {self.doctors} doctors')
+        self.seed_tasks()
+        self.progress(f'{self.result.counts.get(Task._meta.verbose_name_plural, 0)} tasks')
+        self.seed_herd()
+        self.rebuild_derived()
+        return self.result
+
+
+def seed_farm(cows, years, **options):
+    """
+    Fill an empty database with ``cows`` cows and ``years`` years of history;
+    return a ``SeedResult`` with the number of rows written per model.
+    See ``FarmSeeder`` for the other ``options``.
+    """
+    return FarmSeeder(cows, years, **options).run()
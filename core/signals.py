@@ -0,0 +1,209 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .analytics import refresh_breeding_stats, service_groups
+from .counters import apply_deltas, counter_keys
+from .fragment_cache import bump_versions, fragment_groups
+from .models import (ArtificialInsemination, Cow, Doctor, Medicine, Pregnancy, Task, Worker,
+                     VeterinaryVisit, Vaccination)
+from .reminders import refresh_reminders
+from .search import index_cows, index_visits, remove_documents
+from .status import refresh_status
+from .sync import record_handover, record_tombstone
+
+COUNTED_MODELS = (Worker, Task, Cow, Doctor, ArtificialInsemination, Pregnancy)
+TRACKED_MODELS = COUNTED_MODELS + (VeterinaryVisit, Vaccination)
+SYNCED_MODELS = (Task, Cow, Doctor, VeterinaryVisit, Medicine, ArtificialInsemination, Pregnancy, Vaccination)
+
+
+@receiver(pre_save)
+def remember_stored_row(sender, instance, raw=False, **kwargs):
+    """Stash the stored row before it is overwritten so receivers can diff against it"""
+    if raw or sender not in TRACKED_MODELS:
+        return
+    previous = None
+    if instance.pk is not None:
+        previous = sender._default_manager.filter(pk=instance.pk).first()
+    instance._stored_row = previous
+
+
+@receiver(post_save)
+def update_counters_on_save(sender, instance, raw=False, **kwargs):
+    if raw or sender not in COUNTED_MODELS:
+        return
+    previous = getattr(instance, '_stored_row', None)
+    deltas = Counter(counter_keys(instance))
+    deltas.subtract(counter_keys(previous) if previous is not None else [])
+    apply_deltas(deltas)
+
+
+@receiver(post_delete)
+def update_counters_on_delete(sender, instance, **kwargs):
+    if sender not in COUNTED_MODELS:
+        return
+    apply_deltas(Counter({key: -1 for key in counter_keys(instance)}))
+
+
+@receiver(post_delete)
+def record_sync_tombstone(sender, instance, **kwargs):
+    if sender in SYNCED_MODELS:
+        record_tombstone(instance)
+
+
+@receiver(post_save, sender=Task)
+def record_task_handover(sender, instance, raw=False, **kwargs):
+    """A worker only syncs their own tasks, so a reassigned task is a deletion for the previous one"""
+    previous = getattr(instance, '_stored_row', None)
+    if raw or previous is None or previous.assigned_to_id == instance.assigned_to_id:
+        return
+    users = dict(Worker.objects.filter(pk__in=[previous.assigned_to_id, instance.assigned_to_id])
+                 .values_list('pk', 'user_id'))
+    record_handover(instance, users.get(previous.assigned_to_id), users.get(instance.assigned_to_id))
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_fragments(sender, instance, raw=False, **kwargs):
+    if raw or sender not in TRACKED_MODELS:
+        return
+    groups = fragment_groups(instance)
+    previous = getattr(instance, '_stored_row', None)
+    if previous is not None:
+        groups += fragment_groups(previous)
+    transaction.on_commit(lambda: bump_versions(groups))
+
+
+@receiver(post_save, sender=Cow)
+def index_cow(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    index_cows([instance.pk])
+    previous = getattr(instance, '_stored_row', None)
+    if previous is not None and (previous.cow_number, previous.cow_name) != (instance.cow_number, instance.cow_name):
+        # Visit titles carry the cow's number and name
+        index_visits(instance.veterinary_visits.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Doctor)
+def reindex_doctor_visits(sender, instance, raw=False, **kwargs):
+    previous = getattr(instance, '_stored_row', None)
+    if raw or previous is None or previous.name == instance.name:
+        return
+    index_visits(instance.visits.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=VeterinaryVisit)
+def index_visit(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_visits([instance.pk])
+
+
+@receiver(post_delete, sender=VeterinaryVisit)
+def unindex_visit(sender, instance, **kwargs):
+    remove_documents('visit', [instance.pk])
+
+
+@receiver(post_save, sender=Medicine)
+@receiver(post_delete, sender=Medicine)
+def index_medicine_visit(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_visits([instance.visit_id])
+
+
+@receiver(post_save, sender=Cow)
+def refresh_cow_reminders(sender, instance, raw=False, **kwargs):
+    previous = getattr(instance, '_stored_row', None)
+    if raw or previous is None:
+        return
+    if (previous.caretaker_id, previous.is_active) != (instance.caretaker_id, instance.is_active):
+        refresh_reminders([instance.pk])
+
+
+@receiver(post_save, sender=Vaccination)
+@receiver(post_save, sender=VeterinaryVisit)
+@receiver(post_save, sender=Pregnancy)
+@receiver(post_delete, sender=Vaccination)
+@receiver(post_delete, sender=VeterinaryVisit)
+@receiver(post_delete, sender=Pregnancy)
+def refresh_source_reminders(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    cow_ids = {instance.cow_id}
+    previous = getattr(instance, '_stored_row', None)
+    if previous is not None:
+        cow_ids.add(previous.cow_id)
+    # Deferred so a cascading cow delete doesn't rebuild reminders for a row about to vanish
+    transaction.on_commit(lambda: refresh_reminders(cow_ids))
+
+
+@receiver(post_save, sender=ArtificialInsemination)
+@receiver(post_delete, sender=ArtificialInsemination)
+def refresh_service_breeding_stats(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    services = [instance]
+    previous = getattr(instance, '_stored_row', None)
+    if previous is not None:
+        services.append(previous)
+    cow_ids = {service.cow_id for service in services}
+    groups = service_groups(services)
+    transaction.on_commit(lambda: refresh_breeding_stats(cow_ids, groups))
+
+
+@receiver(post_save, sender=Pregnancy)
+@receiver(post_delete, sender=Pregnancy)
+def refresh_pregnancy_breeding_stats(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    pregnancies = [instance]
+    previous = getattr(instance, '_stored_row', None)
+    if previous is not None:
+        pregnancies.append(previous)
+    cow_ids = {pregnancy.cow_id for pregnancy in pregnancies}
+    service_ids = {pregnancy.ai_record_id for pregnancy in pregnancies if pregnancy.ai_record_id}
+
+    def refresh():
+        # The pregnancy decides the outcome of the service it is linked to
+        services = ArtificialInsemination.objects.filter(pk__in=service_ids)
+        refresh_breeding_stats(cow_ids, service_groups(services))
+    transaction.on_commit(refresh)
+
+
+@receiver(post_save, sender=Cow)
+def refresh_cow_status(sender, instance, created, raw=False, **kwargs):
+    previous = getattr(instance, '_stored_row', None)
+    if raw or not (created or previous is None or previous.is_active != instance.is_active):
+        return
+    refresh_status([instance.pk])
+
+
+@receiver(post_save, sender=VeterinaryVisit)
+@receiver(post_save, sender=Vaccination)
+@receiver(post_save, sender=ArtificialInsemination)
+@receiver(post_save, sender=Pregnancy)
+@receiver(post_delete, sender=VeterinaryVisit)
+@receiver(post_delete, sender=Vaccination)
+@receiver(post_delete, sender=ArtificialInsemination)
+@receiver(post_delete, sender=Pregnancy)
+def refresh_source_status(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    cow_ids = {instance.cow_id}
+    previous = getattr(instance, '_stored_row', None)
+    if previous is not None:
+        cow_ids.add(previous.cow_id)
+    transaction.on_commit(lambda: refresh_status(cow_ids))
+
+
+@receiver(post_save, sender=Medicine)
+@receiver(post_delete, sender=Medicine)
+def refresh_medicine_status(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # Looked up now: after a cascading visit delete the visit is gone by commit time
+    cow_ids = set(VeterinaryVisit.objects.filter(pk=instance.visit_id).values_list('cow_id', flat=True))
+    if cow_ids:
+        transaction.on_commit(lambda: refresh_status(cow_ids))
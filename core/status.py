@@ -0,0 +1,128 @@
+"""
+Per-cow status snapshot.
+
+The herd list filters and sorts on "last visit", "next vaccination due",
+"currently pregnant" and "on medication", each of which would otherwise be an
+aggregate over a different table per cow. ``CowStatus`` keeps one row per cow
+with those dates and a copy of ``Cow.is_active``, indexed, so the list is a
+single query that reads the matching index range and joins on the cow's
+primary key.
+
+Signals in ``core.signals`` refresh a cow's row whenever it is (de)activated
+or one of its visits, medicines, vaccinations, AI services or pregnancies
+changes. Queryset ``update()``/``bulk_create()`` bypass signals;
+``manage.py rebuild_cow_status`` recomputes everything (or, with ``--check``,
+reports the rows that drifted).
+"""
+import datetime
+
+from django.apps import apps as django_apps
+from django.db import transaction
+from django.db.models import Exists, Max, Min, OuterRef, Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .reminders import OPEN_PREGNANCY_STATUSES
+
+CHUNK_SIZE = 500
+STATUS_FIELDS = ('is_active', 'last_visit_date', 'last_vaccination_date', 'next_vaccination_due', 'last_ai_date',
+                 'expected_calving_date', 'medication_until')
+VACCINATION_DUE_DAYS = 7
+RECENT_VISIT_DAYS = 30
+# Herd list orderings (``CowFilterForm.sort``); the paginator adds the primary key
+HERD_ORDERINGS = {
+    'number': ['cow_number'],
+    'last_visit': ['status__last_visit_date'],
+    'next_vaccination': ['status__next_vaccination_due'],
+    'calving': ['status__expected_calving_date'],
+}
+
+
+def _chunks(ids, size=CHUNK_SIZE):
+    ids = list(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def build_statuses(cow_ids, apps=django_apps):
+    """Return unsaved ``CowStatus`` rows for the existing cows among ``cow_ids``"""
+    get_model = lambda name: apps.get_model('core', name)
+    CowStatus = get_model('CowStatus')
+    Vaccination = get_model('Vaccination')
+
+    statuses = {pk: CowStatus(cow_id=pk, is_active=is_active) for pk, is_active in get_model('Cow').objects
+                .filter(pk__in=cow_ids).values_list('pk', 'is_active')}
+    if not statuses:
+        return []
+
+    def fill(field, queryset, value, cow='cow_id'):
+        for pk, latest in queryset.order_by().values(cow).annotate(latest=value).values_list(cow, 'latest'):
+            setattr(statuses[pk], field, latest)
+
+    later_dose = Vaccination.objects.filter(
+        Q(vaccination_date__gt=OuterRef('vaccination_date'))
+        | Q(vaccination_date=OuterRef('vaccination_date'), pk__gt=OuterRef('pk')),
+        cow=OuterRef('cow'), vaccine_name=OuterRef('vaccine_name'),
+    )
+    fill('last_visit_date', get_model('VeterinaryVisit').objects.filter(cow_id__in=statuses), Max('visit_date'))
+    fill('last_vaccination_date', Vaccination.objects.filter(cow_id__in=statuses), Max('vaccination_date'))
+    fill('next_vaccination_due', Vaccination.objects.filter(cow_id__in=statuses, next_due_date__isnull=False)
+         .exclude(Exists(later_dose)), Min('next_due_date'))
+    fill('last_ai_date', get_model('ArtificialInsemination').objects.filter(cow_id__in=statuses), Max('ai_date'))
+    fill('expected_calving_date', get_model('Pregnancy').objects.filter(
+        cow_id__in=statuses, pregnancy_status__in=OPEN_PREGNANCY_STATUSES, actual_delivery_date__isnull=True,
+    ), Min('expected_delivery_date'))
+    # A course without an end date counts as its first day only
+    fill('medication_until', get_model('Medicine').objects.filter(visit__cow_id__in=statuses),
+         Max(Coalesce('end_date', 'start_date')), cow='visit__cow_id')
+    return list(statuses.values())
+
+
+def refresh_status(cow_ids, apps=django_apps):
+    """Replace the status rows of ``cow_ids`` with freshly built ones; return how many were written"""
+    CowStatus = apps.get_model('core', 'CowStatus')
+    total = 0
+    for chunk in _chunks(set(cow_ids)):
+        with transaction.atomic():
+            CowStatus.objects.filter(cow_id__in=chunk).delete()
+            total += len(CowStatus.objects.bulk_create(build_statuses(chunk, apps)))
+    return total
+
+
+def rebuild_status(apps=django_apps):
+    """Recompute the status of every cow from the source tables"""
+    apps.get_model('core', 'CowStatus').objects.all().delete()
+    return refresh_status(apps.get_model('core', 'Cow').objects.values_list('pk', flat=True), apps)
+
+
+def find_drift(apps=django_apps):
+    """Return ``{cow_id: {field: (stored, expected)}}`` for every status row that is off or missing"""
+    CowStatus = apps.get_model('core', 'CowStatus')
+    drift = {}
+    for chunk in _chunks(apps.get_model('core', 'Cow').objects.values_list('pk', flat=True)):
+        stored = CowStatus.objects.in_bulk(chunk)
+        for expected in build_statuses(chunk, apps):
+            row = stored.get(expected.cow_id)
+            fields = {
+                field: (getattr(row, field) if row else None, getattr(expected, field))
+                for field in STATUS_FIELDS
+                if row is None or getattr(row, field) != getattr(expected, field)
+            }
+            if fields:
+                drift[expected.cow_id] = fields
+    return drift
+
+
+def filter_herd(cows, status, day=None):
+    """Narrow a ``Cow`` queryset to one of the ``CowFilterForm.status`` groups"""
+    day = day or timezone.localdate()
+    if status == 'pregnant':
+        return cows.filter(status__expected_calving_date__isnull=False)
+    if status == 'medication':
+        return cows.filter(status__medication_until__gte=day)
+    if status == 'vaccination_due':
+        return cows.filter(status__next_vaccination_due__lte=day + datetime.timedelta(days=VACCINATION_DUE_DAYS))
+    if status == 'no_recent_visit':
+        since = day - datetime.timedelta(days=RECENT_VISIT_DAYS)
+        return cows.filter(Q(status__last_visit_date__lt=since) | Q(status__last_visit_date__isnull=True))
+    return cows
@@ -0,0 +1,138 @@
+"""
+Delta sync for offline field devices.
+
+A client keeps an opaque ``since`` token holding, per synced model, a
+high-water mark on ``(updated_at, id)`` for changed rows and one on
+``(deleted_at, id)`` for ``Tombstone`` rows. Each sync returns the rows and
+deletions past those marks in mark order, up to a row budget, plus the new
+token; ``more`` says the budget ran out and the client should call again
+straight away. Without a token the client gets every row and no deletions
+(a full resync).
+
+Only rows stamped before ``now - SYNC_SETTLE_SECONDS`` are handed out, so a
+transaction that stamped a row but has not committed yet cannot slip in
+behind a mark. A row that moves out of one user's view without being
+deleted (a task reassigned to another worker) gets a tombstone addressed to
+that user only. Tombstones older than ``SYNC_TOMBSTONE_DAYS`` are purged by
+``manage.py purge_tombstones``; a token older than that is refused and the
+client must resync from scratch.
+
+Uploads are made idempotent by the client-generated ``client_uuid`` of the
+records field devices create (see ``core.api``). Queryset ``update()`` does
+not touch ``auto_now`` fields, so bulk updates of synced models must set
+``updated_at`` themselves.
+"""
+import base64
+import binascii
+import datetime
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Tombstone
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+class StaleToken(Exception):
+    """The token predates the oldest tombstone kept; the client has to resync"""
+
+
+def to_stamp(moment):
+    return (moment - EPOCH) // datetime.timedelta(microseconds=1)
+
+
+def from_stamp(stamp):
+    return EPOCH + datetime.timedelta(microseconds=stamp)
+
+
+def encode_token(marks):
+    payload = json.dumps(marks, separators=(',', ':'), sort_keys=True)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_token(token):
+    """``{label: {'u': [stamp, pk], 'd': [stamp, pk]}}``; ``ValueError`` for a tampered token"""
+    try:
+        marks = json.loads(base64.urlsafe_b64decode((token + '=' * (-len(token) % 4)).encode()))
+        for mark in marks.values():
+            for key in ('u', 'd'):
+                stamp, pk = mark[key]
+                if not isinstance(stamp, int) or not isinstance(pk, int):
+                    raise ValueError
+    except (binascii.Error, ValueError, AttributeError, KeyError, TypeError):
+        raise ValueError('Invalid sync token.')
+    return marks
+
+
+def horizon(now=None):
+    return (now or timezone.now()) - datetime.timedelta(seconds=settings.SYNC_SETTLE_SECONDS)
+
+
+def _after(stamp_field, stamp, pk):
+    moment = from_stamp(stamp)
+    return Q(**{f'{stamp_field}__gt': moment}) | Q(**{stamp_field: moment, 'pk__gt': pk})
+
+
+def changes(queryset, mark, until, limit, user=None):
+    """
+    Return ``(rows, deleted_ids, mark, more)`` for one model: at most ``limit``
+    rows and tombstones past ``mark`` (``None`` for a full resync) and stamped
+    before ``until``. Tombstones addressed to a single user only go to ``user``.
+    """
+    label = queryset.model._meta.label_lower
+    if mark is None:
+        mark = {'u': [0, 0], 'd': [to_stamp(until), 0]}
+    elif mark['d'][0] < to_stamp(timezone.now() - datetime.timedelta(days=settings.SYNC_TOMBSTONE_DAYS)):
+        raise StaleToken(label)
+    caught_up = [to_stamp(until), 0]
+
+    rows = list(queryset.filter(_after('updated_at', *mark['u']), updated_at__lt=until)
+                .order_by('updated_at', 'pk')[:limit + 1])
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, [], {'u': [to_stamp(rows[-1].updated_at), rows[-1].pk], 'd': mark['d']}, True
+
+    budget = limit - len(rows)
+    recipients = Q(recipient__isnull=True) | Q(recipient=user) if user is not None else Q(recipient__isnull=True)
+    tombstones = list(Tombstone.objects.filter(_after('deleted_at', *mark['d']), recipients, model=label,
+                                               deleted_at__lt=until)
+                      .order_by('deleted_at', 'pk').values_list('pk', 'object_id', 'deleted_at')[:budget + 1])
+    more = len(tombstones) > budget
+    tombstones = tombstones[:budget]
+    if more:
+        pk, _, deleted_at = tombstones[-1] if tombstones else (mark['d'][1], None, from_stamp(mark['d'][0]))
+        deleted_mark = [to_stamp(deleted_at), pk]
+    else:
+        # Everything before ``until`` has been seen; moving the mark up keeps an
+        # idle model from making the token look stale
+        deleted_mark = max(mark['d'], caught_up)
+    deleted = [object_id for _, object_id, _ in tombstones]
+    return rows, deleted, {'u': max(mark['u'], caught_up), 'd': deleted_mark}, more
+
+
+def record_tombstone(instance, recipient_id=None):
+    Tombstone.objects.create(model=instance._meta.label_lower, object_id=instance.pk,
+                             client_uuid=getattr(instance, 'client_uuid', None), recipient_id=recipient_id)
+
+
+def record_handover(instance, from_user_id, to_user_id):
+    """
+    ``instance`` left ``from_user_id``'s view and entered ``to_user_id``'s:
+    tombstone it for the first, and drop any earlier tombstone of it for the
+    second, who gets the row itself again.
+    """
+    Tombstone.objects.filter(model=instance._meta.label_lower, object_id=instance.pk,
+                             recipient_id=to_user_id).delete()
+    if from_user_id is not None:
+        record_tombstone(instance, recipient_id=from_user_id)
+
+
+def purge_tombstones(days=None):
+    """Delete tombstones older than ``days`` (``SYNC_TOMBSTONE_DAYS``); return how many"""
+    days = settings.SYNC_TOMBSTONE_DAYS if days is None else days
+    cutoff = timezone.now() - datetime.timedelta(days=days)
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,54 @@
+from django import template
+from django.conf import settings
+from django.utils import translation
+
+from core.fragment_cache import fragment_key, get_cache, record_lookup
+
+register = template.Library()
+
+
+class CachedFragmentNode(template.Node):
+    def __init__(self, nodelist, name, groups):
+        self.nodelist = nodelist
+        self.name = name
+        self.groups = groups
+
+    def render(self, context):
+        user = context.get('user')
+        if user is None or not user.is_authenticated:
+            return self.nodelist.render(context)
+
+        name = self.name.resolve(context)
+        groups = [group.resolve(context) for group in self.groups]
+        key = fragment_key(name, user, translation.get_language(), groups)
+
+        cache = get_cache()
+        content = cache.get(key)
+        record_lookup(content is not None)
+        if content is None:
+            content = self.nodelist.render(context)
+            cache.set(key, content, settings.FRAGMENT_CACHE_TIMEOUT)
+        return content
+
+
+@register.tag
+def cachedfragment(parser, token):
+    """
+    Cache a template fragment per user, user type and language.
+
+    Usage::
+
+        {% cachedfragment "admin_stats" "tasks" "cows" %} ... {% endcachedfragment %}
+
+    The first argument names the fragment, the rest are the data groups whose
+    changes invalidate it (see ``core.fragment_cache.fragment_groups``).
+    ``"clock"`` re-renders the fragment every minute, for content that depends
+    on the current time.
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' tag requires at least a fragment name.")
+    nodelist = parser.parse(('endcachedfragment',))
+    parser.delete_first_token()
+    return CachedFragmentNode(nodelist, parser.compile_filter(bits[1]),
+                              [parser.compile_filter(bit) for bit in bits[2:]])
@@ -0,0 +1,430 @@
+import datetime
+import io
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models.query import QuerySet
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.forms.models import model_to_dict
+from django.utils import timezone
+from openpyxl import Workbook
+from PIL import Image
+
+from .benchmarks import run_benchmarks
+from .group_records import record_group_treatment, record_group_vaccination
+from .counters import find_drift as find_counter_drift, rebuild_counters
+from .images import RENDITION_FIELDS
+from .importers import HerdImporter, iter_rows
+from .overdue import SWEPT_STATUSES, sweep_overdue_tasks
+from .reminders import due_reminders
+from .models import (ArtificialInsemination, Cow, Doctor, Medicine, Pregnancy, Task, User, Vaccination,
+                     VeterinaryVisit, Worker)
+from .seeding import seed_farm
+from .status import find_drift
+
+
+class GroupRecordStatusTests(TestCase):
+    """Group writes use ``bulk_create``, so they must refresh the cow status snapshots themselves"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_farm(50, 1, workers=2, doctors=2, tasks_per_week=1)
+        cls.admin = User.objects.get(user_type='admin')
+        cls.doctor = Doctor.objects.first()
+        cls.cow_ids = list(Cow.objects.filter(is_active=True).values_list('pk', flat=True))
+
+    def test_no_drift_after_seeding(self):
+        self.assertEqual(find_drift(), {})
+
+    def test_group_vaccination(self):
+        template = Vaccination(vaccine_name='FMD', disease_prevention='Foot and mouth disease',
+                               vaccination_date='2099-01-01', next_due_date='2099-07-01',
+                               administered_by=self.doctor, dosage='2 ml', route='Subcutaneous')
+        record_group_vaccination(template, self.cow_ids, self.admin)
+        self.assertEqual(find_drift(), {})
+
+    def test_group_treatment(self):
+        template = VeterinaryVisit(doctor=self.doctor, visit_date='2099-01-01', visit_time='09:00',
+                                   visit_type='treatment', reason_for_visit='Mastitis outbreak')
+        medicine = Medicine(medicine_name='Ceftiofur', dosage='10 ml', frequency='Once a day', duration='3 days',
+                            start_date='2099-01-01', end_date='2099-01-03')
+        record_group_treatment(template, [medicine], self.cow_ids, self.admin)
+        self.assertEqual(find_drift(), {})
+
+
+class XlsxImportTests(TestCase):
+    def test_date_cells_read_as_iso_dates(self):
+        workbook = Workbook()
+        workbook.active.append(['cow', 'vaccination_date', 'next_due_date', 'dosage'])
+        workbook.active.append(['C001', datetime.datetime(2020, 1, 1), datetime.date(2020, 7, 1), 2])
+        file = io.BytesIO()
+        workbook.save(file)
+        file.seek(0)
+        self.assertEqual(list(iter_rows(file, 'vaccinations.xlsx')), [
+            (2, {'cow': 'C001', 'vaccination_date': '2020-01-01', 'next_due_date': '2020-07-01', 'dosage': '2'}),
+        ])
+
+
+class HerdImportReminderTests(TestCase):
+    """Imports use ``bulk_create``, so they must refresh the reminders themselves"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_farm(5, 1, workers=1, doctors=1, tasks_per_week=0)
+        cls.admin = User.objects.get(user_type='admin')
+        cls.cow = Cow.objects.filter(is_active=True).order_by('pk').first()
+        cls.doctor = Doctor.objects.first()
+
+    def test_imported_due_dates_are_reminded(self):
+        due = datetime.date(2099, 7, 1)
+        HerdImporter(self.admin).run(
+            vaccinations=[(2, {'cow': self.cow.cow_number, 'vaccine_name': 'Anthrax', 'disease_prevention': 'Anthrax',
+                               'vaccination_date': '2099-01-01', 'next_due_date': '2099-07-01',
+                               'administered_by': self.doctor.license_number, 'dosage': '2 ml',
+                               'route': 'Subcutaneous'})],
+            visits=[(2, {'cow': self.cow.cow_number, 'doctor': self.doctor.license_number, 'visit_date': '2099-01-01',
+                         'visit_time': '09:00', 'visit_type': 'routine', 'reason_for_visit': 'Lameness check',
+                         'next_visit_date': '2099-07-01'})],
+        )
+        self.assertEqual(sorted(due_reminders(due, due).filter(cow=self.cow).values_list('kind', 'title')),
+                         [('follow_up', 'Lameness check'), ('vaccination', 'Anthrax')])
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class CowPhotoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_farm(1, 1, workers=1, doctors=1, tasks_per_week=0)
+        cls.admin = User.objects.get(user_type='admin')
+        cls.cow = Cow.objects.get()
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.client.force_login(self.admin)
+
+    def post(self, **data):
+        fields = ['cow_number', 'cow_name', 'breed', 'age', 'color', 'identification_mark', 'health_status',
+                  'last_checkup', 'notes', 'caretaker', 'is_active']
+        data = {**{key: value for key, value in model_to_dict(self.cow, fields).items() if value is not None}, **data}
+        response = self.client.post(reverse('cow_update', args=[self.cow.pk]), data, secure=True)
+        self.assertEqual(response.status_code, 302)
+        return Cow.objects.get(pk=self.cow.pk)
+
+    def test_clearing_the_photo_clears_the_renditions(self):
+        photo = io.BytesIO()
+        Image.new('RGB', (1200, 800), 'brown').save(photo, 'JPEG')
+        cow = self.post(photo=SimpleUploadedFile('cow.jpg', photo.getvalue(), content_type='image/jpeg'))
+        paths = [getattr(cow, name).path for name in RENDITION_FIELDS]
+        self.assertTrue(all(os.path.exists(path) for path in paths))
+
+        cow = self.post(**{'photo-clear': 'on'})
+        self.assertFalse(cow.photo)
+        self.assertFalse(any(getattr(cow, name) for name in RENDITION_FIELDS))
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+        response = self.client.get(reverse('cow_detail', args=[cow.pk]), secure=True)
+        self.assertNotContains(response, 'renditions/')
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class ViewQueryCountTests(TestCase):
+    """
+    Query ceilings for the list and detail pages on a seeded herd. A view
+    that starts issuing a query per row fails here long before production
+    notices; raise a ceiling only together with the reason it went up.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_farm(200, 2, workers=5, doctors=3, tasks_per_week=3)
+        cls.admin = User.objects.get(user_type='admin')
+        cls.worker = Worker.objects.filter(is_active=True, tasks__isnull=False).order_by('pk').first()
+        cls.cow = Cow.objects.order_by('pk')[100]
+
+    def setUp(self):
+        # Measure the fragment cache misses, the expensive path
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def assertQueryCeiling(self, url, queries):
+        with self.assertNumQueries(queries):
+            response = self.client.get(url, secure=True)
+        self.assertEqual(response.status_code, 200)
+
+    def test_ai_list(self):
+        self.assertQueryCeiling(reverse('ai_list'), 3)
+
+    def test_vaccination_list(self):
+        self.assertQueryCeiling(reverse('vaccination_list'), 3)
+
+    def test_pregnancy_list(self):
+        self.assertQueryCeiling(reverse('pregnancy_list'), 3)
+
+    def test_worker_task_list(self):
+        self.client.force_login(self.worker.user)
+        self.assertQueryCeiling(reverse('task_list'), 4)
+
+    def test_cow_detail(self):
+        self.assertQueryCeiling(reverse('cow_detail', args=[self.cow.pk]), 4)
+
+    def test_veterinary_dashboard(self):
+        self.assertQueryCeiling(reverse('veterinary_dashboard'), 6)
+
+
+class IndexUsageTests(TestCase):
+    """
+    The hot list, dashboard and overdue queries must keep using the indexes
+    declared for them. Lists are ordered the way ``paginate`` orders them and
+    must not sort in a temporary b-tree either. The plans are SQLite's; the
+    same indexes serve these queries on PostgreSQL.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_farm(50, 1, workers=3, doctors=1, tasks_per_week=2)
+        cls.worker = Worker.objects.filter(tasks__isnull=False).order_by('pk').first()
+        cls.cow = Cow.objects.order_by('pk').first()
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(f'INDEX {index}', plan)
+        self.assertNotIn('TEMP B-TREE FOR ORDER BY', plan)
+
+    def test_task_lists(self):
+        tasks = Task.objects.with_overdue().order_by('-created_at', '-pk')
+        self.assertUsesIndex(tasks[:51], 'task_created_idx')
+        self.assertUsesIndex(tasks.filter(assigned_to=self.worker)[:51], 'task_worker_created_idx')
+        self.assertUsesIndex(tasks.filter(status='pending')[:51], 'task_status_created_idx')
+        self.assertUsesIndex(tasks.filter(assigned_to=self.worker, status='pending')[:51], 'task_worker_status_idx')
+
+    def test_overdue_tasks(self):
+        now = timezone.now()
+        self.assertUsesIndex(Task.objects.overdue(now).order_by(), 'task_status_deadline_idx')
+        self.assertUsesIndex(Task.objects.filter(status__in=SWEPT_STATUSES, deadline__lt=now).order_by(),
+                             'task_status_deadline_idx')
+        self.assertUsesIndex(Task.objects.filter(status='overdue', deadline__gte=now).order_by(),
+                             'task_status_deadline_idx')
+        self.assertUsesIndex(Task.objects.filter(assigned_to=self.worker).overdue(now).order_by(),
+                             'task_worker_status_idx')
+
+    def test_cows(self):
+        self.assertUsesIndex(Cow.objects.filter(is_active=True).order_by('cow_number')[:5], 'cow_active_idx')
+
+    def test_veterinary_lists(self):
+        self.assertUsesIndex(VeterinaryVisit.objects.order_by('-visit_date', '-visit_time', '-pk')[:51],
+                             'visit_date_idx')
+        self.assertUsesIndex(VeterinaryVisit.objects.filter(cow=self.cow), 'visit_cow_date_idx')
+        self.assertUsesIndex(ArtificialInsemination.objects.order_by('-ai_date', '-pk')[:51], 'ai_date_idx')
+        self.assertUsesIndex(ArtificialInsemination.objects.filter(success_status='Pending'), 'ai_status_date_idx')
+        self.assertUsesIndex(Pregnancy.objects.order_by('-confirmation_date', '-pk')[:51], 'pregnancy_confirmed_idx')
+        self.assertUsesIndex(Pregnancy.objects.filter(pregnancy_status='confirmed'), 'pregnancy_status_idx')
+        self.assertUsesIndex(Vaccination.objects.order_by('-vaccination_date', '-pk')[:51], 'vaccination_date_idx')
+        self.assertUsesIndex(Vaccination.objects.filter(next_due_date__gte=timezone.localdate())
+                             .order_by('next_due_date'), 'vaccination_due_idx')
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class DashboardBudgetTests(TestCase):
+    """The dashboards read counters and indexed counts, so 100k tasks must not slow them down"""
+    TASKS = 100_000
+    # Median of the timed requests, in milliseconds; generous for a slow CI machine
+    BUDGET_MS = 250
+    REPEAT = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_farm(50, 1, workers=10, doctors=2, tasks_per_week=0)
+        cls.admin = User.objects.get(user_type='admin')
+        cls.worker = Worker.objects.filter(is_active=True).order_by('pk').first()
+        workers = list(Worker.objects.order_by('pk'))
+        now = timezone.now()
+        statuses = [status for status, _ in Task.STATUS_CHOICES]
+        Task.objects.bulk_create([
+            Task(title=f'Task {number}', description='Seeded', assigned_to=workers[number % len(workers)],
+                 assigned_by=cls.admin, deadline=now + datetime.timedelta(hours=number % 500 - 250),
+                 status=statuses[number % len(statuses)])
+            for number in range(cls.TASKS)
+        ], batch_size=5000)
+        rebuild_counters()
+
+    def setUp(self):
+        cache.clear()
+
+    def assertWithinBudget(self, url, queries):
+        self.client.get(url, secure=True)
+        timings = []
+        for _ in range(self.REPEAT):
+            cache.clear()
+            with self.assertNumQueries(queries):
+                started = time.perf_counter()
+                response = self.client.get(url, secure=True)
+                timings.append((time.perf_counter() - started) * 1000)
+            self.assertEqual(response.status_code, 200)
+        median = statistics.median(timings)
+        self.assertLess(median, self.BUDGET_MS, f'{url} took {median:.1f} ms')
+        return response
+
+    def test_admin_dashboard(self):
+        self.client.force_login(self.admin)
+        response = self.assertWithinBudget(reverse('dashboard'), 6)
+        self.assertEqual(response.context['total_tasks'], Task.objects.count())
+        self.assertEqual(response.context['pending_tasks'], Task.objects.filter(status='pending').count())
+        self.assertEqual(response.context['overdue_tasks'], Task.objects.overdue().count())
+
+    def test_worker_dashboard(self):
+        self.client.force_login(self.worker.user)
+        response = self.assertWithinBudget(reverse('dashboard'), 6)
+        tasks = Task.objects.filter(assigned_to=self.worker)
+        self.assertEqual(response.context['pending_tasks'], tasks.filter(status='pending').count())
+        self.assertEqual(response.context['completed_tasks'], tasks.filter(status='completed').count())
+        self.assertEqual(response.context['overdue_tasks'], tasks.overdue().count())
+
+    def test_veterinary_dashboard(self):
+        self.client.force_login(self.admin)
+        self.assertWithinBudget(reverse('veterinary_dashboard'), 6)
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class DashboardClockTests(TestCase):
+    """The cached dashboard fragments must notice a deadline passing, though no row changed"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_farm(5, 1, workers=1, doctors=1, tasks_per_week=0)
+        cls.admin = User.objects.get(user_type='admin')
+        cls.worker = Worker.objects.get()
+        cls.task = Task.objects.create(title='Check the water troughs', description='Before noon',
+                                       assigned_to=cls.worker, assigned_by=cls.admin,
+                                       deadline=timezone.now() + datetime.timedelta(minutes=2))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_deadline_passing_shows_on_the_dashboards(self):
+        for user in (self.admin, self.worker.user):
+            self.client.force_login(user)
+            response = self.client.get(reverse('dashboard'), secure=True)
+            self.assertNotContains(response, 'overdue-row')
+            self.assertRegex(response.content.decode(), r'<h3>0</h3>\s*<p>Overdue')
+            later = timezone.now() + datetime.timedelta(minutes=3)
+            with mock.patch('django.utils.timezone.now', return_value=later):
+                response = self.client.get(reverse('dashboard'), secure=True)
+            self.assertEqual(response.context['overdue_tasks'], 1)
+            self.assertRegex(response.content.decode(), r'<h3>1</h3>\s*<p>Overdue')
+            self.assertContains(response, 'overdue-row')
+
+
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class TaskReassignmentSyncTests(TestCase):
+    """A reassigned task must leave the previous assignee's devices and only theirs"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_farm(5, 1, workers=3, doctors=1, tasks_per_week=0)
+        cls.admin = User.objects.get(user_type='admin')
+        cls.first, cls.second = Worker.objects.order_by('pk')[:2]
+        cls.task = Task.objects.create(title='Clean the shed', description='Before noon', assigned_to=cls.first,
+                                       assigned_by=cls.admin, deadline=timezone.now() + datetime.timedelta(days=1))
+
+    def sync(self, user, since=''):
+        self.client.force_login(user)
+        response = self.client.get(reverse('api_sync'), {'resources': 'tasks', 'since': since}, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def task_ids(self, payload):
+        return [row['id'] for row in payload['changes']['tasks']]
+
+    def test_previous_assignee_gets_a_tombstone(self):
+        first = self.sync(self.first.user)
+        second = self.sync(self.second.user)
+        admin = self.sync(self.admin)
+        self.assertIn(self.task.pk, self.task_ids(first))
+        time.sleep(0.01)
+
+        self.task.assigned_to = self.second
+        self.task.save()
+        time.sleep(0.01)
+        self.assertEqual(self.sync(self.first.user, first['since'])['deleted']['tasks'], [self.task.pk])
+        second = self.sync(self.second.user, second['since'])
+        self.assertEqual(self.task_ids(second), [self.task.pk])
+        self.assertEqual(second['deleted']['tasks'], [])
+        self.assertEqual(self.sync(self.admin, admin['since'])['deleted']['tasks'], [])
+
+    def test_reassigning_back_cancels_the_tombstone(self):
+        first = self.sync(self.first.user)
+        self.task.assigned_to = self.second
+        self.task.save()
+        self.task.assigned_to = self.first
+        self.task.save()
+        time.sleep(0.01)
+        payload = self.sync(self.first.user, first['since'])
+        self.assertEqual(self.task_ids(payload), [self.task.pk])
+        self.assertEqual(payload['deleted']['tasks'], [])
+
+
+class BenchmarkTests(TestCase):
+    """The settings use the manifest storage, and the benchmark must not need collectstatic first"""
+
+    def test_pages_render_without_collectstatic(self):
+        seed_farm(5, 1, workers=1, doctors=1, tasks_per_week=0)
+        results = run_benchmarks(User.objects.get(user_type='admin'), repeat=1, names=['dashboard'])
+        self.assertEqual({row['status'] for row in results['urls'].values()}, {200})
+
+
+class OverdueSweepTests(TestCase):
+    """The sweep updates tasks with ``update()``, so it keeps the stored counters in step itself"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_farm(5, 1, workers=3, doctors=1, tasks_per_week=0)
+        admin = User.objects.get(user_type='admin')
+        workers = list(Worker.objects.order_by('pk'))
+        now = timezone.now()
+        for number in range(12):
+            Task.objects.create(title=f'Task {number}', description='Seeded', assigned_to=workers[number % 3],
+                                assigned_by=admin, deadline=now + datetime.timedelta(hours=number - 8, minutes=30),
+                                status=('pending', 'in_progress')[number % 2])
+
+    def test_counters_follow_repeated_and_interleaved_sweeps(self):
+        self.assertEqual(sweep_overdue_tasks(), (8, 0))
+        self.assertEqual(sweep_overdue_tasks(), (0, 0))
+        self.assertEqual(find_counter_drift(), {})
+
+        # A worker completes one overdue task and another gets a later deadline between sweeps
+        completed, extended = Task.objects.filter(status='overdue').order_by('pk')[:2]
+        completed.status = 'completed'
+        completed.save()
+        extended.deadline = timezone.now() + datetime.timedelta(days=1)
+        extended.save()
+        self.assertEqual(sweep_overdue_tasks(), (0, 1))
+        self.assertEqual(sweep_overdue_tasks(), (0, 0))
+        self.assertEqual(find_counter_drift(), {})
+        self.assertEqual(Task.objects.filter(status='overdue').count(), 6)
+
+    def test_counters_follow_changes_between_read_and_update(self):
+        completed = Task.objects.filter(deadline__lt=timezone.now()).order_by('pk').first()
+        update = QuerySet.update
+        interleaved = []
+
+        def update_after_others(queryset, **kwargs):
+            # Another process completes a task and sweeps between this sweep's read and its first UPDATE
+            if not interleaved:
+                interleaved.append(True)
+                completed.status = 'completed'
+                completed.save()
+                sweep_overdue_tasks()
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', update_after_others):
+            self.assertEqual(sweep_overdue_tasks(), (0, 0))
+        self.assertEqual(find_counter_drift(), {})
+        self.assertEqual(Task.objects.filter(status='overdue').count(), 7)
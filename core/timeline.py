@@ -0,0 +1,145 @@
+"""
+Medical timeline of one cow.
+
+Visits, the medicines given at them, AI services, pregnancy confirmations,
+calvings and vaccinations are read with one ``UNION ALL`` query. Every branch
+selects the same columns (``rank`` tells the kinds apart and orders events of
+the same day, ``day`` is the event date), so a page of mixed events costs one
+round trip and no per-kind queries.
+
+Pages are keyset based like ``core.pagination``: ordered by ``(day DESC,
+rank, id DESC)`` and continued from a cursor naming the last event shown. A
+combined query cannot be filtered, so the "after the cursor" condition is
+pushed into each branch, where it narrows the branch's cow index lookup.
+Older pages are fetched by ``cow_timeline`` as HTML fragments.
+"""
+import datetime
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db.models import DateField, F, IntegerField, Q, Value
+from django.db.models.functions import Coalesce
+from django.urls import reverse
+
+from .models import ArtificialInsemination, Medicine, Pregnancy, Vaccination, VeterinaryVisit
+from .pagination import KeysetPage
+
+COLUMNS = ('rank', 'day', 'object_id', 'parent_id', 'title', 'detail', 'note', 'person', 'next_day')
+NO_DATE = Value(None, output_field=DateField())
+NO_ID = Value(None, output_field=IntegerField())
+
+# (kind, queryset, cow lookup, date field, other columns); the rank is the position
+SOURCES = (
+    ('visit', lambda: VeterinaryVisit.objects.all(), 'cow_id', 'visit_date', {
+        'parent_id': NO_ID, 'title': F('visit_type'), 'detail': F('diagnosis'), 'note': F('treatment_given'),
+        'person': F('doctor__name'), 'next_day': F('next_visit_date'),
+    }),
+    ('medicine', lambda: Medicine.objects.all(), 'visit__cow_id', 'start_date', {
+        'parent_id': F('visit_id'), 'title': F('medicine_name'), 'detail': F('dosage'), 'note': F('duration'),
+        'person': F('visit__doctor__name'), 'next_day': F('end_date'),
+    }),
+    ('ai', lambda: ArtificialInsemination.objects.all(), 'cow_id', 'ai_date', {
+        'parent_id': NO_ID, 'title': F('bull_breed'), 'detail': F('bull_id'), 'note': F('success_status'),
+        'person': Coalesce('doctor__name', 'technician_name'), 'next_day': F('expected_calving_date'),
+    }),
+    ('pregnancy', lambda: Pregnancy.objects.all(), 'cow_id', 'confirmation_date', {
+        'parent_id': NO_ID, 'title': F('pregnancy_status'), 'detail': F('delivery_type'),
+        'note': F('complications'), 'person': F('confirmed_by__name'), 'next_day': F('expected_delivery_date'),
+    }),
+    ('calving', lambda: Pregnancy.objects.filter(actual_delivery_date__isnull=False), 'cow_id',
+     'actual_delivery_date', {
+        'parent_id': NO_ID, 'title': F('calf_gender'), 'detail': F('delivery_type'), 'note': F('complications'),
+        'person': F('confirmed_by__name'), 'next_day': NO_DATE,
+    }),
+    ('vaccination', lambda: Vaccination.objects.all(), 'cow_id', 'vaccination_date', {
+        'parent_id': NO_ID, 'title': F('vaccine_name'), 'detail': F('disease_prevention'),
+        'note': F('batch_number'), 'person': F('administered_by__name'), 'next_day': F('next_due_date'),
+    }),
+)
+KINDS = [kind for kind, *_ in SOURCES]
+VISIT_TYPES = dict(VeterinaryVisit.VISIT_TYPE_CHOICES)
+PREGNANCY_STATUSES = dict(Pregnancy.PREGNANCY_STATUS_CHOICES)
+
+
+@dataclass
+class TimelineEvent:
+    rank: int
+    day: datetime.date
+    object_id: int
+    parent_id: int
+    title: str
+    detail: str
+    note: str
+    person: str
+    next_day: datetime.date
+
+    @property
+    def kind(self):
+        return KINDS[self.rank]
+
+    @property
+    def label(self):
+        if self.kind == 'visit':
+            return VISIT_TYPES.get(self.title, self.title)
+        if self.kind == 'pregnancy':
+            return PREGNANCY_STATUSES.get(self.title, self.title)
+        return self.title
+
+    @property
+    def url(self):
+        if self.kind == 'visit':
+            return reverse('visit_detail', args=[self.object_id])
+        if self.kind == 'medicine':
+            return reverse('visit_detail', args=[self.parent_id])
+        if self.kind == 'ai':
+            return reverse('ai_detail', args=[self.object_id])
+        if self.kind in ('pregnancy', 'calving'):
+            return reverse('pregnancy_update', args=[self.object_id])
+        return None
+
+    @property
+    def cursor(self):
+        return f'{self.day.isoformat()}.{self.rank}.{self.object_id}'
+
+
+def decode_cursor(cursor):
+    """``(day, rank, object_id)`` or ``None`` for a missing or tampered cursor"""
+    try:
+        day, rank, object_id = (cursor or '').split('.')
+        day, rank, object_id = datetime.date.fromisoformat(day), int(rank), int(object_id)
+    except ValueError:
+        return None
+    if not 0 <= rank < len(SOURCES):
+        return None
+    return day, rank, object_id
+
+
+def _after(rank, date_field, position):
+    """Rows of branch ``rank`` that come after ``position`` in ``(day DESC, rank, id DESC)`` order"""
+    day, cursor_rank, object_id = position
+    if rank < cursor_rank:
+        return Q(**{f'{date_field}__lt': day})
+    if rank > cursor_rank:
+        return Q(**{f'{date_field}__lte': day})
+    return Q(**{f'{date_field}__lt': day}) | Q(**{date_field: day, 'pk__lt': object_id})
+
+
+def timeline_query(cow_id, position=None):
+    branches = []
+    for rank, (kind, queryset, cow_lookup, date_field, columns) in enumerate(SOURCES):
+        queryset = queryset().filter(**{cow_lookup: cow_id})
+        if position is not None:
+            queryset = queryset.filter(_after(rank, date_field, position))
+        branches.append(queryset.annotate(
+            rank=Value(rank, output_field=IntegerField()), day=F(date_field), object_id=F('pk'), **columns,
+        ).values_list(*COLUMNS).order_by())
+    return branches[0].union(*branches[1:], all=True).order_by('-day', 'rank', '-object_id')
+
+
+def cow_timeline(cow_id, cursor=None, per_page=None):
+    """A ``KeysetPage`` of the cow's events from newest to oldest, continuing after ``cursor``"""
+    per_page = per_page or settings.TIMELINE_PAGE_SIZE
+    rows = list(timeline_query(cow_id, decode_cursor(cursor))[:per_page + 1])
+    events = [TimelineEvent(*row) for row in rows[:per_page]]
+    next_cursor = events[-1].cursor if len(rows) > per_page else None
+    return KeysetPage(events, next_cursor)
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     # Authentication
@@ -19,11 +19,17 @@ urlpatterns = [
     path('tasks/<int:pk>/', views.task_detail, name='task_detail'),
     path('tasks/<int:pk>/update/', views.task_update, name='task_update'),
     path('tasks/<int:pk>/delete/', views.task_delete, name='task_delete'),
+    path('tasks/templates/', views.task_template_list, name='task_template_list'),
+    path('tasks/templates/create/', views.task_template_create, name='task_template_create'),
+    path('tasks/templates/<int:pk>/update/', views.task_template_update, name='task_template_update'),
+    path('tasks/templates/<int:pk>/delete/', views.task_template_delete, name='task_template_delete'),
     
     # Cow Management
     path('cows/', views.cow_list, name='cow_list'),
     path('cows/create/', views.cow_create, name='cow_create'),
+    path('cows/import/', views.cow_import, name='cow_import'),
     path('cows/<int:pk>/', views.cow_detail, name='cow_detail'),
+    path('cows/<int:pk>/timeline/', views.cow_timeline_page, name='cow_timeline'),
     path('cows/<int:pk>/update/', views.cow_update, name='cow_update'),
     path('cows/<int:pk>/delete/', views.cow_delete, name='cow_delete'),
     
@@ -37,6 +43,7 @@ urlpatterns = [
     
     # Veterinary Visits
     path('veterinary/visits/<int:cow_id>/create/', views.visit_create, name='visit_create'),
+    path('veterinary/visits/group/', views.visit_group_create, name='visit_group_create'),
     path('veterinary/visits/<int:pk>/', views.visit_detail, name='visit_detail'),
     
     # Medicines
@@ -57,5 +64,29 @@ urlpatterns = [
     # Vaccination
     path('veterinary/vaccination/', views.vaccination_list, name='vaccination_list'),
     path('veterinary/vaccination/create/', views.vaccination_create, name='vaccination_create'),
+    path('veterinary/vaccination/group/', views.vaccination_group_create, name='vaccination_group_create'),
     path('veterinary/vaccination/<int:cow_id>/create/', views.vaccination_create, name='vaccination_create_for_cow'),
+    
+    # Breeding analytics
+    path('veterinary/analytics/', views.breeding_analytics, name='breeding_analytics'),
+    
+    # Reminders
+    path('veterinary/reminders/', views.reminder_list, name='reminder_list'),
+    
+    # Exports
+    path('veterinary/export/<str:kind>/', views.record_export, name='record_export'),
+    
+    # Search
+    path('search/', views.search, name='search'),
+    path('autocomplete/<str:lookup>/', views.autocomplete, name='autocomplete'),
+    
+    # JSON API
+    path('api/v1/', api.api_index, name='api_index'),
+    path('api/v1/sync/', api.api_sync, name='api_sync'),
+    path('api/v1/<str:name>/', api.api_collection, name='api_collection'),
+    path('api/v1/<str:name>/batch/', api.api_batch, name='api_batch'),
+    path('api/v1/<str:name>/<int:pk>/', api.api_item, name='api_item'),
+    
+    # Monitoring
+    path('metrics', views.metrics, name='metrics'),
 ]
@@ -1,12 +1,39 @@
+import csv
+import datetime
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse, Http404
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
 from django.contrib import messages
 from django.utils import timezone
+from django.utils.translation import gettext as _, ngettext
+from django.db import transaction
 from django.db.models import Q, Count
-from .models import (User, Worker, Task, Cow, Doctor, VeterinaryVisit, 
-                     Medicine, ArtificialInsemination, Pregnancy, Vaccination)
-from .forms import WorkerCreationForm, TaskForm, CowForm, TaskUpdateForm
+from .models import (User, Worker, Task, TaskTemplate, Cow, Doctor, VeterinaryVisit, 
+                     Medicine, ArtificialInsemination, Pregnancy, Vaccination, Reminder, BreedingStat)
+from .forms import (WorkerCreationForm, TaskForm, TaskTemplateForm, CowForm, CowFilterForm, TaskUpdateForm,
+                    HerdImportForm)
+from .importers import DEFAULT_BATCH_SIZE, HerdImporter, HerdImportError, iter_rows
+from .exporters import EXPORTS, export_content_type, export_filename, stream_export
+from .analytics import open_cows
+from .autocomplete import LOOKUPS, suggest
+from . import concurrency
+from .counters import get_counters, task_status_key
+from .fragment_cache import worker_task_group
+from .group_records import record_group_treatment, record_group_vaccination
+from .images import generate_renditions
+from .metrics import render_metrics
+from .middleware import set_language
+from .pagination import paginate
+from .recurring import cancel_pending, generate_tasks, reschedule
+from .reminders import due_reminders, week_bounds
+from .search import search as search_documents
+from .status import HERD_ORDERINGS, filter_herd
+from .timeline import cow_timeline
 
 
 def login_view(request):
@@ -17,22 +44,22 @@ def login_view(request):
     if request.method == 'POST':
         username = request.POST.get('username')
         password = request.POST.get('password')
-        language = request.POST.get('language', 'en')
         
         user = authenticate(request, username=username, password=password)
         
         if user is not None:
             login(request, user)
-            request.session['language'] = language
-            messages.success(request, 'Login successful!' if language == 'en' else 'लॉगिन यशस्वी!')
+            set_language(request, request.POST.get('language'))
+            messages.success(request, _('Login successful!'))
             return redirect('dashboard')
         else:
-            messages.error(request, 'Invalid credentials!' if language == 'en' else 'अवैध प्रमाणपत्रे!')
+            messages.error(request, _('Invalid credentials!'))
     
-    language = request.GET.get('lang', 'en')
+    if 'lang' in request.GET:
+        set_language(request, request.GET['lang'])
     
     # Render with cache control headers
-    response = render(request, 'login.html', {'language': language})
+    response = render(request, 'login.html')
     response['Cache-Control'] = 'no-cache, no-store, must-revalidate'
     response['Pragma'] = 'no-cache'
     response['Expires'] = '0'
@@ -52,31 +79,30 @@ def logout_view(request):
     response['Pragma'] = 'no-cache'
     response['Expires'] = '0'
     
-    messages.success(request, 'Logged out successfully!')
+    messages.success(request, _('Logged out successfully!'))
     return response
 
 
 @login_required
 def dashboard(request):
     """Main dashboard - different views for admin and worker"""
-    language = request.session.get('language', 'en')
-    
     if request.user.user_type == 'admin':
         # Admin Dashboard
-        total_workers = Worker.objects.filter(is_active=True).count()
-        total_tasks = Task.objects.all().count()
-        pending_tasks = Task.objects.filter(status='pending').count()
-        total_cows = Cow.objects.filter(is_active=True).count()
+        counters, overdue_tasks = concurrency.gather(
+            lambda: get_counters(['workers.active', 'tasks.total', task_status_key('pending'), 'cows.active']),
+            Task.objects.overdue_count,
+        )
         
-        recent_tasks = Task.objects.all()[:5]
+        # Only read on a fragment cache miss, so left lazy
+        recent_tasks = Task.objects.select_related('assigned_to__user').with_overdue()[:5]
         recent_cows = Cow.objects.filter(is_active=True)[:5]
         
         context = {
-            'language': language,
-            'total_workers': total_workers,
-            'total_tasks': total_tasks,
-            'pending_tasks': pending_tasks,
-            'total_cows': total_cows,
+            'total_workers': counters['workers.active'],
+            'total_tasks': counters['tasks.total'],
+            'pending_tasks': counters[task_status_key('pending')],
+            'overdue_tasks': overdue_tasks,
+            'total_cows': counters['cows.active'],
             'recent_tasks': recent_tasks,
             'recent_cows': recent_cows,
         }
@@ -85,22 +111,27 @@ def dashboard(request):
         # Worker Dashboard
         try:
             worker = request.user.worker_profile
-            my_tasks = Task.objects.filter(assigned_to=worker)
-            pending_tasks = my_tasks.filter(status='pending').count()
-            in_progress_tasks = my_tasks.filter(status='in_progress').count()
-            completed_tasks = my_tasks.filter(status='completed').count()
-            
-            context = {
-                'language': language,
-                'my_tasks': my_tasks[:10],
-                'pending_tasks': pending_tasks,
-                'in_progress_tasks': in_progress_tasks,
-                'completed_tasks': completed_tasks,
-            }
-            return render(request, 'worker_dashboard.html', context)
-        except:
-            messages.error(request, 'Worker profile not found!')
+        except Worker.DoesNotExist:
+            messages.error(request, _('Worker profile not found!'))
             return redirect('login')
+        my_tasks = Task.objects.filter(assigned_to=worker)
+        pending_key = task_status_key('pending', worker.pk)
+        in_progress_key = task_status_key('in_progress', worker.pk)
+        completed_key = task_status_key('completed', worker.pk)
+        counters, overdue_tasks = concurrency.gather(
+            lambda: get_counters([pending_key, in_progress_key, completed_key]),
+            my_tasks.overdue_count,
+        )
+        
+        context = {
+            'my_tasks': my_tasks.with_overdue()[:10],
+            'pending_tasks': counters[pending_key],
+            'in_progress_tasks': counters[in_progress_key],
+            'completed_tasks': counters[completed_key],
+            'overdue_tasks': overdue_tasks,
+            'task_group': worker_task_group(worker.pk),
+        }
+        return render(request, 'worker_dashboard.html', context)
 
 
 # Worker Management Views
@@ -108,111 +139,101 @@ def dashboard(request):
 def worker_list(request):
     """List all workers (Admin only)"""
     if request.user.user_type != 'admin':
-        messages.error(request, 'Access denied!')
+        messages.error(request, _('Access denied!'))
         return redirect('dashboard')
     
-    language = request.session.get('language', 'en')
-    workers = Worker.objects.select_related('user').all()
+    workers = paginate(request, Worker.objects.select_related('user').all())
     
-    return render(request, 'worker_list.html', {'workers': workers, 'language': language})
+    return render(request, 'worker_list.html', {'workers': workers})
 
 
 @login_required
 def worker_create(request):
     """Create new worker (Admin only)"""
     if request.user.user_type != 'admin':
-        messages.error(request, 'Access denied!')
+        messages.error(request, _('Access denied!'))
         return redirect('dashboard')
     
-    language = request.session.get('language', 'en')
-    
     if request.method == 'POST':
         form = WorkerCreationForm(request.POST)
         if form.is_valid():
             form.save()
-            messages.success(request, 'Worker created successfully!' if language == 'en' else 'कामगार यशस्वीरित्या तयार केला!')
+            messages.success(request, _('Worker created successfully!'))
             return redirect('worker_list')
     else:
         form = WorkerCreationForm()
     
-    return render(request, 'worker_form.html', {'form': form, 'language': language})
+    return render(request, 'worker_form.html', {'form': form})
 
 
 @login_required
 def worker_delete(request, pk):
     """Delete worker (Admin only)"""
     if request.user.user_type != 'admin':
-        messages.error(request, 'Access denied!')
+        messages.error(request, _('Access denied!'))
         return redirect('dashboard')
     
-    language = request.session.get('language', 'en')
     worker = get_object_or_404(Worker, pk=pk)
     
     if request.method == 'POST':
         worker.is_active = False
         worker.save()
-        messages.success(request, 'Worker deactivated!' if language == 'en' else 'कामगार निष्क्रिय केला!')
+        messages.success(request, _('Worker deactivated!'))
         return redirect('worker_list')
     
-    return render(request, 'worker_confirm_delete.html', {'worker': worker, 'language': language})
+    return render(request, 'worker_confirm_delete.html', {'worker': worker})
 
 
 # Task Management Views
 @login_required
 def task_list(request):
     """List all tasks"""
-    language = request.session.get('language', 'en')
-    
     if request.user.user_type == 'admin':
         tasks = Task.objects.select_related('assigned_to__user', 'assigned_by').all()
     else:
         worker = request.user.worker_profile
-        tasks = Task.objects.filter(assigned_to=worker)
+        tasks = Task.objects.select_related('assigned_to__user').filter(assigned_to=worker)
     
-    return render(request, 'task_list.html', {'tasks': tasks, 'language': language})
+    return render(request, 'task_list.html', {'tasks': paginate(request, tasks.with_overdue())})
 
 
 @login_required
 def task_create(request):
     """Create new task (Admin only)"""
     if request.user.user_type != 'admin':
-        messages.error(request, 'Access denied!')
+        messages.error(request, _('Access denied!'))
         return redirect('dashboard')
     
-    language = request.session.get('language', 'en')
-    
     if request.method == 'POST':
         form = TaskForm(request.POST)
         if form.is_valid():
             task = form.save(commit=False)
             task.assigned_by = request.user
             task.save()
-            messages.success(request, 'Task assigned successfully!' if language == 'en' else 'कार्य यशस्वीरित्या नियुक्त केले!')
+            messages.success(request, _('Task assigned successfully!'))
             return redirect('task_list')
     else:
         form = TaskForm()
     
-    return render(request, 'task_form.html', {'form': form, 'language': language})
+    return render(request, 'task_form.html', {'form': form})
 
 
 @login_required
 def task_detail(request, pk):
     """View task details"""
-    language = request.session.get('language', 'en')
-    task = get_object_or_404(Task, pk=pk)
+    task = get_object_or_404(Task.objects.select_related('assigned_to__user', 'assigned_by'), pk=pk)
     
     # Check permissions
     if request.user.user_type != 'admin' and task.assigned_to.user != request.user:
-        messages.error(request, 'Access denied!')
+        messages.error(request, _('Access denied!'))
         return redirect('dashboard')
     
-    return render(request, 'task_detail.html', {'task': task, 'language': language})
+    return render(request, 'task_detail.html', {'task': task})
 
 
 @login_required
 def task_update(request, pk):
     """Update task (Admin can edit all, Worker can only update status)"""
-    language = request.session.get('language', 'en')
     task = get_object_or_404(Task, pk=pk)
     
     if request.user.user_type == 'admin':
@@ -220,15 +241,15 @@ def task_update(request, pk):
             form = TaskForm(request.POST, instance=task)
             if form.is_valid():
                 form.save()
-                messages.success(request, 'Task updated!' if language == 'en' else 'कार्य अद्यतनित!')
+                messages.success(request, _('Task updated!'))
                 return redirect('task_detail', pk=pk)
         else:
             form = TaskForm(instance=task)
-        return render(request, 'task_form.html', {'form': form, 'task': task, 'language': language})
+        return render(request, 'task_form.html', {'form': form, 'task': task})
     else:
         # Worker can only update status
         if task.assigned_to.user != request.user:
-            messages.error(request, 'Access denied!')
+            messages.error(request, _('Access denied!'))
             return redirect('dashboard')
         
         if request.method == 'POST':
@@ -238,81 +259,214 @@ def task_update(request, pk):
                 if task.status == 'completed':
                     task.completed_at = timezone.now()
                 task.save()
-                messages.success(request, 'Status updated!' if language == 'en' else 'स्थिती अद्यतनित!')
+                messages.success(request, _('Status updated!'))
                 return redirect('task_detail', pk=pk)
         else:
             form = TaskUpdateForm(instance=task)
-        return render(request, 'task_status_form.html', {'form': form, 'task': task, 'language': language})
+        return render(request, 'task_status_form.html', {'form': form, 'task': task})
 
 
 @login_required
 def task_delete(request, pk):
     """Delete task (Admin only)"""
     if request.user.user_type != 'admin':
-        messages.error(request, 'Access denied!')
+        messages.error(request, _('Access denied!'))
         return redirect('dashboard')
     
-    language = request.session.get('language', 'en')
     task = get_object_or_404(Task, pk=pk)
     
     if request.method == 'POST':
         task.delete()
-        messages.success(request, 'Task deleted!' if language == 'en' else 'कार्य हटवले!')
+        messages.success(request, _('Task deleted!'))
         return redirect('task_list')
     
-    return render(request, 'task_confirm_delete.html', {'task': task, 'language': language})
+    return render(request, 'task_confirm_delete.html', {'task': task})
+
+
+# Recurring Task Templates
+@login_required
+def task_template_list(request):
+    """List recurring task templates (Admin only)"""
+    if request.user.user_type != 'admin':
+        messages.error(request, _('Access denied!'))
+        return redirect('dashboard')
+    
+    templates = TaskTemplate.objects.annotate(worker_count=Count('workers'))
+    return render(request, 'task_template_list.html', {
+        'templates': templates,
+        'days': settings.RECURRING_TASK_DAYS,
+    })
+
+
+@login_required
+def task_template_create(request):
+    """Create recurring task template and generate its upcoming tasks (Admin only)"""
+    if request.user.user_type != 'admin':
+        messages.error(request, _('Access denied!'))
+        return redirect('dashboard')
+    
+    if request.method == 'POST':
+        form = TaskTemplateForm(request.POST)
+        if form.is_valid():
+            template = form.save(commit=False)
+            template.created_by = request.user
+            template.save()
+            form.save_m2m()
+            created = generate_tasks(templates=[template])
+            messages.success(request, ngettext('Recurring task saved! %(count)d task assigned.',
+                                               'Recurring task saved! %(count)d tasks assigned.',
+                                               created) % {'count': created})
+            return redirect('task_template_list')
+    else:
+        form = TaskTemplateForm()
+    
+    return render(request, 'task_template_form.html', {'form': form})
+
+
+@login_required
+def task_template_update(request, pk):
+    """Edit recurring task template and reschedule its pending tasks (Admin only)"""
+    if request.user.user_type != 'admin':
+        messages.error(request, _('Access denied!'))
+        return redirect('dashboard')
+    
+    template = get_object_or_404(TaskTemplate, pk=pk)
+    
+    if request.method == 'POST':
+        form = TaskTemplateForm(request.POST, instance=template)
+        if form.is_valid():
+            form.save()
+            reschedule(template)
+            messages.success(request, _('Recurring task updated!'))
+            return redirect('task_template_list')
+    else:
+        form = TaskTemplateForm(instance=template)
+    
+    return render(request, 'task_template_form.html', {'form': form, 'template': template})
+
+
+@login_required
+def task_template_delete(request, pk):
+    """Delete recurring task template and its pending upcoming tasks (Admin only)"""
+    if request.user.user_type != 'admin':
+        messages.error(request, _('Access denied!'))
+        return redirect('dashboard')
+    
+    template = get_object_or_404(TaskTemplate, pk=pk)
+    
+    if request.method == 'POST':
+        with transaction.atomic():
+            cancel_pending(template)
+            template.delete()
+        messages.success(request, _('Recurring task deleted!'))
+        return redirect('task_template_list')
+    
+    return render(request, 'task_template_confirm_delete.html', {'template': template})
 
 
 # Cow/Veterinary Management Views
 @login_required
 def cow_list(request):
-    """List all cows"""
-    language = request.session.get('language', 'en')
-    cows = Cow.objects.filter(is_active=True)
-    
-    return render(request, 'cow_list.html', {'cows': cows, 'language': language})
+    """List the active cows, filtered and sorted on their status snapshot"""
+    form = CowFilterForm(request.GET or None)
+    options = form.cleaned_data if form.is_valid() else {}
+    sort = options.get('sort') or 'number'
+    today = timezone.localdate()
+    cows = filter_herd(Cow.objects.filter(status__is_active=True).select_related('status'), options.get('status'),
+                       today)
+    
+    # Filters the pagination links must carry along with the cursor
+    query = request.GET.copy()
+    query.pop('cursor', None)
+    query.pop('per_page', None)
+    return render(request, 'cow_list.html', {
+        'form': form,
+        'cows': paginate(request, cows, ordering=HERD_ORDERINGS[sort]),
+        'status': options.get('status', ''),
+        'sort': sort,
+        'today': today,
+        'query': query.urlencode(),
+    })
 
 
 @login_required
 def cow_create(request):
     """Add new cow (Admin only)"""
     if request.user.user_type != 'admin':
-        messages.error(request, 'Access denied!')
+        messages.error(request, _('Access denied!'))
         return redirect('dashboard')
     
-    language = request.session.get('language', 'en')
-    
     if request.method == 'POST':
         form = CowForm(request.POST, request.FILES)
         if form.is_valid():
             cow = form.save(commit=False)
             cow.added_by = request.user
             cow.save()
-            messages.success(request, 'Cow added successfully!' if language == 'en' else 'गाय यशस्वीरित्या जोडली!')
+            if cow.photo:
+                cow.save(update_fields=generate_renditions(cow))
+            messages.success(request, _('Cow added successfully!'))
             return redirect('cow_list')
     else:
         form = CowForm()
     
-    return render(request, 'cow_form.html', {'form': form, 'language': language})
+    return render(request, 'cow_form.html', {'form': form})
+
+
+@login_required
+def cow_import(request):
+    """Bulk import cows, vaccinations and visits from CSV/XLSX files (Admin only)"""
+    if request.user.user_type != 'admin':
+        messages.error(request, _('Access denied!'))
+        return redirect('dashboard')
+    
+    results = None
+    
+    if request.method == 'POST':
+        form = HerdImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            importer = HerdImporter(
+                user=request.user,
+                batch_size=form.cleaned_data['batch_size'] or DEFAULT_BATCH_SIZE,
+                dry_run=form.cleaned_data['dry_run'],
+            )
+            uploads = {kind: form.cleaned_data[kind] for kind in ('cows', 'vaccinations', 'visits')
+                       if form.cleaned_data[kind]}
+            try:
+                results = importer.run(**{kind: iter_rows(upload.file, upload.name) for kind, upload in uploads.items()})
+            except (HerdImportError, UnicodeDecodeError, csv.Error) as e:
+                messages.error(request, str(e))
+            else:
+                if not form.cleaned_data['dry_run']:
+                    messages.success(request, _('Import finished!'))
+    else:
+        form = HerdImportForm()
+    
+    return render(request, 'cow_import.html', {'form': form, 'results': results})
 
 
 @login_required
 def cow_detail(request, pk):
-    """View cow details"""
-    language = request.session.get('language', 'en')
-    cow = get_object_or_404(Cow, pk=pk)
-    veterinary_visits = cow.veterinary_visits.all()
-    ai_records = cow.ai_records.all()
-    pregnancies = cow.pregnancies.all()
-    vaccinations = cow.vaccinations.all()
+    """View cow details with the latest page of its medical timeline"""
+    cows, timeline = concurrency.gather(
+        lambda: list(Cow.objects.filter(pk=pk)),
+        lambda: cow_timeline(pk, request.GET.get('cursor')),
+    )
+    if not cows:
+        raise Http404('No Cow matches the given query.')
+    cow = cows[0]
     
     return render(request, 'cow_detail.html', {
         'cow': cow,
-        'veterinary_visits': veterinary_visits,
-        'ai_records': ai_records,
-        'pregnancies': pregnancies,
-        'vaccinations': vaccinations,
-        'language': language
+        'timeline': timeline,
+    })
+
+
+@login_required
+def cow_timeline_page(request, pk):
+    """Older timeline events after ``cursor``, as an HTML fragment for the cow page"""
+    return render(request, 'cow_timeline_events.html', {
+        'cow_id': pk,
+        'timeline': cow_timeline(pk, request.GET.get('cursor')),
     })
 
 
@@ -320,47 +474,46 @@ def cow_detail(request, pk):
 def cow_update(request, pk):
     """Update cow details (Admin only)"""
     if request.user.user_type != 'admin':
-        messages.error(request, 'Access denied!')
+        messages.error(request, _('Access denied!'))
         return redirect('dashboard')
     
-    language = request.session.get('language', 'en')
     cow = get_object_or_404(Cow, pk=pk)
     
     if request.method == 'POST':
         form = CowForm(request.POST, request.FILES, instance=cow)
         if form.is_valid():
-            form.save()
-            messages.success(request, 'Cow updated!' if language == 'en' else 'गाय अद्यतनित!')
+            cow = form.save()
+            if 'photo' in form.changed_data:
+                cow.save(update_fields=generate_renditions(cow))
+            messages.success(request, _('Cow updated!'))
             return redirect('cow_detail', pk=pk)
     else:
         form = CowForm(instance=cow)
     
-    return render(request, 'cow_form.html', {'form': form, 'cow': cow, 'language': language})
+    return render(request, 'cow_form.html', {'form': form, 'cow': cow})
 
 
 @login_required
 def cow_delete(request, pk):
     """Delete cow (Admin only)"""
     if request.user.user_type != 'admin':
-        messages.error(request, 'Access denied!')
+        messages.error(request, _('Access denied!'))
         return redirect('dashboard')
     
-    language = request.session.get('language', 'en')
     cow = get_object_or_404(Cow, pk=pk)
     
     if request.method == 'POST':
         cow.is_active = False
         cow.save()
-        messages.success(request, 'Cow deactivated!' if language == 'en' else 'गाय निष्क्रिय केली!')
+        messages.success(request, _('Cow deactivated!'))
         return redirect('cow_list')
     
-    return render(request, 'cow_confirm_delete.html', {'cow': cow, 'language': language})
+    return render(request, 'cow_confirm_delete.html', {'cow': cow})
 
 
 def change_language(request):
     """Change language preference"""
-    language = request.GET.get('lang', 'en')
-    request.session['language'] = language
+    set_language(request, request.GET.get('lang'))
     
     # Redirect back to the previous page
     return redirect(request.META.get('HTTP_REFERER', 'dashboard'))
@@ -369,18 +522,18 @@ def change_language(request):
 # ==================== VETERINARY SYSTEM VIEWS ====================
 
 from .forms import (DoctorForm, VeterinaryVisitForm, MedicineForm, 
-                    ArtificialInseminationForm, PregnancyForm, VaccinationForm)
+                    ArtificialInseminationForm, PregnancyForm, VaccinationForm, RecordExportForm,
+                    ReminderFilterForm, SearchForm, CowGroupForm, GroupVaccinationForm, GroupVisitForm,
+                    GroupMedicineFormSet)
 
 # Doctor Management
 @login_required
 def doctor_list(request):
     """List all doctors"""
-    language = request.session.get('language', 'en')
-    doctors = Doctor.objects.filter(is_active=True)
+    doctors = paginate(request, Doctor.objects.filter(is_active=True))
     
     return render(request, 'veterinary/doctor_list.html', {
         'doctors': doctors,
-        'language': language
     })
 
 
@@ -388,52 +541,48 @@ def doctor_list(request):
 def doctor_create(request):
     """Add new doctor (Admin only)"""
     if request.user.user_type != 'admin':
-        messages.error(request, 'Access denied!' if request.session.get('language') == 'en' else 'प्रवेश नाकारला!')
+        messages.error(request, _('Access denied!'))
         return redirect('doctor_list')
     
-    language = request.session.get('language', 'en')
-    
     if request.method == 'POST':
         form = DoctorForm(request.POST)
         if form.is_valid():
             doctor = form.save(commit=False)
             doctor.added_by = request.user
             doctor.save()
-            messages.success(request, 'Doctor added successfully!' if language == 'en' else 'डॉक्टर यशस्वीरित्या जोडले!')
+            messages.success(request, _('Doctor added successfully!'))
             return redirect('doctor_list')
     else:
         form = DoctorForm()
     
-    return render(request, 'veterinary/doctor_form.html', {'form': form, 'language': language})
+    return render(request, 'veterinary/doctor_form.html', {'form': form})
 
 
 @login_required
 def doctor_update(request, pk):
     """Update doctor details (Admin only)"""
     if request.user.user_type != 'admin':
-        messages.error(request, 'Access denied!' if request.session.get('language') == 'en' else 'प्रवेश नाकारला!')
+        messages.error(request, _('Access denied!'))
         return redirect('doctor_list')
     
-    language = request.session.get('language', 'en')
     doctor = get_object_or_404(Doctor, pk=pk)
     
     if request.method == 'POST':
         form = DoctorForm(request.POST, instance=doctor)
         if form.is_valid():
             form.save()
-            messages.success(request, 'Doctor updated!' if language == 'en' else 'डॉक्टर अपडेट केले!')
+            messages.success(request, _('Doctor updated!'))
             return redirect('doctor_list')
     else:
         form = DoctorForm(instance=doctor)
     
-    return render(request, 'veterinary/doctor_form.html', {'form': form, 'doctor': doctor, 'language': language})
+    return render(request, 'veterinary/doctor_form.html', {'form': form, 'doctor': doctor})
 
 
 # Veterinary Visit Management
 @login_required
 def visit_create(request, cow_id):
     """Add veterinary visit"""
-    language = request.session.get('language', 'en')
     cow = get_object_or_404(Cow, pk=cow_id)
     
     if request.method == 'POST':
@@ -447,25 +596,65 @@ def visit_create(request, cow_id):
             cow.last_checkup = visit.visit_date
             cow.save()
             
-            messages.success(request, 'Visit recorded!' if language == 'en' else 'भेट नोंदवली!')
+            messages.success(request, _('Visit recorded!'))
             return redirect('cow_detail', pk=cow_id)
     else:
         form = VeterinaryVisitForm(initial={'cow': cow})
     
-    return render(request, 'veterinary/visit_form.html', {'form': form, 'cow': cow, 'language': language})
+    return render(request, 'veterinary/visit_form.html', {'form': form, 'cow': cow})
+
+
+def _cow_group(request):
+    """The cow filter form (from the query string, so it survives the POST) and the cows it selects"""
+    group_form = CowGroupForm(request.GET or None)
+    cows = group_form.cows()
+    return group_form, cows, {
+        'group_form': group_form,
+        'cow_count': cows.count(),
+        'cow_preview': cows.values_list('cow_number', flat=True)[:50],
+    }
+
+
+@login_required
+def visit_group_create(request):
+    """Record the same treatment, with its medicines, for a group of cows"""
+    group_form, cows, context = _cow_group(request)
+    
+    if request.method == 'POST':
+        form = GroupVisitForm(request.POST)
+        medicine_forms = GroupMedicineFormSet(request.POST, prefix='medicines')
+        if form.is_valid() and medicine_forms.is_valid():
+            cow_ids = list(cows.values_list('pk', flat=True))
+            if not cow_ids:
+                messages.error(request, _('No cows match the filters.'))
+            else:
+                medicines = [medicine_form.save(commit=False) for medicine_form in medicine_forms
+                             if medicine_form.has_changed()]
+                record_group_treatment(form.save(commit=False), medicines, cow_ids, request.user)
+                messages.success(request, ngettext(
+                    'Treatment recorded for %(count)d cow.', 'Treatment recorded for %(count)d cows.', len(cow_ids),
+                ) % {'count': len(cow_ids)})
+                return redirect('veterinary_dashboard')
+    else:
+        form = GroupVisitForm()
+        medicine_forms = GroupMedicineFormSet(prefix='medicines')
+    
+    return render(request, 'veterinary/group_visit_form.html', {
+        'form': form,
+        'medicine_forms': medicine_forms,
+        **context,
+    })
 
 
 @login_required
 def visit_detail(request, pk):
     """View visit details"""
-    language = request.session.get('language', 'en')
-    visit = get_object_or_404(VeterinaryVisit, pk=pk)
+    visit = get_object_or_404(VeterinaryVisit.objects.select_related('cow', 'doctor'), pk=pk)
     medicines = visit.medicines.all()
     
     return render(request, 'veterinary/visit_detail.html', {
         'visit': visit,
         'medicines': medicines,
-        'language': language
     })
 
 
@@ -473,7 +662,6 @@ def visit_detail(request, pk):
 @login_required
 def medicine_create(request, visit_id):
     """Add medicine to a visit"""
-    language = request.session.get('language', 'en')
     visit = get_object_or_404(VeterinaryVisit, pk=visit_id)
     
     if request.method == 'POST':
@@ -482,31 +670,28 @@ def medicine_create(request, visit_id):
             medicine = form.save(commit=False)
             medicine.visit = visit
             medicine.save()
-            messages.success(request, 'Medicine added!' if language == 'en' else 'औषध जोडले!')
+            messages.success(request, _('Medicine added!'))
             return redirect('visit_detail', pk=visit_id)
     else:
         form = MedicineForm()
     
-    return render(request, 'veterinary/medicine_form.html', {'form': form, 'visit': visit, 'language': language})
+    return render(request, 'veterinary/medicine_form.html', {'form': form, 'visit': visit})
 
 
 # Artificial Insemination Management
 @login_required
 def ai_list(request):
     """List all AI records"""
-    language = request.session.get('language', 'en')
-    ai_records = ArtificialInsemination.objects.all().order_by('-ai_date')
+    ai_records = paginate(request, ArtificialInsemination.objects.select_related('cow', 'doctor').order_by('-ai_date'))
     
     return render(request, 'veterinary/ai_list.html', {
         'ai_records': ai_records,
-        'language': language
     })
 
 
 @login_required
 def ai_create(request, cow_id=None):
     """Record AI procedure"""
-    language = request.session.get('language', 'en')
     cow = get_object_or_404(Cow, pk=cow_id) if cow_id else None
     
     if request.method == 'POST':
@@ -515,26 +700,24 @@ def ai_create(request, cow_id=None):
             ai_record = form.save(commit=False)
             ai_record.recorded_by = request.user
             ai_record.save()
-            messages.success(request, 'AI record added!' if language == 'en' else 'कृत्रिम रेतन नोंद जोडली!')
+            messages.success(request, _('AI record added!'))
             return redirect('ai_list')
     else:
         initial = {'cow': cow} if cow else {}
         form = ArtificialInseminationForm(initial=initial)
     
-    return render(request, 'veterinary/ai_form.html', {'form': form, 'cow': cow, 'language': language})
+    return render(request, 'veterinary/ai_form.html', {'form': form, 'cow': cow})
 
 
 @login_required
 def ai_detail(request, pk):
     """View AI record details"""
-    language = request.session.get('language', 'en')
-    ai_record = get_object_or_404(ArtificialInsemination, pk=pk)
+    ai_record = get_object_or_404(ArtificialInsemination.objects.select_related('cow', 'doctor', 'recorded_by'), pk=pk)
     pregnancy = ai_record.pregnancy.first() if hasattr(ai_record, 'pregnancy') else None
     
     return render(request, 'veterinary/ai_detail.html', {
         'ai_record': ai_record,
         'pregnancy': pregnancy,
-        'language': language
     })
 
 
@@ -542,19 +725,16 @@ def ai_detail(request, pk):
 @login_required
 def pregnancy_list(request):
     """List all pregnancies"""
-    language = request.session.get('language', 'en')
-    pregnancies = Pregnancy.objects.all().order_by('-confirmation_date')
+    pregnancies = paginate(request, Pregnancy.objects.select_related('cow').order_by('-confirmation_date'))
     
     return render(request, 'veterinary/pregnancy_list.html', {
         'pregnancies': pregnancies,
-        'language': language
     })
 
 
 @login_required
 def pregnancy_create(request, cow_id=None):
     """Record pregnancy"""
-    language = request.session.get('language', 'en')
     cow = get_object_or_404(Cow, pk=cow_id) if cow_id else None
     
     if request.method == 'POST':
@@ -563,50 +743,46 @@ def pregnancy_create(request, cow_id=None):
             pregnancy = form.save(commit=False)
             pregnancy.recorded_by = request.user
             pregnancy.save()
-            messages.success(request, 'Pregnancy recorded!' if language == 'en' else 'गर्भधारणा नोंदवली!')
+            messages.success(request, _('Pregnancy recorded!'))
             return redirect('pregnancy_list')
     else:
         initial = {'cow': cow} if cow else {}
         form = PregnancyForm(initial=initial)
     
-    return render(request, 'veterinary/pregnancy_form.html', {'form': form, 'cow': cow, 'language': language})
+    return render(request, 'veterinary/pregnancy_form.html', {'form': form, 'cow': cow})
 
 
 @login_required
 def pregnancy_update(request, pk):
     """Update pregnancy details"""
-    language = request.session.get('language', 'en')
     pregnancy = get_object_or_404(Pregnancy, pk=pk)
     
     if request.method == 'POST':
         form = PregnancyForm(request.POST, instance=pregnancy)
         if form.is_valid():
             form.save()
-            messages.success(request, 'Pregnancy updated!' if language == 'en' else 'गर्भधारणा अपडेट केली!')
+            messages.success(request, _('Pregnancy updated!'))
             return redirect('pregnancy_list')
     else:
         form = PregnancyForm(instance=pregnancy)
     
-    return render(request, 'veterinary/pregnancy_form.html', {'form': form, 'pregnancy': pregnancy, 'language': language})
+    return render(request, 'veterinary/pregnancy_form.html', {'form': form, 'pregnancy': pregnancy})
 
 
 # Vaccination Management
 @login_required
 def vaccination_list(request):
     """List all vaccinations"""
-    language = request.session.get('language', 'en')
-    vaccinations = Vaccination.objects.all().order_by('-vaccination_date')
+    vaccinations = paginate(request, Vaccination.objects.select_related('cow', 'administered_by').order_by('-vaccination_date'))
     
     return render(request, 'veterinary/vaccination_list.html', {
         'vaccinations': vaccinations,
-        'language': language
     })
 
 
 @login_required
 def vaccination_create(request, cow_id=None):
     """Record vaccination"""
-    language = request.session.get('language', 'en')
     cow = get_object_or_404(Cow, pk=cow_id) if cow_id else None
     
     if request.method == 'POST':
@@ -615,34 +791,194 @@ def vaccination_create(request, cow_id=None):
             vaccination = form.save(commit=False)
             vaccination.recorded_by = request.user
             vaccination.save()
-            messages.success(request, 'Vaccination recorded!' if language == 'en' else 'लसीकरण नोंदवले!')
+            messages.success(request, _('Vaccination recorded!'))
             return redirect('vaccination_list')
     else:
         initial = {'cow': cow} if cow else {}
         form = VaccinationForm(initial=initial)
     
-    return render(request, 'veterinary/vaccination_form.html', {'form': form, 'cow': cow, 'language': language})
+    return render(request, 'veterinary/vaccination_form.html', {'form': form, 'cow': cow})
+
+
+@login_required
+def vaccination_group_create(request):
+    """Record the same vaccination for a group of cows"""
+    group_form, cows, context = _cow_group(request)
+    
+    if request.method == 'POST':
+        form = GroupVaccinationForm(request.POST)
+        if form.is_valid():
+            cow_ids = list(cows.values_list('pk', flat=True))
+            if not cow_ids:
+                messages.error(request, _('No cows match the filters.'))
+            else:
+                record_group_vaccination(form.save(commit=False), cow_ids, request.user)
+                messages.success(request, ngettext(
+                    'Vaccination recorded for %(count)d cow.', 'Vaccination recorded for %(count)d cows.', len(cow_ids),
+                ) % {'count': len(cow_ids)})
+                return redirect('vaccination_list')
+    else:
+        form = GroupVaccinationForm()
+    
+    return render(request, 'veterinary/group_vaccination_form.html', {'form': form, **context})
 
 
 @login_required
 def veterinary_dashboard(request):
     """Veterinary dashboard with overview"""
-    language = request.session.get('language', 'en')
-    
+    today = timezone.localdate()
     # Get statistics
-    total_doctors = Doctor.objects.filter(is_active=True).count()
-    recent_visits = VeterinaryVisit.objects.all().order_by('-visit_date')[:5]
-    pending_ai = ArtificialInsemination.objects.filter(success_status='Pending').count()
-    active_pregnancies = Pregnancy.objects.filter(pregnancy_status='confirmed').count()
-    upcoming_vaccinations = Vaccination.objects.filter(
-        next_due_date__gte=timezone.now().date()
-    ).order_by('next_due_date')[:5]
+    counters, overdue_reminders = concurrency.gather(
+        lambda: get_counters(['doctors.active', 'ai.status.Pending', 'pregnancies.status.confirmed']),
+        Reminder.objects.filter(due_date__lt=today).count,
+    )
+    recent_visits = VeterinaryVisit.objects.select_related('cow').order_by('-visit_date')[:5]
     
     return render(request, 'veterinary/dashboard.html', {
-        'total_doctors': total_doctors,
+        'total_doctors': counters['doctors.active'],
         'recent_visits': recent_visits,
-        'pending_ai': pending_ai,
-        'active_pregnancies': active_pregnancies,
-        'upcoming_vaccinations': upcoming_vaccinations,
-        'language': language
+        'pending_ai': counters['ai.status.Pending'],
+        'active_pregnancies': counters['pregnancies.status.confirmed'],
+        'upcoming_reminders': due_reminders(start=today)[:5],
+        'overdue_reminders': overdue_reminders,
+    })
+
+
+@login_required
+def reminder_list(request):
+    """Due list (vaccinations, follow-up visits, calvings) for a day, a week or everything overdue"""
+    form = ReminderFilterForm(request.GET or None)
+    options = form.cleaned_data if form.is_valid() else {}
+    period = options.get('period') or 'week'
+    today = timezone.localdate()
+    day = options.get('date') or today
+    
+    if request.user.user_type == 'admin':
+        worker = options.get('worker')
+    else:
+        try:
+            worker = request.user.worker_profile
+        except Worker.DoesNotExist:
+            messages.error(request, _('Worker profile not found!'))
+            return redirect('dashboard')
+    
+    if period == 'day':
+        start, end = day, day
+    elif period == 'week':
+        start, end = week_bounds(day)
+    else:
+        start, end = None, today - datetime.timedelta(days=1)
+    
+    # Filters the pagination links must carry along with the cursor
+    query = request.GET.copy()
+    query.pop('cursor', None)
+    query.pop('per_page', None)
+    return render(request, 'veterinary/reminder_list.html', {
+        'form': form,
+        'reminders': paginate(request, due_reminders(start, end, worker)),
+        'period': period,
+        'start': start,
+        'end': end,
+        'today': today,
+        'query': query.urlencode(),
+    })
+
+
+@login_required
+def breeding_analytics(request):
+    """Conception rate, services per conception, calving interval and days open"""
+    groups = {scope: [] for scope in ('bull', 'technician', 'doctor')}
+    herd = None
+    for stat in BreedingStat.objects.exclude(scope='cow').order_by('scope', '-services', 'label'):
+        if stat.scope == 'herd':
+            herd = stat
+        else:
+            groups[stat.scope].append(stat)
+    open_count, open_days = open_cows()
+    
+    return render(request, 'veterinary/analytics.html', {
+        'herd': herd,
+        'bulls': groups['bull'],
+        'technicians': groups['technician'],
+        'doctors': groups['doctor'],
+        'open_count': open_count,
+        'open_days': open_days,
+        'cows': paginate(request, BreedingStat.objects.filter(scope='cow')),
     })
+
+
+@login_required
+def record_export(request, kind):
+    """Stream veterinary records as CSV or NDJSON, optionally gzipped (Admin only)"""
+    if request.user.user_type != 'admin':
+        messages.error(request, _('Access denied!'))
+        return redirect('veterinary_dashboard')
+    if kind not in EXPORTS:
+        raise Http404
+    
+    form = RecordExportForm(request.GET)
+    if not form.is_valid():
+        messages.error(request, _('Invalid export filters: %(errors)s') % {'errors': form.errors.as_text()})
+        return redirect('veterinary_dashboard')
+    
+    options = form.cleaned_data
+    response = StreamingHttpResponse(
+        stream_export(
+            kind,
+            format=options['format'],
+            compress=options['gzip'],
+            start_date=options['start_date'],
+            end_date=options['end_date'],
+            cow_number=options['cow'],
+            doctor_license=options['doctor'],
+        ),
+        content_type=export_content_type(options['format'], options['gzip']),
+    )
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(kind, options["format"], options["gzip"])}"'
+    return response
+
+
+@login_required
+def search(request):
+    """Full-text search across cows and veterinary visits"""
+    form = SearchForm(request.GET)
+    hits = []
+    if form.is_valid() and form.cleaned_data['q']:
+        options = form.cleaned_data
+        hits = search_documents(
+            options['q'],
+            kind=options['kind'],
+            start_date=options['start_date'],
+            end_date=options['end_date'],
+            cow=options['cow'],
+            doctor=options['doctor'],
+        )
+    
+    return render(request, 'search.html', {'form': form, 'hits': hits})
+
+
+@login_required
+def autocomplete(request, lookup):
+    """Suggestions for the search-as-you-type pickers of the record forms"""
+    if lookup not in LOOKUPS:
+        raise Http404
+    # Only admins assign tasks, so only they may list workers
+    if lookup == 'workers' and request.user.user_type != 'admin':
+        return JsonResponse({'error': _('Access denied!')}, status=403)
+    cow = request.GET.get('cow', '')
+    results = suggest(lookup, request.GET.get('q', ''), cow=int(cow) if cow.isdigit() else None)
+    return JsonResponse({'results': results})
+
+
+# Monitoring
+def metrics(request):
+    """Request metrics in Prometheus text format (Admin, or ``Authorization: Bearer <METRICS_TOKEN>``)"""
+    token = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not (settings.METRICS_TOKEN and hmac.compare_digest(token, settings.METRICS_TOKEN)):
+        if not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        if request.user.user_type != 'admin':
+            messages.error(request, _('Access denied!'))
+            return redirect('dashboard')
+    body, content_type = render_metrics()
+    return HttpResponse(body, content_type=content_type)
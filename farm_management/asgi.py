@@ -14,3 +14,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'farm_management.settings')
 
 application = get_asgi_application()
+
+from core.scheduler import start_scheduler  # noqa: E402  (needs the app registry)
+
+start_scheduler()
@@ -41,7 +41,9 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.middleware.RequestMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'core.middleware.SessionLanguageMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -60,6 +62,7 @@ TEMPLATES = [
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
+                'django.template.context_processors.i18n',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
@@ -85,11 +88,22 @@ if os.environ.get('DATABASE_URL'):
 else:
     DATABASES = {
         'default': {
-            'ENGINE': 'django.db.backends.sqlite3',
+            'ENGINE': 'core.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
         }
     }
 
+# SQLite profile for several workers on one box (see core/backends/sqlite3):
+# WAL, synchronous=NORMAL and BEGIN IMMEDIATE for atomic blocks. Busy timeout
+# in seconds, retries of BEGIN IMMEDIATE after it, page cache per connection
+# in KiB and memory-mapped bytes.
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default']['ENGINE'] = 'core.backends.sqlite3'
+SQLITE_BUSY_TIMEOUT = float(os.environ.get('SQLITE_BUSY_TIMEOUT', '20'))
+SQLITE_BEGIN_RETRIES = int(os.environ.get('SQLITE_BEGIN_RETRIES', '3'))
+SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', '65536'))
+SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -113,7 +127,17 @@ AUTH_PASSWORD_VALIDATORS = [
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
-LANGUAGE_CODE = 'en-us'
+LANGUAGE_CODE = 'en'
+
+# The active language comes from the session (see core.middleware); strings are
+# translated from the compiled catalogs in locale/<code>/LC_MESSAGES/django.mo.
+# To add a language, append it here and run makemessages/compilemessages.
+LANGUAGES = [
+    ('en', 'English'),
+    ('mr', 'मराठी'),
+]
+
+LOCALE_PATHS = [BASE_DIR / 'locale']
 
 TIME_ZONE = 'Asia/Kolkata'
 
@@ -135,6 +159,91 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Cache
+# CACHE_BACKEND selects locmem (default, per process), file or redis. Use file
+# or redis when running several gunicorn workers so fragment invalidation is
+# shared between them.
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'),
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', '/var/tmp/cowconnect_cache'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'cowconnect',
+        }
+    }
+
+# Dashboard and navigation fragment cache (see core/fragment_cache.py)
+FRAGMENT_CACHE_ALIAS = 'default'
+FRAGMENT_CACHE_TIMEOUT = int(os.environ.get('FRAGMENT_CACHE_TIMEOUT', '300'))
+
+# List pagination (keyset/cursor based, see core/pagination.py)
+LIST_PAGE_SIZE = int(os.environ.get('LIST_PAGE_SIZE', '50'))
+LIST_MAX_PAGE_SIZE = int(os.environ.get('LIST_MAX_PAGE_SIZE', '200'))
+
+# Events per page of the cow medical timeline (see core/timeline.py)
+TIMELINE_PAGE_SIZE = int(os.environ.get('TIMELINE_PAGE_SIZE', '20'))
+
+# Suggestions per search of the cow/AI record/worker pickers (see core/autocomplete.py)
+AUTOCOMPLETE_LIMIT = int(os.environ.get('AUTOCOMPLETE_LIMIT', '15'))
+
+# Threads (and so extra database connections) per process for the concurrent
+# reads of the dashboards and the cow page (see core/concurrency.py); 0 runs
+# them one after the other, which is faster against the local SQLite file
+CONCURRENT_QUERY_THREADS = int(os.environ.get('CONCURRENT_QUERY_THREADS', '4' if os.environ.get('DATABASE_URL') else '0'))
+
+# Request metrics (see core/metrics.py), served on /metrics to admins or to
+# scrapers sending `Authorization: Bearer <METRICS_TOKEN>`. Queries slower than
+# SLOW_QUERY_MS are logged to `core.metrics` with their plan. Set
+# PROMETHEUS_MULTIPROC_DIR to add up the samples of every gunicorn worker.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '200'))
+
+# Overdue task sweep (see core/overdue.py). Seconds between sweeps run from a
+# background thread in each web process; 0 leaves it to cron and
+# `manage.py sweep_overdue_tasks`.
+OVERDUE_SWEEP_INTERVAL = int(os.environ.get('OVERDUE_SWEEP_INTERVAL', '0'))
+
+# Recurring task generation (see core/recurring.py). Days ahead materialized
+# on each run, and seconds between runs from a background thread in each web
+# process; 0 leaves it to cron and `manage.py generate_recurring_tasks`.
+RECURRING_TASK_DAYS = int(os.environ.get('RECURRING_TASK_DAYS', '2'))
+RECURRING_TASK_INTERVAL = int(os.environ.get('RECURRING_TASK_INTERVAL', '0'))
+
+# Outgoing mail for the daily reminder digest (`manage.py send_reminder_digest`).
+# Without EMAIL_HOST messages are written to the console.
+if os.environ.get('EMAIL_HOST'):
+    EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+    EMAIL_HOST = os.environ['EMAIL_HOST']
+    EMAIL_PORT = int(os.environ.get('EMAIL_PORT', '587'))
+    EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+    EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+    EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', 'True') == 'True'
+else:
+    EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'cowconnect@localhost')
+REMINDER_DIGEST_DAYS = int(os.environ.get('REMINDER_DIGEST_DAYS', '7'))
+
+# JSON API
+API_BATCH_LIMIT = int(os.environ.get('API_BATCH_LIMIT', '500'))
+SYNC_PAGE_SIZE = int(os.environ.get('SYNC_PAGE_SIZE', '2000'))
+SYNC_MAX_PAGE_SIZE = 10000
+SYNC_SETTLE_SECONDS = int(os.environ.get('SYNC_SETTLE_SECONDS', '2'))
+SYNC_TOMBSTONE_DAYS = int(os.environ.get('SYNC_TOMBSTONE_DAYS', '90'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
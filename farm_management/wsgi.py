@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'farm_management.settings')
 
 application = get_wsgi_application()
+
+from core.scheduler import start_scheduler  # noqa: E402  (needs the app registry)
+
+start_scheduler()
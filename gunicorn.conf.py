@@ -0,0 +1,23 @@
+"""
+Gunicorn hooks for the multi-process request metrics (see core/metrics.py).
+
+Gunicorn reads this file from the working directory on start. When
+PROMETHEUS_MULTIPROC_DIR is set, every worker writes its samples there; the
+directory is emptied on start so counters from an earlier run do not leak in,
+and the files of exited workers are marked dead so their gauges drop out.
+"""
+import os
+import shutil
+
+
+def on_starting(server):
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
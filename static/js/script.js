@@ -46,28 +46,6 @@ document.addEventListener('DOMContentLoaded', function() {
             }
         });
     });
-
-    // Highlight overdue tasks
-    const today = new Date();
-    const taskRows = document.querySelectorAll('.data-table tbody tr');
-    
-    taskRows.forEach(function(row) {
-        const deadlineCell = row.querySelector('td:nth-child(3)');
-        if (deadlineCell) {
-            const deadlineText = deadlineCell.textContent.trim();
-            // Simple check - you might need to adjust based on your date format
-            if (deadlineText) {
-                const statusCell = row.querySelector('.badge');
-                if (statusCell && !statusCell.classList.contains('badge-completed')) {
-                    // Add visual indicator for overdue items
-                    const deadline = new Date(deadlineText);
-                    if (deadline < today) {
-                        row.classList.add('overdue-row');
-                    }
-                }
-            }
-        }
-    });
 });
 
 // Language switcher
@@ -159,3 +137,154 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 });
+
+// Medical timeline: load older records in place instead of reloading the page
+document.addEventListener('click', function(event) {
+    const link = event.target.closest('[data-load-more]');
+    if (!link) {
+        return;
+    }
+    event.preventDefault();
+    const item = link.closest('.timeline-more');
+    link.classList.add('disabled');
+    fetch(link.dataset.loadMore, {credentials: 'same-origin'})
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(response.statusText);
+            }
+            return response.text();
+        })
+        .then(html => {
+            item.insertAdjacentHTML('beforebegin', html);
+            item.remove();
+        })
+        .catch(() => {
+            window.location.href = link.href;
+        });
+});
+
+// Search-as-you-type pickers (core/autocomplete.py): the chosen id goes in the hidden input
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('[data-autocomplete]').forEach(function(picker) {
+        const hidden = picker.querySelector('input[type="hidden"]');
+        const search = picker.querySelector('input[type="text"]');
+        const list = picker.querySelector('.autocomplete-results');
+        const forwarded = picker.dataset.forward
+            ? picker.closest('form').querySelector('input[type="hidden"][name="' + picker.dataset.forward + '"]')
+            : null;
+        let timer = null;
+        let latest = 0;
+        let active = -1;
+
+        function close() {
+            list.hidden = true;
+            list.innerHTML = '';
+            active = -1;
+        }
+
+        function choose(item) {
+            hidden.value = item.dataset.id;
+            search.value = item.textContent;
+            close();
+            hidden.dispatchEvent(new Event('change'));
+        }
+
+        function highlight(index) {
+            const items = list.querySelectorAll('[data-id]');
+            items.forEach(function(item, position) {
+                item.classList.toggle('active', position === index);
+                item.setAttribute('aria-selected', position === index ? 'true' : 'false');
+            });
+            active = index;
+        }
+
+        function load() {
+            const url = new URL(picker.dataset.autocomplete, window.location.href);
+            url.searchParams.set('q', search.value.trim());
+            if (forwarded && forwarded.value) {
+                url.searchParams.set(picker.dataset.forward, forwarded.value);
+            }
+            const request = ++latest;
+            fetch(url, {credentials: 'same-origin'})
+                .then(response => {
+                    if (!response.ok) {
+                        throw new Error(response.statusText);
+                    }
+                    return response.json();
+                })
+                .then(data => {
+                    // Answers can arrive out of order; only the newest search counts
+                    if (request !== latest || document.activeElement !== search) {
+                        return;
+                    }
+                    close();
+                    data.results.forEach(function(result) {
+                        const item = document.createElement('li');
+                        item.setAttribute('role', 'option');
+                        item.dataset.id = result.id;
+                        item.textContent = result.label;
+                        list.appendChild(item);
+                    });
+                    if (!data.results.length) {
+                        const empty = document.createElement('li');
+                        empty.className = 'autocomplete-empty';
+                        empty.textContent = picker.dataset.empty;
+                        list.appendChild(empty);
+                    }
+                    list.hidden = false;
+                })
+                .catch(close);
+        }
+
+        search.addEventListener('input', function() {
+            if (hidden.value) {
+                hidden.value = '';
+                hidden.dispatchEvent(new Event('change'));
+            }
+            clearTimeout(timer);
+            timer = setTimeout(load, 200);
+        });
+
+        search.addEventListener('focus', function() {
+            if (!hidden.value) {
+                load();
+            }
+        });
+
+        search.addEventListener('blur', close);
+
+        search.addEventListener('keydown', function(e) {
+            const items = list.querySelectorAll('[data-id]');
+            if ((e.key === 'ArrowDown' || e.key === 'ArrowUp') && items.length) {
+                e.preventDefault();
+                if (e.key === 'ArrowDown') {
+                    highlight(active + 1 < items.length ? active + 1 : 0);
+                } else {
+                    highlight(active > 0 ? active - 1 : items.length - 1);
+                }
+            } else if (e.key === 'Enter' && active >= 0) {
+                e.preventDefault();
+                choose(items[active]);
+            } else if (e.key === 'Escape') {
+                close();
+            }
+        });
+
+        // mousedown fires before the search box loses focus and closes the list
+        list.addEventListener('mousedown', function(e) {
+            const item = e.target.closest('[data-id]');
+            e.preventDefault();
+            if (item) {
+                choose(item);
+            }
+        });
+
+        // Picking another cow makes the chosen AI record meaningless
+        if (forwarded) {
+            forwarded.addEventListener('change', function() {
+                hidden.value = '';
+                search.value = '';
+            });
+        }
+    });
+});